@@ -0,0 +1,179 @@
+"""
+Benchmark the middleware chain of the ASGI entry point around an async view.
+
+Run from the project root:
+
+    python -m benchmarks.bench_asgi
+
+A burst of concurrent requests is sent in process to an async view awaiting
+--latency milliseconds, the way chart views await FRED, through:
+
+- configured: the MIDDLEWARE of the settings;
+- async only: the same chain without its sync-only middleware.
+
+Django adapts a sync-only middleware by running the rest of the chain, the view
+included, through one thread per request. Async-capable middleware built on
+MiddlewareMixin still run their hooks through a thread per request in Django 4.0,
+so both chains hold a thread for every request in flight.
+
+Reported are the sync-only middleware, and the duration of the burst and the peak
+number of threads of each chain.
+"""
+
+# Import argparse for reading the command line options
+import argparse
+# Import asyncio for the async view and the concurrent requests
+import asyncio
+# Import os for configuring Django
+import os
+# Import threading for counting threads
+import threading
+# Import time for timing the bursts
+import time
+
+# Import django for loading the project settings
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+django.setup()
+
+# Import ApplicationCommunicator for sending requests to the ASGI application
+from asgiref.testing import ApplicationCommunicator
+# Import settings for reading the configured middleware
+from django.conf import settings
+# Import ASGIHandler for building the ASGI application of every chain
+from django.core.handlers.asgi import ASGIHandler
+# Import HttpResponse for the benchmarked view
+from django.http import HttpResponse
+# Import path for routing the benchmarked view
+from django.urls import path
+# Import override_settings for swapping the middleware and the URLs
+from django.test.utils import override_settings
+# Import import_string for loading the middleware
+from django.utils.module_loading import import_string
+
+
+# Milliseconds awaited by the view, set from the command line
+LATENCY = 100
+
+
+async def upstream(request):
+    """
+    Await the upstream latency, like a chart view waiting for FRED.
+    """
+
+    await asyncio.sleep(LATENCY / 1000)
+    return HttpResponse('ok')
+
+
+urlpatterns = [path('upstream/', upstream)]
+
+
+def get_sync_only(middleware):
+    """
+    Get the middleware Django has to adapt in an async chain.
+
+    Args:
+        middleware (list): Dotted paths of the middleware.
+
+    Returns:
+        list: The dotted paths of the sync-only middleware.
+    """
+
+    return [name for name in middleware if not getattr(import_string(name), 'async_capable', False)]
+
+async def send_request(application):
+    """
+    Send a GET request to the benchmarked view.
+
+    Args:
+        application (ASGIHandler): The ASGI application.
+
+    Returns:
+        int: The status code of the response.
+    """
+
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/upstream/',
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+    }
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(60)
+    await communicator.receive_output(60)
+    return start['status']
+
+async def send_burst(application, concurrency):
+    """
+    Send concurrent requests to the benchmarked view.
+
+    Args:
+        application (ASGIHandler): The ASGI application.
+        concurrency (int): Number of requests in flight.
+
+    Returns:
+        tuple: The duration in milliseconds and the peak number of threads.
+    """
+
+    peak = threading.active_count()
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    watcher = asyncio.ensure_future(watch())
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*[send_request(application) for _ in range(concurrency)])
+    elapsed = (time.perf_counter() - started) * 1000
+    watcher.cancel()
+    assert set(statuses) == {200}, statuses
+    return elapsed, peak
+
+def bench_chain(middleware, concurrency):
+    """
+    Benchmark a middleware chain.
+
+    Args:
+        middleware (list): Dotted paths of the middleware.
+        concurrency (int): Number of requests in flight.
+
+    Returns:
+        tuple: The duration in milliseconds and the peak number of threads.
+    """
+
+    with override_settings(MIDDLEWARE=middleware, ROOT_URLCONF=__name__, ALLOWED_HOSTS=['localhost']):
+        application = ASGIHandler()
+        return asyncio.run(send_burst(application, concurrency))
+
+def run():
+    """
+    Benchmark the configured and the async-only middleware chains and print the results.
+    """
+
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--latency', type=float, default=100, help='milliseconds awaited by the view')
+    parser.add_argument('--concurrency', type=int, default=200, help='number of requests in flight')
+    options = parser.parse_args()
+    LATENCY = options.latency
+
+    sync_only = get_sync_only(settings.MIDDLEWARE)
+    print('sync-only middleware: ' + (', '.join(sync_only) or 'none'))
+    chains = {
+        'configured': list(settings.MIDDLEWARE),
+        'async only': [name for name in settings.MIDDLEWARE if name not in sync_only],
+    }
+    for name, middleware in chains.items():
+        elapsed, peak = bench_chain(middleware, options.concurrency)
+        print(f'{name:<10}  {options.concurrency} requests  {elapsed:8.1f} ms  peak {peak} threads')
+
+
+if __name__ == '__main__':
+    run()
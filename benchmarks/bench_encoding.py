@@ -0,0 +1,125 @@
+"""
+Benchmark the binary encoding of chart columns against plain JSON number lists.
+
+Run from the project root:
+
+    python -m benchmarks.bench_encoding
+
+For each series length, a line chart is embedded with components() from
+Python lists, from int32/float64 arrays and from the int16/float32 arrays the
+charts use, and the columns are encoded for the JSON data endpoints the same
+three ways. Reported are the payload sizes and the server encoding times.
+
+Base64 spends 4/3 bytes per buffer byte, so float64 values rounded to 2 decimal
+digits take more room than their JSON text; float32 brings the payload below it.
+"""
+
+# Import json for encoding the data endpoint payloads
+import json
+# Import timeit for timing the encodings
+import timeit
+
+# Import Bokeh for embedding the charts
+from bokeh.embed import components
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+# Import transform_column_source_data for the binary data endpoint encoding
+from bokeh.util.serialization import transform_column_source_data
+# Import numpy for generating columns
+import numpy as np
+
+
+# Number of timed runs per case
+REPEAT = 5
+# Series lengths: the former CPI window, a few years of daily closes, the full SP500 history and a long series
+SIZES = [12, 1000, 6500, 100000]
+
+
+def make_columns(size):
+    """
+    Build the x and y columns of a line chart in the three benchmarked encodings.
+
+    Args:
+        size (int): Number of points.
+
+    Returns:
+        dict: The columns as lists, as int32/float64 arrays and as int16/float32 arrays.
+    """
+
+    rng = np.random.default_rng(2000)
+    wide = {'x': np.arange(size, dtype='int32'), 'y': np.round(rng.normal(2, 1.5, size), 2)}
+    return {
+        'lists': {key: value.tolist() for key, value in wide.items()},
+        'float64': wide,
+        'float32': {'x': wide['x'].astype('int16'), 'y': wide['y'].astype('float32')}
+    }
+
+def encode(columns):
+    """
+    Encode columns as the JSON data endpoints do.
+
+    Args:
+        columns (dict): The columns of the chart source.
+
+    Returns:
+        str: The JSON payload.
+    """
+
+    return json.dumps(transform_column_source_data(columns), separators=(',', ':'))
+
+def embed(columns):
+    """
+    Embed a line chart of the given columns.
+
+    Args:
+        columns (dict): The columns of the chart source.
+
+    Returns:
+        str: The script of the embedded chart.
+    """
+
+    fig = figure()
+    fig.line(source=ColumnDataSource(data=columns), x='x', y='y')
+    script, div = components(fig)
+    return script
+
+def time_call(function, number):
+    """
+    Time a call and return the best time per call.
+
+    Args:
+        function (callable): Called without arguments.
+        number (int): Number of calls per timed run.
+
+    Returns:
+        float: The best time per call, in seconds.
+    """
+
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+def run():
+    """
+    Measure payload sizes and encoding times for every series length and print the results.
+    """
+
+    cases = ['lists', 'float64', 'float32']
+    print(f'{"points":>7}  {"case":<16}' + ''.join(f'{case:>12}' for case in cases))
+    for size in SIZES:
+        columns = make_columns(size)
+        number = 20 if size <= 1000 else max(1, 20000 // size)
+
+        # Embedded chart script
+        sizes = [len(embed(columns[case])) for case in cases]
+        print(f'{size:>7}  {"script bytes":<16}' + ''.join(f'{x:>12}' for x in sizes))
+        times = [time_call(lambda: embed(columns[case]), number) for case in cases]
+        print(f'{size:>7}  {"components() ms":<16}' + ''.join(f'{x * 1e3:>12.2f}' for x in times))
+
+        # Data endpoint payload
+        sizes = [len(encode(columns[case])) for case in cases]
+        print(f'{size:>7}  {"endpoint bytes":<16}' + ''.join(f'{x:>12}' for x in sizes))
+        times = [time_call(lambda: encode(columns[case]), number * 10) for case in cases]
+        print(f'{size:>7}  {"endpoint ms":<16}' + ''.join(f'{x * 1e3:>12.3f}' for x in times))
+
+
+if __name__ == '__main__':
+    run()
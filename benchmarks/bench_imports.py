@@ -0,0 +1,80 @@
+"""
+Report the import cost of a worker booting the project, with and without the chart engines.
+
+Run from the project root:
+
+    python -m benchmarks.bench_imports
+
+Each case runs in a fresh interpreter under python -X importtime:
+
+- boot: django.setup() and the URLconf, which is what a worker serving the home
+  page or an error page loads now that views reach the charts through htmx.engines;
+- engines: boot followed by htmx.engines.load(), which is what a worker loads on its
+  first chart request, and what every worker loaded at boot before the facade.
+
+Reported are the wall time and peak RSS of each interpreter and the modules
+costing the most cumulative import time.
+"""
+
+# Import os for passing the Django settings to the interpreters
+import os
+# Import re for parsing the -X importtime report
+import re
+# Import subprocess for running fresh interpreters
+import subprocess
+# Import sys for the interpreter path
+import sys
+
+
+# Number of runs per case, the fastest one is reported
+REPEAT = 3
+# Number of modules listed per case
+TOP = 8
+# Python code of every case, printing the peak RSS in kilobytes
+CASES = {
+    'boot': 'import django; django.setup(); import gini.urls',
+    'engines': 'import django; django.setup(); import gini.urls; from htmx import engines; engines.load()',
+}
+# Prints the wall time and peak RSS of the interpreter, after the case code
+REPORT = '; import resource, time; print(time.perf_counter() - STARTED, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+# A line of the -X importtime report: self and cumulative microseconds, then the indented module name
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_case(code):
+    """
+    Run a case in a fresh interpreter under -X importtime.
+
+    Args:
+        code (str): The Python code of the case.
+
+    Returns:
+        tuple: The wall time in seconds, the peak RSS in kilobytes, and the cumulative import
+            time of every top-level import in microseconds, keyed by module.
+    """
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='gini.settings', SECRET_KEY=os.environ.get('SECRET_KEY', 'benchmark'))
+    program = 'import time; STARTED = time.perf_counter(); ' + code + REPORT
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', program], env=env, capture_output=True, text=True, check=True)
+    elapsed, rss = result.stdout.split()
+    imports = {}
+    for match in IMPORT_LINE.finditer(result.stderr):
+        # Only imports made directly by the case, nested ones are part of their cumulative time
+        if len(match.group(3)) == 1:
+            imports[match.group(4)] = imports.get(match.group(4), 0) + int(match.group(2))
+    return float(elapsed), int(rss), imports
+
+def run():
+    """
+    Run every case and print the results.
+    """
+
+    for name, code in CASES.items():
+        elapsed, rss, imports = min((run_case(code) for _ in range(REPEAT)), key=lambda result: result[0])
+        print(f'{name:<8} {elapsed * 1e3:8.1f} ms  peak RSS {rss / 1024:6.1f} MiB  imports {sum(imports.values()) / 1e3:8.1f} ms')
+        for module, cumulative in sorted(imports.items(), key=lambda item: -item[1])[:TOP]:
+            print(f'           {cumulative / 1e3:8.1f} ms  {module}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,93 @@
+"""
+Benchmark the streaming FRED text parser against the former BeautifulSoup path.
+
+Run from the project root:
+
+    python -m benchmarks.bench_parser
+
+The former path only scanned for one year and kept its raw text, while the
+streaming parser converts every observation to typed arrays. The former path
+needs beautifulsoup4 and lxml, which are no longer project requirements; it is
+skipped when they are not installed.
+"""
+
+# Import datetime for generating observation dates
+import datetime
+# Import find_spec for checking the optional packages of the former path
+from importlib.util import find_spec
+# Import timeit for timing both parsing paths
+import timeit
+
+# Import the streaming parser
+from htmx.parsers import parse_fred_text
+
+
+# Number of timed runs per case
+REPEAT = 5
+# Header of a FRED plain-text data file
+HEADER = """Title:               GINI Index for France
+Series ID:           SIPOVGINIFRA
+Frequency:           Annual
+Notes:               Synthetic benchmark file.
+
+DATE          VALUE
+"""
+
+
+def make_text(size):
+    """
+    Build a FRED plain-text data file with the given number of daily observations.
+
+    Args:
+        size (int): Number of observations.
+
+    Returns:
+        str: The file contents.
+    """
+
+    first = datetime.date(2000, 1, 1)
+    rows = [f'{first + datetime.timedelta(days=x)}     {30 + x % 10}.{x % 7}' for x in range(size)]
+    return HEADER + '\n'.join(rows) + '\n'
+
+def parse_with_soup(text, year):
+    """
+    The former GiniIndex.get_data parsing: build a DOM, then scan every line for the year.
+
+    Args:
+        text (str): The file contents.
+        year (int): The year to look up.
+
+    Returns:
+        str: The last four characters of the last matching line.
+    """
+
+    from bs4 import BeautifulSoup as bs
+
+    result = None
+    for line in bs(text, "lxml").text.split('\n'):
+        if str(year) in line:
+            result = line.rstrip()[-4:]
+    return result
+
+def run():
+    """
+    Time both parsing paths for small and large files and print the results.
+    """
+
+    # The former path parses with the lxml backend of BeautifulSoup, so both must be installed
+    missing = [name for name in ['bs4', 'lxml'] if find_spec(name) is None]
+    if missing:
+        print(f"BeautifulSoup path skipped, {', '.join(missing)} not installed")
+
+    for size in [40, 6500]:
+        text = make_text(size)
+        number = max(1, 20000 // size)
+        streaming = min(timeit.repeat(lambda: parse_fred_text(text.splitlines()), number=number, repeat=REPEAT)) / number
+        print(f'{size:>6} observations  streaming parser  {streaming * 1e6:10.1f} us')
+        if not missing:
+            soup = min(timeit.repeat(lambda: parse_with_soup(text, 2010), number=number, repeat=REPEAT)) / number
+            print(f'{size:>6} observations  BeautifulSoup     {soup * 1e6:10.1f} us  (streaming speedup {soup / streaming:.2f}x)')
+
+
+if __name__ == '__main__':
+    run()
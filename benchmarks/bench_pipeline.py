@@ -0,0 +1,331 @@
+"""
+Benchmark the chart pipelines and views offline, replaying recorded FRED responses.
+
+Run from the project root:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/<earlier run>.json
+
+FRED requests go through ReplayAdapter (see benchmarks/fred_replay.py) on the
+shared upstream session, against a throwaway test database. Every ticker of the
+inputs of GiniIndex, CpiIndex and StockIndex is benchmarked:
+
+- the context builders GiniIndex.get_context, CpiIndex.get_cpi_context and
+  StockIndex.get_stock_context, from an empty store (cold), from a stale store
+  revalidated with 304 responses (stale) and from a fresh store (warm), each run
+  broken down into the stages timed by htmx.timing;
+- whole views through the Django test client, reporting requests per second
+  and latency quantiles once the store and caches are warm.
+
+Results are written to benchmarks/results as JSON, along with the commit and
+library versions, so that runs can be compared over time.
+"""
+
+# Import argparse for reading the command line options
+import argparse
+# Import datetime for naming result files
+import datetime
+# Import json for writing and reading results
+import json
+# Import os for configuring Django
+import os
+# Import platform for describing the machine
+import platform
+# Import statistics for summarizing timed runs
+import statistics
+# Import subprocess for reading the benchmarked commit
+import subprocess
+# Import tempfile for a throwaway hexbin directory
+import tempfile
+# Import time for timing runs
+import time
+
+# Import django for loading the project before importing the utilities
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+django.setup()
+
+# Import bokeh, numpy and pandas for reporting their versions
+import bokeh
+import numpy as np
+import pandas as pd
+# Import caches and connection for resetting state and creating the test database
+from django.core.cache import caches
+from django.db import connection
+# Import Client for requesting whole views
+from django.test import Client
+# Import override_settings and setup_test_environment for a benchmark configuration
+from django.test.utils import override_settings, setup_test_environment
+
+# Import the replay transport
+from benchmarks.fred_replay import FRED_URL, ReplayAdapter, load_fixtures
+# Import the models backing the series store
+from htmx.models import Series
+# Import the stage collector of the request timings
+from htmx.timing import get_stage_totals, request_timings
+# Import the chart classes, the shared session and the Gini panel
+from htmx.utilities import CpiIndex, GiniIndex, StockIndex, fred_session, gini_panel
+
+
+# Number of timed runs per context scenario
+REPEAT = 5
+# Number of requests per view
+REQUESTS = 50
+# Directory of the result files
+RESULTS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# Gini year of the context and view benchmarks
+GINI_YEAR = 2010
+
+
+def clear_caches():
+    """
+    Drop the rendered charts, the upstream validators and the Gini panel.
+    """
+
+    caches['charts'].clear()
+    caches['default'].clear()
+    gini_panel.clear()
+
+def reset_store():
+    """
+    Empty the series store and every cache, as on a first deployment.
+    """
+
+    Series.objects.all().delete()
+    clear_caches()
+
+def expire_store():
+    """
+    Mark every stored series as stale, keeping the upstream validators and rendered charts.
+    """
+
+    Series.objects.update(fetched_at=None)
+    gini_panel.clear()
+
+def time_run(function):
+    """
+    Time one call and collect the stages it ran.
+
+    Args:
+        function (callable): Called without arguments.
+
+    Returns:
+        tuple: The duration and the total duration of every stage, in milliseconds.
+    """
+
+    timings = []
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        function()
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        request_timings.reset(token)
+    return elapsed, get_stage_totals(timings)
+
+def summarize(runs):
+    """
+    Summarize timed runs.
+
+    Args:
+        runs (list): Pairs of duration and stage totals, as returned by time_run.
+
+    Returns:
+        dict: The median, minimum and maximum durations, and the median duration of every stage.
+    """
+
+    durations = [duration for duration, stages in runs]
+    names = []
+    for duration, stages in runs:
+        names += [name for name in stages if name not in names]
+    return {
+        'runs': len(runs),
+        'median_ms': round(statistics.median(durations), 3),
+        'min_ms': round(min(durations), 3),
+        'max_ms': round(max(durations), 3),
+        'stages': {name: round(statistics.median([stages.get(name, 0.0) for duration, stages in runs]), 3) for name in names}
+    }
+
+def get_contexts():
+    """
+    List the context builders of every ticker in the inputs of the chart classes.
+
+    Returns:
+        dict: Callables building a chart context from the store, keyed by benchmark name.
+    """
+
+    contexts = {f'GiniIndex.get_context[{GINI_YEAR}]': lambda: GiniIndex(year=GINI_YEAR).get_context()}
+    for symbol in CpiIndex(symbol=None).inputs.values():
+        contexts[f'CpiIndex.get_cpi_context[{symbol}]'] = lambda symbol=symbol: CpiIndex(symbol=symbol).get_cpi_context()
+    for stock in StockIndex(stock='SP500').inputs.values():
+        contexts[f'StockIndex.get_stock_context[{stock}]'] = lambda stock=stock: StockIndex(stock=stock).get_stock_context()
+    return contexts
+
+def get_views():
+    """
+    List the view URLs of every ticker in the inputs of the chart classes.
+
+    Returns:
+        list: The URLs, as full pages.
+    """
+
+    urls = [f'/gini/?year={GINI_YEAR}']
+    urls += [f'/cpi/?symbol={symbol}' for symbol in CpiIndex(symbol=None).inputs.values()]
+    urls += [f'/stock/?stock={stock}' for stock in StockIndex(stock='SP500').inputs.values()]
+    return urls
+
+def bench_contexts(repeat):
+    """
+    Time every context builder from a cold, stale and warm store.
+
+    Args:
+        repeat (int): Number of timed runs per scenario.
+
+    Returns:
+        dict: Summaries keyed by benchmark name, then by scenario.
+    """
+
+    results = {}
+    for name, build in get_contexts().items():
+        scenarios = {'cold': [], 'stale': [], 'warm': []}
+        for _ in range(repeat):
+            reset_store()
+            scenarios['cold'].append(time_run(build))
+            expire_store()
+            scenarios['stale'].append(time_run(build))
+            scenarios['warm'].append(time_run(build))
+        results[name] = {scenario: summarize(runs) for scenario, runs in scenarios.items()}
+        print(f'{name:<44}' + ''.join(f'{scenario:>7} {summary["median_ms"]:9.2f} ms' for scenario, summary in results[name].items()))
+    return results
+
+def bench_views(requests):
+    """
+    Request every view through the Django test client once the store and caches are warm.
+
+    Args:
+        requests (int): Number of timed requests per view.
+
+    Returns:
+        dict: Throughput, latency quantiles and median stage durations keyed by URL.
+    """
+
+    client = Client()
+    results = {}
+    for url in get_views():
+        # Fill the store and the render cache before timing
+        client.get(url)
+        runs = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            # Read the stages back from the Server-Timing header of the response
+            stages = {}
+            for metric in response['Server-Timing'].split(', '):
+                metric_name, duration = metric.split(';dur=')
+                if metric_name != 'total':
+                    stages[metric_name] = float(duration)
+            runs.append((elapsed, stages))
+        durations = np.array([duration for duration, stages in runs])
+        summary = summarize(runs)
+        summary.update({
+            'status': response.status_code,
+            'requests_per_second': round(1000 * len(durations) / durations.sum(), 1),
+            'p50_ms': round(float(np.percentile(durations, 50)), 3),
+            'p99_ms': round(float(np.percentile(durations, 99)), 3)
+        })
+        results[url] = summary
+        print(f'{url:<44}{summary["requests_per_second"]:10.1f} req/s  p50 {summary["p50_ms"]:8.2f} ms  p99 {summary["p99_ms"]:8.2f} ms')
+    return results
+
+def get_metadata(synthetic, adapter):
+    """
+    Describe the benchmarked code, libraries, machine and fixtures.
+
+    Args:
+        synthetic (list): Names of the fixtures replayed from synthetic files.
+        adapter (ReplayAdapter): The replay transport, counting the upstream requests.
+
+    Returns:
+        dict: The run metadata.
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'versions': {'django': django.__version__, 'bokeh': bokeh.__version__, 'numpy': np.__version__, 'pandas': pd.__version__},
+        'synthetic_fixtures': synthetic,
+        'upstream_responses': {str(status): count for status, count in sorted(adapter.requests.items())}
+    }
+
+def compare(results, path):
+    """
+    Print the median durations of this run against an earlier result file.
+
+    Args:
+        results (dict): The results of this run.
+        path (str): The earlier result file.
+    """
+
+    with open(path) as previous_file:
+        previous = json.load(previous_file)
+    print(f'\nCompared with {path} (commit {previous["metadata"]["commit"]}):')
+    for section in ['contexts', 'views']:
+        for name, current in results[section].items():
+            before = previous[section].get(name)
+            if before is None:
+                continue
+            pairs = current.items() if section == 'contexts' else [('view', current)]
+            for scenario, summary in pairs:
+                old = before[scenario]['median_ms'] if section == 'contexts' else before['median_ms']
+                if old:
+                    print(f'{name:<44}{scenario:>7} {old:9.2f} -> {summary["median_ms"]:9.2f} ms  ({summary["median_ms"] / old:5.2f}x)')
+
+def run():
+    """
+    Run every benchmark against a throwaway test database, then save and print the results.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='timed runs per context scenario')
+    parser.add_argument('--requests', type=int, default=REQUESTS, help='timed requests per view')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    parser.add_argument('--output', help='result file, defaults to a timestamped file in benchmarks/results')
+    options = parser.parse_args()
+
+    fixtures, synthetic = load_fixtures()
+    if synthetic:
+        print(f'No recording of {", ".join(synthetic)}: replaying synthetic files (record with python -m benchmarks.fred_replay)\n')
+    adapter = ReplayAdapter(fixtures)
+    fred_session.mount(FRED_URL, adapter)
+
+    setup_test_environment()
+    database = connection.creation.create_test_db(verbosity=0)
+    try:
+        with tempfile.TemporaryDirectory() as root, override_settings(HEXBIN_ROOT=root):
+            results = {'contexts': bench_contexts(options.repeat)}
+            print()
+            results['views'] = bench_views(options.requests)
+    finally:
+        connection.creation.destroy_test_db(database, verbosity=0)
+    results['metadata'] = get_metadata(synthetic, adapter)
+
+    os.makedirs(RESULTS_ROOT, exist_ok=True)
+    path = options.output or os.path.join(RESULTS_ROOT, f'pipeline-{datetime.datetime.now():%Y%m%d-%H%M%S}.json')
+    with open(path, 'w') as result_file:
+        json.dump(results, result_file, indent=2)
+    print(f'\nResults saved to {path}')
+    if options.compare:
+        compare(results, options.compare)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,89 @@
+"""
+Benchmark the NumPy return split of StockIndex against the former list-based path.
+
+Run from the project root:
+
+    python -m benchmarks.bench_returns
+
+Prices are a synthetic random walk the length of the full SP500 history on FRED,
+with the same share of missing closes.
+"""
+
+# Import os for configuring Django
+import os
+# Import timeit for timing both paths
+import timeit
+
+# Import django for loading the project before importing the utilities
+import django
+# Import numpy for generating prices
+import numpy as np
+# Import pandas for the former path
+import pandas as pd
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+django.setup()
+
+# Import the vectorized split
+from htmx.utilities import split_returns
+
+
+# Number of timed runs
+REPEAT = 5
+# Daily observations since 2000, as fetched by StockIndex
+SIZE = 6500
+
+
+def make_closes(size):
+    """
+    Build a random walk of closing prices with about 4% missing closes.
+
+    Args:
+        size (int): Number of observations.
+
+    Returns:
+        numpy.ndarray: The closing prices.
+    """
+
+    rng = np.random.default_rng(2000)
+    closes = 1400 * np.cumprod(1 + rng.normal(0, 0.012, size))
+    closes[rng.random(size) < 0.04] = np.nan
+    return closes
+
+def split_with_lists(closes):
+    """
+    The former StockIndex.get_stock_context path: pct_change, tolist and four list comprehensions.
+
+    Args:
+        closes (numpy.ndarray): The closing prices.
+
+    Returns:
+        tuple: Arrays of positive and negative returns.
+    """
+
+    df = pd.DataFrame({'SP500': closes})
+    df['pct_change'] = df.pct_change() * 100
+    result = df['pct_change'].values.tolist()
+    positive_return = np.array([x for x in result if x >= 0])[:1000]
+    negative_return = np.array([x for x in result if x < 0])[:1000]
+    if len(positive_return) > len(negative_return):
+        positive_return = np.array([x for x in result if x >= 0])[:(len(negative_return))]
+    else:
+        negative_return = np.array([x for x in result if x < 0])[:(len(positive_return))]
+    return positive_return, negative_return
+
+def run():
+    """
+    Time both paths on a full-history price series and print the results.
+    """
+
+    closes = make_closes(SIZE)
+    number = 200
+    vectorized = min(timeit.repeat(lambda: split_returns(closes), number=number, repeat=REPEAT)) / number
+    lists = min(timeit.repeat(lambda: split_with_lists(closes), number=number, repeat=REPEAT)) / number
+    print(f'{SIZE} closes  NumPy masks  {vectorized * 1e6:10.1f} us')
+    print(f'{SIZE} closes  lists        {lists * 1e6:10.1f} us  (NumPy speedup {lists / vectorized:.1f}x)')
+
+
+if __name__ == '__main__':
+    run()
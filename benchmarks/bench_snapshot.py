@@ -0,0 +1,156 @@
+"""
+Benchmark the cross-sectional snapshot engine on synthetic families of 6 to 500 countries.
+
+Run from the project root:
+
+    python -m benchmarks.bench_snapshot
+
+Every family is stored in a throwaway test database as annual series, then compared
+in one year through htmx.utilities.CrossSection:
+
+- fresh: the panel is rebuilt from a fresh store, which is what a worker does on its
+  first request for the family;
+- stale: every series is stale and downloaded again by a fake fetch sleeping
+  --latency milliseconds, through the fetch engine and its bounded concurrency;
+- warm: the year is read from the built panel.
+
+Reported are the median duration and the number of database queries of each case.
+"""
+
+# Import argparse for reading the command line options
+import argparse
+# Import os for configuring Django
+import os
+# Import statistics for summarizing timed runs
+import statistics
+# Import time for timing runs and faking upstream latency
+import time
+
+# Import django for loading the project before importing the utilities
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+django.setup()
+
+# Import numpy and pandas for building synthetic series
+import numpy as np
+import pandas as pd
+# Import connection for creating the test database and counting queries
+from django.db import connection
+# Import CaptureQueriesContext for counting queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+# Import IndicatorGroup for building synthetic families
+from htmx.indicators import IndicatorGroup
+# Import the models backing the series store
+from htmx.models import Series
+# Import the series store
+from htmx.store import series_store
+# Import the snapshot engine
+from htmx.utilities import CrossSection, SnapshotPanel
+
+
+# Numbers of countries of the benchmarked families
+SIZES = (6, 50, 250, 500)
+# Number of timed runs per case
+REPEAT = 5
+# Years of every synthetic series
+YEARS = 60
+# Year compared
+YEAR = 2010
+
+
+def make_group(size):
+    """
+    Build a synthetic family and store its series.
+
+    Args:
+        size (int): Number of countries.
+
+    Returns:
+        IndicatorGroup: The family.
+    """
+
+    group = IndicatorGroup(f'bench{size}', {f'COUNTRY {index:03d}': f'C{index:03d}' for index in range(size)}, template='BENCH{code}')
+    index = pd.date_range('1965-01-01', periods=YEARS, freq='AS', name='DATE')
+    generator = np.random.default_rng(size)
+    for series_id in group.series_ids.values():
+        series_store.save(series_id, pd.Series(generator.uniform(20, 60, YEARS), index=index, name=series_id))
+    return group
+
+def time_case(function, setup):
+    """
+    Time a case.
+
+    Args:
+        function (callable): The timed call.
+        setup (callable): Called before every run, untimed.
+
+    Returns:
+        tuple: The median duration in milliseconds and the number of queries of the last run.
+    """
+
+    durations = []
+    for _ in range(REPEAT):
+        setup()
+        # Keep the query log below its limit, which would make the count wrap
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            function()
+            durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations), len(queries)
+
+def bench_size(size, latency):
+    """
+    Benchmark the fresh, stale and warm cases of a family.
+
+    Args:
+        size (int): Number of countries.
+        latency (float): Milliseconds slept by every fake download.
+
+    Returns:
+        dict: Median duration and query count of every case.
+    """
+
+    group = make_group(size)
+    panel = SnapshotPanel()
+    section = CrossSection(group, YEAR, panel=panel)
+
+    def fetch(series_id, start):
+        time.sleep(latency / 1000)
+        # Nothing changed upstream, like a revalidation answered with 304
+        return pd.Series([], index=pd.DatetimeIndex([], name='DATE'), dtype='float64', name=series_id)
+
+    def expire():
+        panel.clear()
+        Series.objects.filter(series_id__in=section.get_series_ids()).update(fetched_at=None)
+
+    results = {'fresh': time_case(section.get_results, panel.clear)}
+    section.get_fetch = lambda: fetch
+    results['stale'] = time_case(section.get_results, expire)
+    results['warm'] = time_case(section.get_results, lambda: None)
+    return results
+
+def run():
+    """
+    Benchmark every family size against a throwaway test database and print the results.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--latency', type=float, default=50, help='milliseconds slept by every fake download')
+    options = parser.parse_args()
+
+    setup_test_environment()
+    database = connection.creation.create_test_db(verbosity=0)
+    try:
+        for size in SIZES:
+            results = bench_size(size, options.latency)
+            print(f'{size:>4} countries  ' + '  '.join(f'{case} {elapsed:8.1f} ms {queries:>4} queries' for case, (elapsed, queries) in results.items()))
+    finally:
+        connection.creation.destroy_test_db(database, verbosity=0)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,197 @@
+"""
+A local stand-in for the FRED file server, for load testing without touching FRED.
+
+Serve the recorded fixtures (see benchmarks/fred_replay.py) from the project root:
+
+    python -m benchmarks.fake_fred --port 8001 --latency 200 --jitter 100 --failure-rate 0.05
+
+and point the application at it with FRED_URL=http://127.0.0.1:8001/. The
+plain-text SIPOVGINI*.txt data files are served under /data/ and the
+pandas-datareader CSV files under /graph/fredgraph.csv, answering 304 to
+If-None-Match like FRED does. In tests, FakeFredServer is used as a context
+manager on a free port.
+"""
+
+# Import argparse for reading the command line options
+import argparse
+# Import os for configuring Django
+import os
+# Import random for latency jitter and failures
+import random
+# Import threading for serving in the background
+import threading
+# Import time for simulating upstream latency
+import time
+# Import ThreadingHTTPServer and BaseHTTPRequestHandler for serving the files
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import the fixtures and their responses shared with the replay transport
+from benchmarks.fred_replay import get_fixture_response, load_fixtures
+
+
+class FakeFredHandler(BaseHTTPRequestHandler):
+    """
+    Answer FRED file requests from the fixtures of the server.
+    """
+
+    # Keep connections alive, like FRED does for pooled sessions
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """
+        Serve a fixture after the configured latency, or fail with 503 at the configured rate.
+        """
+
+        server = self.server
+        delay, failed = server.draw()
+        time.sleep(delay)
+        if failed:
+            status, headers, body = 503, {'Content-Length': '0'}, b''
+        else:
+            status, headers, body = get_fixture_response(server.fixtures, self.path, self.headers.get('If-None-Match'))
+        server.count(status)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Log requests only when the server is verbose.
+        """
+
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeFredServer(ThreadingHTTPServer):
+    # Do not wait for in-flight requests when shutting down
+    daemon_threads = True
+
+    def __init__(self, fixtures, host='127.0.0.1', port=0, latency=0, jitter=0, failure_rate=0, seed=None, verbose=False):
+        """
+        Initialize FakeFredServer, listening immediately.
+
+        Args:
+            fixtures (dict): The file contents keyed by fixture name.
+            host (str): The interface to listen on.
+            port (int): The port to listen on, 0 for a free port.
+            latency (float): Milliseconds every response is delayed by.
+            jitter (float): Up to this many milliseconds are added at random to the latency.
+            failure_rate (float): Share of requests answered with 503, between 0 and 1.
+            seed (int): Seed of the jitter and failures, for reproducible runs.
+            verbose (bool): Whether to log every request.
+        """
+
+        super().__init__((host, port), FakeFredHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.random = random.Random(seed)
+        # Number of requests answered, keyed by status code
+        self.requests = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        Base URL of the server, to be used as the FRED_URL setting.
+        """
+
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def draw(self):
+        """
+        Draw the delay of a response and whether it fails.
+
+        Returns:
+            tuple: The delay in seconds and True if the request fails.
+        """
+
+        with self.lock:
+            delay = (self.latency + self.random.uniform(0, self.jitter)) / 1000
+            return delay, self.random.random() < self.failure_rate
+
+    def count(self, status):
+        """
+        Count an answered request.
+
+        Args:
+            status (int): The status code of the response.
+        """
+
+        with self.lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+
+    def start(self):
+        """
+        Serve in a background thread.
+
+        Returns:
+            FakeFredServer: The same server.
+        """
+
+        self.thread = threading.Thread(target=self.serve_forever, name='fake-fred', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def run():
+    """
+    Serve the recorded fixtures until interrupted, then print the responses by status.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--host', default='127.0.0.1', help='interface to listen on')
+    parser.add_argument('--port', type=int, default=8001, help='port to listen on')
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds every response is delayed by')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many milliseconds added at random to the latency')
+    parser.add_argument('--failure-rate', type=float, default=0, help='share of requests answered with 503, between 0 and 1')
+    parser.add_argument('--seed', type=int, help='seed of the jitter and failures')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    options = parser.parse_args()
+
+    fixtures, synthetic = load_fixtures()
+    if synthetic:
+        print(f'No recording of {len(synthetic)} series, serving synthetic files instead')
+    server = FakeFredServer(fixtures, host=options.host, port=options.port, latency=options.latency,
+                            jitter=options.jitter, failure_rate=options.failure_rate, seed=options.seed,
+                            verbose=options.verbose)
+    print(f'Serving FRED files at {server.url}, run the application with FRED_URL={server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f'Responses by status: {server.requests}')
+
+
+if __name__ == '__main__':
+    # Import django for loading the indicator registry behind the fixtures
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+    django.setup()
+    run()
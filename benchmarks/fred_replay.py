@@ -0,0 +1,261 @@
+"""
+Record FRED responses and replay them through the shared upstream session.
+
+Record every series charted by the application while FRED is reachable:
+
+    python -m benchmarks.fred_replay
+
+Responses are written to benchmarks/fixtures/fred as <series>.csv for the
+fredgraph CSV files and <series>.txt for the plain-text data files, exactly as
+they were downloaded. ReplayAdapter serves them for the FRED host, so the
+benchmarks run the real fetch, parse and store code without network access.
+
+Series that were never recorded are replayed from synthetic files in the same
+formats, with the history length and sampling of the real series, so that the
+benchmarks also run in a fresh checkout.
+"""
+
+# Import datetime for generating observation dates
+import datetime
+# Import hashlib for deriving the entity tags of replayed files
+import hashlib
+# Import io for the raw body of replayed responses
+import io
+# Import os for locating the fixture files
+import os
+# Import urlparse and parse_qs for mapping request URLs to fixtures
+from urllib.parse import parse_qs, urlparse
+
+# Import numpy for generating synthetic observations
+import numpy as np
+# Import requests for building replayed responses
+import requests
+# Import BaseAdapter for serving fixtures through a requests session
+from requests.adapters import BaseAdapter
+# Import CaseInsensitiveDict for the headers of replayed responses
+from requests.structures import CaseInsensitiveDict
+
+
+# Directory of the recorded FRED responses
+FIXTURE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fred')
+# Host of the FRED files
+FRED_URL = 'https://fred.stlouisfed.org/'
+# Last day of the synthetic series, fixed so that runs are comparable
+SYNTHETIC_END = datetime.date(2024, 12, 31)
+# First observation of the synthetic daily stock series, following their history on FRED
+STOCK_STARTS = {
+    'SP500': datetime.date(2014, 12, 31),
+    'DJIA': datetime.date(2014, 12, 31),
+    'NASDAQ100': datetime.date(1986, 1, 2),
+    'WILL5000PR': datetime.date(1970, 12, 31),
+    'WILLREITIND': datetime.date(1977, 12, 30)
+}
+
+
+def get_fixture_names():
+    """
+    List the fixture files of every series in the indicator registry.
+
+    Returns:
+        list: File names, <series>.txt for the series read from text files and <series>.csv for the others.
+    """
+
+    # Import the registry only when needed, since it requires configured Django settings
+    from htmx.indicators import indicators
+
+    extensions = {'text': 'txt', 'csv': 'csv'}
+    return [f'{series_id}.{extensions[group.format]}' for series_id, (group, code) in indicators.series.items()]
+
+def get_fixture_url(name):
+    """
+    Get the FRED URL a fixture file is downloaded from.
+
+    Args:
+        name (str): The fixture file name.
+
+    Returns:
+        str: The URL, without the API key.
+    """
+
+    series_id, kind = os.path.splitext(name)
+    if kind == '.txt':
+        return f'{FRED_URL}data/{series_id}.txt'
+    return f'{FRED_URL}graph/fredgraph.csv?id={series_id}'
+
+def get_fixture_name(url):
+    """
+    Map a FRED request URL to its fixture file.
+
+    Args:
+        url (str): The requested URL.
+
+    Returns:
+        str: The fixture file name, or None if the URL is not a FRED series file.
+    """
+
+    parsed = urlparse(url)
+    if parsed.path == '/graph/fredgraph.csv':
+        series_id = parse_qs(parsed.query).get('id', [None])[0]
+        return f'{series_id}.csv' if series_id else None
+    if parsed.path.startswith('/data/') and parsed.path.endswith('.txt'):
+        return parsed.path[len('/data/'):]
+    return None
+
+def make_synthetic(name):
+    """
+    Build a synthetic FRED file with the sampling and history length of the real series.
+
+    Args:
+        name (str): The fixture file name.
+
+    Returns:
+        bytes: The file contents.
+    """
+
+    series_id, kind = os.path.splitext(name)
+    # Seed from the name, so that every run replays the same file
+    rng = np.random.default_rng(int(hashlib.md5(name.encode()).hexdigest()[:8], 16))
+    if kind == '.txt':
+        # Annual Gini Index since 1963, with the gaps of survey years
+        dates = [datetime.date(year, 1, 1) for year in range(1963, SYNTHETIC_END.year)]
+        values = 30 + np.cumsum(rng.normal(0, 0.4, len(dates)))
+        missing = rng.random(len(dates)) < 0.4
+        rows = [f'{date}     {"." if gap else f"{value:.1f}"}' for date, value, gap in zip(dates, values, missing)]
+        header = f'Title:               GINI Index\nSeries ID:           {series_id}\nFrequency:           Annual\nNotes:               Synthetic benchmark file.\n\nDATE          VALUE\n'
+        return (header + '\n'.join(rows) + '\n').encode()
+
+    if series_id in STOCK_STARTS:
+        # Daily closes on business days, missing on about 4% of them like market holidays
+        dates = np.arange(np.datetime64(STOCK_STARTS[series_id]), np.datetime64(SYNTHETIC_END) + 1)
+        dates = dates[np.is_busday(dates)]
+        values = 1000 * np.cumprod(1 + rng.normal(0.0003, 0.012, len(dates)))
+        missing = rng.random(len(dates)) < 0.04
+    else:
+        # Annual CPI inflation since 1960
+        dates = np.array([np.datetime64(f'{year}-01-01') for year in range(1960, SYNTHETIC_END.year)])
+        values = np.abs(rng.normal(4, 3, len(dates)))
+        missing = np.zeros(len(dates), dtype=bool)
+    rows = [f'{date},{"." if gap else f"{value:.2f}"}' for date, value, gap in zip(dates.astype(str), values, missing)]
+    return (f'DATE,{series_id}\n' + '\n'.join(rows) + '\n').encode()
+
+def load_fixtures():
+    """
+    Read the recorded fixture of every charted series, synthesizing the missing ones.
+
+    Returns:
+        tuple: The file contents keyed by fixture name, and the names of the synthesized fixtures.
+    """
+
+    fixtures = {}
+    synthetic = []
+    for name in get_fixture_names():
+        try:
+            with open(os.path.join(FIXTURE_ROOT, name), 'rb') as fixture:
+                fixtures[name] = fixture.read()
+        except FileNotFoundError:
+            fixtures[name] = make_synthetic(name)
+            synthetic.append(name)
+    return fixtures, synthetic
+
+
+def get_fixture_response(fixtures, url, etag=None):
+    """
+    Answer a FRED request from the fixtures, honoring If-None-Match like FRED does.
+
+    Args:
+        fixtures (dict): The file contents keyed by fixture name.
+        url (str): The requested URL or path.
+        etag (str): The If-None-Match header of the request, if any.
+
+    Returns:
+        tuple: The status code, the response headers and the body: 200 with the file,
+            304 when the client holds it, or 404.
+    """
+
+    name = get_fixture_name(url)
+    body = fixtures.get(name)
+    if body is None:
+        return 404, {'Content-Length': '0'}, b''
+    headers = {
+        'ETag': '"' + hashlib.md5(body).hexdigest() + '"',
+        'Content-Type': 'text/plain' if name.endswith('.txt') else 'text/csv'
+    }
+    if etag == headers['ETag']:
+        status, body = 304, b''
+    else:
+        status = 200
+    headers['Content-Length'] = str(len(body))
+    return status, headers, body
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, fixtures):
+        """
+        Initialize ReplayAdapter, a transport answering FRED requests from fixture files.
+
+        Args:
+            fixtures (dict): The file contents keyed by fixture name.
+        """
+
+        super().__init__()
+        self.fixtures = fixtures
+        # Number of requests answered, keyed by status code
+        self.requests = {}
+
+    def send(self, request, **kwargs):
+        """
+        Answer a request with its fixture.
+
+        Args:
+            request (requests.PreparedRequest): The request.
+
+        Returns:
+            requests.Response: The response built by get_fixture_response.
+        """
+
+        status, headers, body = get_fixture_response(self.fixtures, request.url, request.headers.get('If-None-Match'))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = status
+        response.reason = requests.status_codes._codes[status][0].upper()
+        response.headers = CaseInsensitiveDict(headers)
+        # The body is already read, so streamed reads are served from it
+        response._content = body
+        response._content_consumed = True
+        response.raw = io.BytesIO(body)
+        self.requests[status] = self.requests.get(status, 0) + 1
+        return response
+
+    def close(self):
+        """
+        Nothing to release.
+        """
+
+        pass
+
+
+def record():
+    """
+    Download the file of every charted series from FRED into the fixture directory.
+    """
+
+    os.makedirs(FIXTURE_ROOT, exist_ok=True)
+    session = requests.Session()
+    params = {'api_key': os.environ.get('API_KEY'), 'file_type': 'json'}
+    for name in get_fixture_names():
+        url = get_fixture_url(name)
+        response = session.get(url, params=params if name.endswith('.txt') else None, timeout=(3.05, 30))
+        response.raise_for_status()
+        with open(os.path.join(FIXTURE_ROOT, name), 'wb') as fixture:
+            fixture.write(response.content)
+        print(f'{name:<24} {len(response.content):>10} bytes')
+
+
+if __name__ == '__main__':
+    # Import django for loading the chart classes
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+    django.setup()
+    record()
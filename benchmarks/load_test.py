@@ -0,0 +1,145 @@
+"""
+Load test the chart views at a fixed concurrency and report latency quantiles and throughput.
+
+Run the stand-in FRED server and the application, then the load test, from the project root:
+
+    python -m benchmarks.fake_fred --port 8001 --latency 200 --jitter 100 --failure-rate 0.05
+    FRED_URL=http://127.0.0.1:8001/ SERIES_STORE_MAX_AGE=5 ALLOWED_HOSTS=127.0.0.1 uvicorn gini.asgi:application --port 8000 --workers 2
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 16 --duration 30
+
+Every worker requests /gini/, /cpi/ and /stock/ for every year, symbol and stock
+of the inputs of the chart classes in turn, as full pages or as HTMX partials
+with --partial. A short SERIES_STORE_MAX_AGE keeps the stored series going stale
+during the run, so that upstream revalidation is part of the load.
+"""
+
+# Import argparse for reading the command line options
+import argparse
+# Import itertools for cycling through the view URLs
+import itertools
+# Import json for writing the results
+import json
+# Import os for configuring Django
+import os
+# Import threading for running the workers
+import threading
+# Import time for timing requests
+import time
+
+# Import django for reading the inputs of the chart classes
+import django
+# Import numpy for latency quantiles
+import numpy as np
+# Import requests for requesting the views
+import requests
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gini.settings')
+os.environ.setdefault('SECRET_KEY', 'load-test')
+django.setup()
+
+# Import the chart classes for their inputs
+from htmx.utilities import GINI_YEARS, CpiIndex, StockIndex
+
+
+def get_paths():
+    """
+    List the chart view paths of every year, symbol and stock of the chart classes.
+
+    Returns:
+        list: The paths, with their query strings.
+    """
+
+    paths = [f'/gini/?year={year}' for year in GINI_YEARS]
+    paths += [f'/cpi/?symbol={symbol}' for symbol in CpiIndex(symbol=None).inputs.values()]
+    paths += [f'/stock/?stock={stock}' for stock in StockIndex(stock='SP500').inputs.values()]
+    return paths
+
+def work(url, paths, deadline, partial, results, offset):
+    """
+    Request the views in turn until the deadline, recording every request.
+
+    Args:
+        url (str): Base URL of the application.
+        paths (list): The view paths.
+        deadline (float): Monotonic time at which to stop.
+        partial (bool): Whether to request HTMX partials.
+        results (list): Receives (view, status, latency in milliseconds) tuples.
+        offset (int): Index of the first path, so that workers do not move in lockstep.
+    """
+
+    session = requests.Session()
+    headers = {'HX-Request': 'true'} if partial else {}
+    records = []
+    for path in itertools.islice(itertools.cycle(paths), offset, None):
+        if time.monotonic() >= deadline:
+            break
+        started = time.perf_counter()
+        try:
+            status = session.get(url + path, headers=headers, timeout=60).status_code
+        except requests.exceptions.RequestException:
+            status = None
+        records.append((path.split('/')[1], status, (time.perf_counter() - started) * 1000))
+    results.extend(records)
+
+def summarize(records, elapsed):
+    """
+    Summarize the requests of one view or of the whole run.
+
+    Args:
+        records (list): (view, status, latency in milliseconds) tuples.
+        elapsed (float): Duration of the run in seconds.
+
+    Returns:
+        dict: Request and error counts, requests per second and p50/p99 latencies in milliseconds.
+    """
+
+    latencies = np.array([latency for view, status, latency in records])
+    return {
+        'requests': len(records),
+        'errors': sum(1 for view, status, latency in records if status != 200),
+        'requests_per_second': round(len(records) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1) if len(records) else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)), 1) if len(records) else None
+    }
+
+def run():
+    """
+    Drive the views at a fixed concurrency for the given duration and print the results.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='base URL of the application')
+    parser.add_argument('--concurrency', type=int, default=16, help='number of concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run for')
+    parser.add_argument('--partial', action='store_true', help='request HTMX partials instead of full pages')
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    options = parser.parse_args()
+
+    paths = get_paths()
+    results = []
+    deadline = time.monotonic() + options.duration
+    workers = [threading.Thread(target=work, args=(options.url.rstrip('/'), paths, deadline, options.partial, results, offset))
+               for offset in range(options.concurrency)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    report = {'concurrency': options.concurrency, 'seconds': round(elapsed, 1), 'all': summarize(results, elapsed)}
+    for view in sorted({view for view, status, latency in results}):
+        report[view] = summarize([record for record in results if record[0] == view], elapsed)
+
+    print(f'{options.concurrency} clients for {elapsed:.1f} s')
+    for name in ['all'] + [name for name in report if name not in ('concurrency', 'seconds', 'all')]:
+        summary = report[name]
+        print(f'{name:<8}{summary["requests"]:>8} requests {summary["errors"]:>6} errors {summary["requests_per_second"]:>9.1f} req/s'
+              f'  p50 {summary["p50_ms"]:>8} ms  p99 {summary["p99_ms"]:>8} ms')
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == '__main__':
+    run()
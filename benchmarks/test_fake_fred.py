@@ -0,0 +1,73 @@
+# Import datetime for the start of the fetched history
+import datetime
+
+# Import TestCase and override_settings for running the fetchers against the stand-in server
+from django.test import TestCase, override_settings
+# Import requests for requesting the stand-in server directly
+import requests
+
+# Import the stand-in FRED server and its synthetic fixtures
+from benchmarks.fake_fred import FakeFredServer
+from benchmarks.fred_replay import make_synthetic
+# Import the store and the fetchers
+from htmx import utilities
+from htmx.store import SeriesStore
+
+
+class FakeFredTestCase(TestCase):
+    """
+    Test case for fetching FRED series from the stand-in server.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        fixtures = {name: make_synthetic(name) for name in ['SIPOVGINIFRA.txt', 'FPCPITOTLZGPOL.csv']}
+        self.server = FakeFredServer(fixtures, latency=5, jitter=5, seed=2000).start()
+        # Point the fetchers at the stand-in server
+        self.settings = override_settings(FRED_URL=self.server.url)
+        self.settings.enable()
+
+    def tearDown(self):
+        """
+        Clean up test fixtures after each test method.
+        """
+
+        self.settings.disable()
+        self.server.stop()
+
+    def test_fetchers_use_fred_url(self):
+        """
+        Test that both fetchers download from the configured FRED host.
+        """
+
+        gini = utilities.fetch_fred_text('SIPOVGINIFRA')
+        cpi = utilities.fetch_fred_csv('FPCPITOTLZGPOL', start=datetime.date(1950, 1, 1))
+        # Verify that the text and CSV files were parsed
+        self.assertEqual(gini.index[0].year, 1963)
+        self.assertEqual(cpi.index[0].year, 1960)
+        self.assertEqual(self.server.requests, {200: 2})
+
+    def test_revalidation_is_answered_not_modified(self):
+        """
+        Test that a stale series is revalidated with a conditional request.
+        """
+
+        # A store whose series are always stale
+        store = SeriesStore(max_age=0)
+        version = store.refresh('FPCPITOTLZGPOL', utilities.fetch_fred_csv, start=datetime.date(2000, 1, 1))
+        # Verify that the unchanged file keeps the data version
+        self.assertEqual(store.refresh('FPCPITOTLZGPOL', utilities.fetch_fred_csv, start=datetime.date(2000, 1, 1)), version)
+        self.assertEqual(self.server.requests, {200: 1, 304: 1})
+
+    def test_failure_rate(self):
+        """
+        Test that the configured share of requests fails with 503.
+        """
+
+        self.server.failure_rate = 1
+        response = requests.get(self.server.url + 'graph/fredgraph.csv?id=FPCPITOTLZGPOL', timeout=5)
+        # Verify that the request failed like an overloaded upstream
+        self.assertEqual(response.status_code, 503)
@@ -25,7 +25,7 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-ALLOWED_HOSTS = ['global-macro.herokuapp.com']
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'global-macro.herokuapp.com').split(',')
 
 
 # Application definition
@@ -41,7 +41,12 @@ INSTALLED_APPS = [
     'htmx',
 ]
 
+# HtmxMiddleware (django-htmx 1.9) and WhiteNoiseMiddleware are sync only, so under ASGI Django runs
+# the chain and the async views below it through one thread per request. Dropping them does not free
+# the thread in Django 4.0, whose async-capable middleware still run their hooks through one, and
+# measured slower, see benchmarks/bench_asgi.py
 MIDDLEWARE = [
+    'htmx.middleware.timing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,10 +86,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a write waits for the write lock held by another thread or worker
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+        },
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered Bokeh components, evicted least recently used first once MAX_ENTRIES is reached
+    'charts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'charts',
+        'TIMEOUT': 24 * 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -131,3 +160,91 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Series store
+# Number of seconds a stored FRED series is served before its missing tail is fetched again
+
+SERIES_STORE_MAX_AGE = int(os.environ.get('SERIES_STORE_MAX_AGE', 6 * 60 * 60))
+
+# Base URL of the FRED files, pointed at 'python -m benchmarks.fake_fred' for offline load tests
+
+FRED_URL = os.environ.get('FRED_URL', 'https://fred.stlouisfed.org/')
+
+# Number of seconds between two refreshes of 'python manage.py refresh_scheduler', run as a process
+# of its own; without it, pass --interval or refresh with 'python manage.py refresh_series' instead
+
+SERIES_REFRESH_INTERVAL = int(os.environ['SERIES_REFRESH_INTERVAL']) if os.environ.get('SERIES_REFRESH_INTERVAL') else None
+
+# Whether each worker imports Bokeh, pandas and pandas-datareader in the background as soon as it
+# starts, instead of on its first chart request; off by default so that idle workers stay small
+
+PRELOAD_CHART_ENGINES = os.environ.get('PRELOAD_CHART_ENGINES') == '1'
+
+# Number of seconds browsers and proxies may reuse a chart response before revalidating its ETag
+
+CHART_MAX_AGE = 60
+
+
+# Request timings
+# Number of milliseconds above which a request is logged as slow
+
+TIMING_SLOW_MS = 1000
+
+# One JSON record per request is logged by htmx.middleware, at warning level for slow requests
+# and at info level otherwise; set TIMING_LOG_LEVEL=INFO to log every request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'htmx.middleware': {
+            'handlers': ['console'],
+            'level': os.environ.get('TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Hexbin tiles
+# Directory of the precomputed hexbin tiles of the stock indexes
+
+HEXBIN_ROOT = BASE_DIR / 'hexbins'
+
+
+# Single flight
+# Cache holding the locks that let one process at a time refresh a series or render a chart; it
+# has to be shared between workers, such as Memcached or Redis, for the lock to span processes
+
+SINGLE_FLIGHT_CACHE = 'default'
+
+# Number of seconds after which a lock expires, in case the process holding it died
+
+SINGLE_FLIGHT_LOCK_TIMEOUT = 60
+
+
+# Stale-while-revalidate and circuit breaker
+# Number of seconds past SERIES_STORE_MAX_AGE a stored series is still served at once to chart
+# requests while its tail is fetched in the background; older series are refreshed before serving
+
+SERIES_STORE_MAX_STALE = int(os.environ.get('SERIES_STORE_MAX_STALE', 7 * 24 * 60 * 60))
+
+# Number of consecutive failed downloads of a series after which FRED is no longer asked for it
+
+CIRCUIT_BREAKER_THRESHOLD = 3
+
+# Number of seconds a series whose downloads keep failing is served from the store only
+
+CIRCUIT_BREAKER_COOLDOWN = 60
+
+
+# Indicator registry
+# JSON file listing the FRED series behind the charts, see htmx/indicators.py
+
+INDICATORS_FILE = os.environ.get('INDICATORS_FILE', os.path.join(BASE_DIR, 'htmx', 'indicators.json'))
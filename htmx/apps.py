@@ -1,6 +1,22 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class HtmxConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'htmx'
+
+    def ready(self):
+        """
+        Load the chart engines in the background when PRELOAD_CHART_ENGINES is set.
+
+        The refresh scheduler is not started here, since every management command and
+        worker would start one; it runs through the refresh_scheduler command instead.
+        """
+
+        if getattr(settings, 'PRELOAD_CHART_ENGINES', False):
+            from . import engines
+            # The worker starts serving right away, the first chart request waits for the import if needed
+            threading.Thread(target=engines.load, name='preload-chart-engines', daemon=True).start()
@@ -0,0 +1,153 @@
+# Import wraps for keeping the name and docstring of guarded functions
+from functools import wraps
+# Import Lock for guarding the circuit states
+from threading import Lock
+# Import time for timing the cool-down windows
+import time
+
+# Import settings for reading the breaker configuration
+from django.conf import settings
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=None, cooldown=None):
+        """
+        Initialize CircuitBreaker, which stops calling a failing upstream for a cool-down window.
+
+        Every key, such as a FRED series ID, has its own circuit. It opens after threshold
+        consecutive failures, so that calls fail at once instead of waiting for timeouts and
+        retries. Once the cool-down has passed, a single call is let through: its success closes
+        the circuit, its failure opens it for another cool-down.
+
+        Args:
+            threshold (int): Number of consecutive failures opening a circuit.
+                Defaults to the CIRCUIT_BREAKER_THRESHOLD setting.
+            cooldown (int): Number of seconds an open circuit rejects calls.
+                Defaults to the CIRCUIT_BREAKER_COOLDOWN setting.
+        """
+
+        if threshold is None:
+            threshold = getattr(settings, 'CIRCUIT_BREAKER_THRESHOLD', 3)
+        if cooldown is None:
+            cooldown = getattr(settings, 'CIRCUIT_BREAKER_COOLDOWN', 60)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # Consecutive failures, keyed by key
+        self.failures = {}
+        # Monotonic time each open circuit was opened or last let a trial call through, keyed by key
+        self.opened = {}
+        self.lock = Lock()
+
+    def is_open(self, key):
+        """
+        Check whether a circuit rejects calls, without letting a trial call through.
+
+        Args:
+            key (str): The circuit key.
+
+        Returns:
+            bool: True if the circuit is open and within its cool-down.
+        """
+
+        opened_at = self.opened.get(key)
+        return opened_at is not None and time.monotonic() - opened_at < self.cooldown
+
+    def allow(self, key):
+        """
+        Check whether a call may go through, letting one trial call through once the cool-down has passed.
+
+        Args:
+            key (str): The circuit key.
+
+        Returns:
+            bool: True if the call may go through.
+        """
+
+        with self.lock:
+            if key not in self.opened:
+                return True
+            if time.monotonic() - self.opened[key] < self.cooldown:
+                return False
+            # Hold further calls for another cool-down while the trial call runs
+            self.opened[key] = time.monotonic()
+            return True
+
+    def record_success(self, key):
+        """
+        Close a circuit after a successful call.
+
+        Args:
+            key (str): The circuit key.
+        """
+
+        with self.lock:
+            self.failures.pop(key, None)
+            self.opened.pop(key, None)
+
+    def record_failure(self, key):
+        """
+        Count a failed call, opening the circuit once the threshold is reached.
+
+        Args:
+            key (str): The circuit key.
+        """
+
+        with self.lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            if self.failures[key] >= self.threshold:
+                self.opened[key] = time.monotonic()
+
+    def guard(self, errors):
+        """
+        Decorate a fetch function so that its calls go through the circuit of their first argument.
+
+        Args:
+            errors (tuple): Exception classes counted as upstream failures.
+
+        Returns:
+            callable: The decorator.
+        """
+
+        def decorator(fetch):
+            @wraps(fetch)
+            def guarded(key, *args, **kwargs):
+                if not self.allow(key):
+                    raise CircuitOpenError(f'{key} is unavailable upstream, retrying in at most {self.cooldown} seconds')
+                try:
+                    result = fetch(key, *args, **kwargs)
+                except errors:
+                    self.record_failure(key)
+                    raise
+                self.record_success(key)
+                return result
+            return guarded
+        return decorator
+
+    def get_open(self):
+        """
+        List the circuits rejecting calls.
+
+        Returns:
+            list: The keys of the open circuits, sorted.
+        """
+
+        return sorted(key for key in list(self.opened) if self.is_open(key))
+
+    def clear(self):
+        """
+        Close every circuit.
+        """
+
+        with self.lock:
+            self.failures.clear()
+            self.opened.clear()
+
+
+# Process-wide circuit breaker of the upstream series
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,103 @@
+# Import hashlib for deriving entity tags
+import hashlib
+
+# Import caches for accessing the configured cache backends
+from django.core.cache import caches
+
+# Import the single-flight layer for coalescing concurrent renders of a chart
+from .singleflight import single_flight
+
+
+def get_chart_key(view, parameter, version):
+    """
+    Build the render cache key of a chart.
+
+    Args:
+        view (str): Name of the view the chart belongs to.
+        parameter (str): The year, symbol or stock the chart was requested for.
+        version (str): Data version of the series behind the chart.
+
+    Returns:
+        str: The cache key.
+    """
+
+    return f'chart:{view}:{parameter}:{version}'
+
+def get_chart_etag(view, parameter, version, partial):
+    """
+    Build the entity tag of a chart response.
+
+    The tag only depends on the request parameters and the data version, so it can be
+    checked against If-None-Match before the chart is rendered.
+
+    Args:
+        view (str): Name of the view the chart belongs to.
+        parameter (str): The year, symbol or stock the chart was requested for.
+        version (str): Data version of the series behind the chart.
+        partial (bool): Whether the response is the HTMX partial or the full page.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+
+    key = f'{get_chart_key(view, parameter, version)}:{"partial" if partial else "full"}'
+    return '"' + hashlib.md5(key.encode()).hexdigest() + '"'
+
+def get_chart(view, parameter, version, render):
+    """
+    Get the components of a chart from the render cache, rendering them on a miss.
+
+    Because the data version is part of the key, a chart is rebuilt as soon as the
+    series behind it changes, while the superseded entry ages out of the cache.
+    Concurrent misses on the same key wait for a single render.
+
+    Args:
+        view (str): Name of the view the chart belongs to.
+        parameter (str): The year, symbol or stock the chart was requested for.
+        version (str): Data version of the series behind the chart.
+        render (callable): Called without arguments to build the (script, div) pair.
+
+    Returns:
+        tuple: The script and div for embedding the plot.
+    """
+
+    key = get_chart_key(view, parameter, version)
+    chart = caches['charts'].get(key)
+    if chart is None:
+        # The render cache is checked again by the leading caller, in case another process rendered the chart meanwhile
+        chart = single_flight.do(key, lambda: caches['charts'].get_or_set(key, render))
+    return chart
+
+def get_validators(url):
+    """
+    Get the HTTP validators last returned by an upstream URL.
+
+    Args:
+        url (str): The upstream URL, without query parameters carrying credentials.
+
+    Returns:
+        dict: The etag and last_modified header values, and the last_date of the
+            observations they cover, or None if the URL was never fetched.
+    """
+
+    return caches['default'].get(f'validators:{url}')
+
+def set_validators(url, etag, last_modified, last_date):
+    """
+    Remember the HTTP validators returned by an upstream URL.
+
+    Validators are kept until replaced, since an unchanged upstream file keeps its validators.
+
+    Args:
+        url (str): The upstream URL, without query parameters carrying credentials.
+        etag (str): Value of the ETag response header, or None.
+        last_modified (str): Value of the Last-Modified response header, or None.
+        last_date (str): ISO date of the last observation in the response.
+    """
+
+    if etag is None and last_modified is None:
+        # Forget validators the URL no longer returns
+        caches['default'].delete(f'validators:{url}')
+        return
+    validators = {'etag': etag, 'last_modified': last_modified, 'last_date': last_date}
+    caches['default'].set(f'validators:{url}', validators, timeout=None)
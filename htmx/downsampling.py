@@ -0,0 +1,61 @@
+# Import numpy for selecting points with vectorized bucket operations
+import numpy as np
+
+
+def get_buckets(size, count):
+    """
+    Split the inner points of a series into buckets of nearly equal size.
+
+    The first and last points are kept apart, so that a downsampled line always
+    spans the full window.
+
+    Args:
+        size (int): Number of points of the series.
+        count (int): Number of buckets.
+
+    Returns:
+        numpy.ndarray: The count + 1 bucket edges, from index 1 to size - 1.
+    """
+
+    return np.linspace(1, size - 1, count + 1).astype('int64')
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Each bucket keeps the point forming the largest triangle with the point kept from
+    the previous bucket and the average of the next bucket, which preserves the visual
+    shape of the line. Points must be sorted by x and free of NaN.
+
+    Args:
+        x (numpy.ndarray): The x coordinates.
+        y (numpy.ndarray): The y coordinates.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        tuple: The x and y coordinates of the kept points, unchanged if there are no more than threshold points.
+    """
+
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return x, y
+
+    xf = np.asarray(x, dtype='float64')
+    yf = np.asarray(y, dtype='float64')
+    edges = get_buckets(size, threshold - 2)
+    keep = np.empty(threshold, dtype='int64')
+    keep[0] = 0
+    keep[-1] = size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # The next bucket of the last one is the last point
+        next_start, next_stop = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (size - 1, size)
+        average_x = xf[next_start:next_stop].mean()
+        average_y = yf[next_start:next_stop].mean()
+        # Twice the triangle areas of every candidate point, computed in one pass
+        areas = np.abs((xf[previous] - average_x) * (yf[start:stop] - yf[previous])
+                       - (xf[previous] - xf[start:stop]) * (average_y - yf[previous]))
+        previous = start + int(areas.argmax())
+        keep[bucket + 1] = previous
+    return x[keep], y[keep]
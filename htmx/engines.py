@@ -0,0 +1,55 @@
+"""
+Lazy facade over the chart engines.
+
+The chart classes pull in Bokeh, pandas, NumPy and pandas-datareader, which take
+most of the startup time and resident memory of a worker. Views reach them through
+this module instead, so that they are imported on first use: a worker serving only
+the home page or error pages never loads them.
+"""
+
+# Import import_module for loading the engines on first use
+from importlib import import_module
+
+
+# Module defining each name served by the facade, relative to this package
+EXPORTS = {
+    'GiniIndex': '.utilities',
+    'CpiIndex': '.utilities',
+    'CpiComparison': '.utilities',
+    'StockIndex': '.utilities',
+    'RemoteDataError': 'pandas_datareader._utils',
+    'UPSTREAM_ERRORS': '.utilities',
+    'transform_column_source_data': 'bokeh.util.serialization',
+}
+
+
+def __getattr__(name):
+    """
+    Import the module defining a name on first access.
+
+    Args:
+        name (str): The requested name.
+
+    Returns:
+        object: The class or function of that name.
+    """
+
+    try:
+        module = EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(import_module(module, __package__), name)
+    # Keep the value on the module, so that later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
+
+def load():
+    """
+    Import every engine, so that the first chart request does not pay for it.
+    """
+
+    for name in EXPORTS:
+        __getattr__(name)
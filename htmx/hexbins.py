@@ -0,0 +1,159 @@
+# Import os for managing artifact files
+import os
+# Import tempfile for writing artifacts atomically
+import tempfile
+
+# Import settings for reading the artifact location
+from django.conf import settings
+# Import hexbin for hexagonal binning
+from bokeh.util.hex import hexbin
+# Import numpy for reading and writing artifacts
+import numpy as np
+# Import pandas for merging tile counts
+import pandas as pd
+
+# Import the single-flight layer for coalescing concurrent rebuilds of an artifact
+from .singleflight import single_flight
+# Import the stage timer of the chart pipeline
+from .timing import stage
+
+
+# Size of the hexagonal tiles, in percent of return
+HEX_SIZE = 0.2
+
+
+def get_tiles_path(stock):
+    """
+    Get the artifact path of a stock.
+
+    Args:
+        stock (str): The stock symbol.
+
+    Returns:
+        str: Path of the .npz artifact.
+    """
+
+    return os.path.join(settings.HEXBIN_ROOT, f'{stock}.npz')
+
+def load_tiles(stock):
+    """
+    Read the precomputed tiles of a stock.
+
+    Args:
+        stock (str): The stock symbol.
+
+    Returns:
+        dict: Arrays q, r and counts of the tiles, the positive and negative returns they
+            were binned from, and the data version of the series, or None if there is no artifact.
+    """
+
+    try:
+        with np.load(get_tiles_path(stock)) as artifact:
+            return {key: artifact[key] for key in artifact.files}
+    except FileNotFoundError:
+        return None
+
+def save_tiles(stock, tiles):
+    """
+    Write the tiles of a stock, replacing any previous artifact atomically.
+
+    Args:
+        stock (str): The stock symbol.
+        tiles (dict): The tiles as returned by bin_returns, plus the data version.
+    """
+
+    os.makedirs(settings.HEXBIN_ROOT, exist_ok=True)
+    # Write next to the target so that readers never see a partial file
+    fd, path = tempfile.mkstemp(dir=settings.HEXBIN_ROOT, suffix='.npz')
+    with os.fdopen(fd, 'wb') as artifact:
+        np.savez(artifact, **tiles)
+    os.replace(path, get_tiles_path(stock))
+
+@stage('hexbin')
+def bin_returns(positive_return, negative_return, previous=None):
+    """
+    Bin pairs of positive and negative returns into hexagonal tiles.
+
+    When the previous tiles were binned from a prefix of the given returns, only the
+    new pairs are binned and their counts added to the previous ones.
+
+    Args:
+        positive_return (numpy.ndarray): Positive returns, the x coordinates.
+        negative_return (numpy.ndarray): Negative returns, the y coordinates.
+        previous (dict): Tiles from an earlier call, or None.
+
+    Returns:
+        dict: Arrays q, r and counts of the tiles, and the returns they were binned from.
+    """
+
+    frames = []
+    done = 0
+    if previous is not None:
+        done = len(previous['positive'])
+        # Reuse the previous counts only if their returns were not revised since
+        if (done <= len(positive_return)
+                and np.array_equal(previous['positive'], positive_return[:done])
+                and np.array_equal(previous['negative'], negative_return[:done])):
+            frames.append(pd.DataFrame({'q': previous['q'], 'r': previous['r'], 'counts': previous['counts']}))
+        else:
+            done = 0
+
+    if done < len(positive_return):
+        # Bin only the pairs added since the previous tiles
+        frames.append(hexbin(positive_return[done:], negative_return[done:], HEX_SIZE))
+
+    if frames:
+        bins = pd.concat(frames).groupby(['q', 'r'], as_index=False)['counts'].sum()
+    else:
+        bins = pd.DataFrame({'q': [], 'r': [], 'counts': []}, dtype='int64')
+
+    return {
+        'q': bins['q'].to_numpy(),
+        'r': bins['r'].to_numpy(),
+        'counts': bins['counts'].to_numpy(),
+        'positive': positive_return,
+        'negative': negative_return
+    }
+
+def get_tiles(stock, version, get_returns):
+    """
+    Get the tiles of a stock from its artifact, rebuilding it when the series has changed.
+
+    Args:
+        stock (str): The stock symbol.
+        version (int): Data version of the stock series.
+        get_returns (callable): Called without arguments to get the positive and negative returns
+            when the artifact is missing or outdated.
+
+    Returns:
+        dict: The tiles as returned by bin_returns, plus the data version.
+    """
+
+    previous = load_tiles(stock)
+    if previous is not None and int(previous['version']) == version:
+        return previous
+    # Concurrent requests for an outdated artifact share one rebuild
+    return single_flight.do(f'hexbin:{stock}', lambda: build_tiles(stock, version, get_returns))
+
+def build_tiles(stock, version, get_returns):
+    """
+    Rebuild the artifact of a stock, unless another caller rebuilt it for this version in the meantime.
+
+    Args:
+        stock (str): The stock symbol.
+        version (int): Data version of the stock series.
+        get_returns (callable): Called without arguments to get the positive and negative returns.
+
+    Returns:
+        dict: The tiles as returned by bin_returns, plus the data version.
+    """
+
+    previous = load_tiles(stock)
+    if previous is not None and int(previous['version']) == version:
+        return previous
+
+    positive_return, negative_return = get_returns()
+    tiles = bin_returns(positive_return, negative_return, previous)
+    tiles['version'] = np.array(version)
+    save_tiles(stock, tiles)
+    return tiles
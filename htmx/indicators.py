@@ -0,0 +1,224 @@
+"""
+Registry of the FRED series behind the charts.
+
+The series are read once per process from the INDICATORS_FILE JSON file, which maps
+every group to its display names and codes:
+
+    {
+        "cpi": {
+            "title": "CPI Index",
+            "format": "csv",
+            "start": "2000-01-01",
+            "series": {"GERMANY": "FPCPITOTLZGDEU", "ITALY": "FPCPITOTLZGITA"}
+        }
+    }
+
+A code is turned into its FRED series ID by the optional template, e.g.
+"SIPOVGINI{code}", and format names the fetcher of the series: "text" for the
+plain-text data files, "csv" for pandas-datareader. Adding a series to a group
+only takes a new line in the file.
+"""
+
+# Import Mapping for exposing groups and the registry as read-only mappings
+from collections.abc import Mapping
+# Import datetime for parsing backfill starts
+import datetime
+# Import json for reading the registry file
+import json
+# Import MappingProxyType for read-only views of the indexes
+from types import MappingProxyType
+
+# Import settings for reading the registry location
+from django.conf import settings
+# Import ImproperlyConfigured for reporting invalid registry files
+from django.core.exceptions import ImproperlyConfigured
+
+
+# Fetcher formats a group may name
+FORMATS = ('text', 'csv')
+
+
+class IndicatorGroup(Mapping):
+    def __init__(self, key, series, title=None, template='{code}', format='csv', start=None):
+        """
+        Initialize IndicatorGroup, an immutable mapping of display names to codes indexed both ways.
+
+        Args:
+            key (str): Key of the group in the registry, e.g. 'cpi'.
+            series (dict): Codes keyed by display name, in display order.
+            title (str): Title of the group. Defaults to the key.
+            template (str): Format string turning a code into its FRED series ID.
+            format (str): One of FORMATS, naming the fetcher of the series.
+            start (date): Start of the history to backfill when nothing is stored yet,
+                or None for the full history.
+        """
+
+        if format not in FORMATS:
+            raise ImproperlyConfigured(f'Indicator group {key!r} has an unknown format {format!r}')
+        names = {code: name for name, code in series.items()}
+        if len(names) != len(series):
+            raise ImproperlyConfigured(f'Indicator group {key!r} lists a code under several names')
+        self.__dict__.update({
+            'key': key,
+            'title': title or key,
+            'template': template,
+            'format': format,
+            'start': start,
+            # Read-only indexes of codes by name and names by code
+            'codes': MappingProxyType(dict(series)),
+            'names': MappingProxyType(names),
+            # FRED series IDs by code, and codes by FRED series ID
+            'series_ids': MappingProxyType({code: template.format(code=code) for code in names}),
+            'series_codes': MappingProxyType({template.format(code=code): code for code in names}),
+        })
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __getitem__(self, name):
+        return self.codes[name]
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return f'IndicatorGroup({self.key!r}, {dict(self.codes)!r})'
+
+    def get_name(self, code):
+        """
+        Get the display name of a code.
+
+        Args:
+            code (str): The code, e.g. 'FPCPITOTLZGDEU' or 'FRA'.
+
+        Returns:
+            str: The display name.
+
+        Raises:
+            KeyError: If the group has no such code.
+        """
+
+        return self.names[code]
+
+    def has_code(self, code):
+        """
+        Check whether a code belongs to the group.
+
+        Args:
+            code (str): The code.
+
+        Returns:
+            bool: True if the group lists the code.
+        """
+
+        return code in self.names
+
+    def get_series_id(self, code):
+        """
+        Get the FRED series ID of a code.
+
+        Args:
+            code (str): The code.
+
+        Returns:
+            str: The FRED series ID.
+        """
+
+        return self.series_ids[code]
+
+
+class IndicatorRegistry(Mapping):
+    def __init__(self, groups):
+        """
+        Initialize IndicatorRegistry, an immutable mapping of indicator groups by key.
+
+        Args:
+            groups (list): The IndicatorGroup instances, in display order.
+        """
+
+        series = {}
+        for group in groups:
+            for series_id, code in group.series_codes.items():
+                if series_id in series:
+                    raise ImproperlyConfigured(f'Series {series_id} is listed in indicator groups {series[series_id][0].key!r} and {group.key!r}')
+                series[series_id] = (group, code)
+        self.__dict__.update({
+            'groups': MappingProxyType({group.key: group for group in groups}),
+            # Group and code of every FRED series ID
+            'series': MappingProxyType(series),
+        })
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __getitem__(self, key):
+        return self.groups[key]
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def find(self, series_id):
+        """
+        Find the group and code of a FRED series ID.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            tuple: The IndicatorGroup and the code, or None if no group lists the series.
+        """
+
+        return self.series.get(series_id)
+
+    def get_series_ids(self):
+        """
+        List the FRED series IDs of every group.
+
+        Returns:
+            list: The series IDs, in registry order.
+        """
+
+        return list(self.series)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a registry file.
+
+        Args:
+            path (str): Path of the JSON registry file.
+
+        Returns:
+            IndicatorRegistry: The registry.
+        """
+
+        with open(path) as file:
+            config = json.load(file)
+        groups = []
+        for key, group in config.items():
+            start = group.get('start')
+            groups.append(IndicatorGroup(
+                key,
+                group['series'],
+                title=group.get('title'),
+                template=group.get('template', '{code}'),
+                format=group.get('format', 'csv'),
+                start=datetime.date.fromisoformat(start) if start else None
+            ))
+        return cls(groups)
+
+
+# Process-wide registry read from the INDICATORS_FILE setting
+indicators = IndicatorRegistry.load(settings.INDICATORS_FILE)
@@ -0,0 +1,26 @@
+# Import BaseCommand for defining a management command
+from django.core.management.base import BaseCommand
+
+# Import the precomputed hexbin tiles
+from htmx.hexbins import get_tiles
+# Import StockIndex for the stock indexes and their series
+from htmx.utilities import StockIndex
+
+
+class Command(BaseCommand):
+    """
+    Precompute the hexbin tiles of every stock index ahead of traffic.
+
+    Meant to run after each trading day, e.g. from cron. Stock series are refreshed
+    from upstream if stale, and only returns added since the last run are binned.
+    """
+
+    help = 'Precompute the hexbin tiles of every stock index'
+
+    def handle(self, *args, **options):
+        for name, symbol in StockIndex(None).inputs.items():
+            stock = StockIndex(symbol)
+            # Fetch the missing tail of the stock series
+            version = stock.refresh()
+            tiles = get_tiles(symbol, version, stock.get_returns)
+            self.stdout.write(f"{name}: {len(tiles['counts'])} tiles from {len(tiles['positive'])} return pairs")
@@ -0,0 +1,31 @@
+# Import settings for the default interval
+from django.conf import settings
+# Import BaseCommand for defining a management command, and CommandError for a missing interval
+from django.core.management.base import BaseCommand, CommandError
+
+# Import the refresh scheduler
+from htmx.refresh import RefreshScheduler
+
+
+class Command(BaseCommand):
+    """
+    Refresh every FRED series behind the charts and warm the charts at a fixed interval.
+
+    Meant to run as a process of its own beside the web workers, so that migrations,
+    tests, shells and every worker never start a scheduler of their own.
+    """
+
+    help = 'Refresh every stale FRED series and warm the chart caches at a fixed interval, until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=settings.SERIES_REFRESH_INTERVAL, help='Number of seconds between the starts of two refreshes, SERIES_REFRESH_INTERVAL by default')
+
+    def handle(self, *args, **options):
+        if not options['interval']:
+            raise CommandError('Set SERIES_REFRESH_INTERVAL or pass --interval')
+        self.stdout.write(f"Refreshing every {options['interval']} seconds")
+        try:
+            # This process is the scheduler, so it runs in the foreground
+            RefreshScheduler(options['interval']).run()
+        except KeyboardInterrupt:
+            self.stdout.write('Scheduler stopped')
@@ -0,0 +1,32 @@
+# Import BaseCommand for defining a management command
+from django.core.management.base import BaseCommand
+
+# Import the refresh stage
+from htmx.refresh import refresh_stale_series, warm_charts
+# Import the default concurrency limit of the fetch engine
+from htmx.utilities import FETCH_CONCURRENCY
+
+
+class Command(BaseCommand):
+    """
+    Refresh every FRED series behind the charts and warm the charts ahead of traffic.
+    """
+
+    help = 'Refresh every FRED series in the local store and warm the chart caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Refresh series that are still fresh as well')
+        parser.add_argument('--concurrency', type=int, default=FETCH_CONCURRENCY, help='Maximum number of concurrent upstream requests')
+        parser.add_argument('--no-warm', action='store_true', help='Skip rendering the charts')
+
+    def handle(self, *args, **options):
+        results = refresh_stale_series(force=options['force'], limit=options['concurrency'])
+        for series_id, result in sorted(results.items()):
+            if isinstance(result, Exception):
+                self.stderr.write(f'{series_id}: failed ({result})')
+            else:
+                self.stdout.write(f'{series_id}: version {result}')
+
+        if not options['no_warm']:
+            warm_charts()
+            self.stdout.write('Charts warmed')
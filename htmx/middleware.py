@@ -0,0 +1,104 @@
+# Import asyncio for detecting an async middleware chain
+import asyncio
+# Import json for writing structured log records
+import json
+# Import logging for reporting request timings
+import logging
+# Import time for measuring request durations
+import time
+
+# Import settings for reading the slow request threshold
+from django.conf import settings
+# Import sync_and_async_middleware for serving both WSGI and ASGI requests
+from django.utils.decorators import sync_and_async_middleware
+
+# Import the stage timings and the shared histograms
+from .timing import get_server_timing, get_stage_totals, request_timings, timing_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+def start_request():
+    """
+    Start collecting the stages run by the current request.
+
+    Returns:
+        tuple: The list the stages are collected into, the context token and the start time.
+    """
+
+    timings = []
+    return timings, request_timings.set(timings), time.perf_counter()
+
+def finish_request(request, response, timings, started):
+    """
+    Report the stages run by a request: add the Server-Timing header, record the
+    histograms of the view and log one structured record.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        response (HttpResponse): The response of the request.
+        timings (list): Pairs of stage name and duration in milliseconds.
+        started (float): The performance counter when the request started.
+
+    Returns:
+        HttpResponse: The same response.
+    """
+
+    total = (time.perf_counter() - started) * 1000
+    totals = get_stage_totals(timings)
+    response['Server-Timing'] = get_server_timing(totals, total)
+
+    # Only routed requests are recorded, which keeps the number of histograms bounded
+    match = getattr(request, 'resolver_match', None)
+    view = match.url_name if match is not None else None
+    if view is not None:
+        for name, duration in totals.items():
+            timing_registry.observe(view, name, duration)
+        timing_registry.observe(view, 'total', total)
+
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'view': view,
+        'status': response.status_code,
+        'total_ms': round(total, 1),
+        'stages': {name: round(duration, 1) for name, duration in totals.items()}
+    }
+    # Slow requests are reported at warning level, so that they are logged by default
+    level = logging.WARNING if total >= settings.TIMING_SLOW_MS else logging.INFO
+    logger.log(level, json.dumps(record))
+    return response
+
+@sync_and_async_middleware
+def timing_middleware(get_response):
+    """
+    Time every request and the chart pipeline stages it runs.
+
+    Args:
+        get_response (callable): The next middleware or view.
+
+    Returns:
+        callable: The middleware, a coroutine function when the chain is async.
+    """
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            timings, token, started = start_request()
+            try:
+                response = await get_response(request)
+            finally:
+                # Stop collecting even if the view raised, so that later stages of the thread are not collected
+                request_timings.reset(token)
+            return finish_request(request, response, timings, started)
+    else:
+        def middleware(request):
+            timings, token, started = start_request()
+            try:
+                response = get_response(request)
+            finally:
+                # Stop collecting even if the view raised, so that later stages of the thread are not collected
+                request_timings.reset(token)
+            return finish_request(request, response, timings, started)
+
+    return middleware
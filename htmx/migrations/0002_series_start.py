@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('htmx', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='series',
+            name='start',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -1 +1,46 @@
+from django.db import models
 
+
+class Series(models.Model):
+    """
+    A FRED time series mirrored in the local series store.
+
+    Attributes:
+        series_id (str): The FRED series ID, e.g. 'SIPOVGINIFRA' or 'SP500'.
+        fetched_at (datetime): When the series was last checked against upstream.
+        version (int): Counter bumped every time the stored observations change.
+        start (date): Earliest date the stored history was fetched from, which can precede
+            the first observation when upstream has nothing older.
+    """
+
+    series_id = models.CharField(max_length=64, unique=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    start = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return self.series_id
+
+
+class Observation(models.Model):
+    """
+    A single dated value of a stored series.
+
+    Attributes:
+        series (Series): The series the observation belongs to.
+        date (date): The observation date.
+        value (float): The observation value, or None when FRED reports it as missing.
+    """
+
+    series = models.ForeignKey(Series, on_delete=models.CASCADE, related_name='observations')
+    date = models.DateField()
+    value = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'date'], name='unique_series_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.series} {self.date}'
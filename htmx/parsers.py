@@ -0,0 +1,59 @@
+# Import numpy for building compact observation arrays
+import numpy as np
+# Import RemoteDataError for reporting malformed data files like other upstream failures
+from pandas_datareader._utils import RemoteDataError
+
+
+def parse_fred_text(lines, start=None):
+    """
+    Parse the observations of a FRED plain-text data file.
+
+    The file starts with a header of "Key: value" lines and a "DATE VALUE" column
+    header, followed by one "YYYY-MM-DD value" row per observation. Lines are
+    consumed one at a time, so a streamed response body is never held in memory.
+
+    Args:
+        lines (iterable): Lines of the data file as str.
+        start (date): Only observations on or after this date are returned. Defaults to the full history.
+
+    Returns:
+        tuple: A datetime64[D] array of observation dates and a float64 array of values,
+            with NaN where FRED reports a missing value. Both are empty without a column header.
+
+    Raises:
+        RemoteDataError: If a line after the column header is not an observation row.
+    """
+
+    dates = []
+    values = []
+
+    lines = iter(lines)
+    # Skip the header, whose notes may hold any text, up to the column header
+    for line in lines:
+        if line.split() == ['DATE', 'VALUE']:
+            break
+
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != 2:
+                raise ValueError(f'expected 2 fields, got {len(fields)}')
+            # FRED marks missing values with a dot
+            values.append(np.nan if fields[1] == '.' else float(fields[1]))
+        except ValueError as error:
+            raise RemoteDataError(f'Malformed FRED data row {line!r}: {error}') from error
+        dates.append(fields[0])
+
+    try:
+        # Convert all dates in a single vectorized pass
+        dates = np.array(dates, dtype='datetime64[D]')
+    except ValueError as error:
+        raise RemoteDataError(f'Malformed FRED data date: {error}') from error
+    values = np.array(values, dtype='float64')
+    if start is not None:
+        keep = dates >= np.datetime64(start, 'D')
+        dates = dates[keep]
+        values = values[keep]
+    return dates, values
@@ -0,0 +1,146 @@
+# Import logging for reporting background refreshes
+import logging
+# Import threading for running the scheduler and stopping it
+import threading
+
+# Import close_old_connections for releasing database connections between runs
+from django.db import close_old_connections
+
+# Import the registry of the FRED series behind the charts
+from .indicators import indicators
+# Import the local series store
+from .store import series_store
+# Import the chart classes, the shared Gini panel and the fetch engine
+from .utilities import (
+    FETCH_CONCURRENCY,
+    GINI_YEARS,
+    CpiComparison,
+    CpiIndex,
+    GiniIndex,
+    StockIndex,
+    fetch_all_sync,
+    fetch_fred_csv,
+    fetch_fred_text,
+    gini_panel,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_jobs():
+    """
+    Get every FRED series behind the charts.
+
+    Returns:
+        dict: Tuples of the fetch function and the backfill start, keyed by series ID.
+    """
+
+    # Fetch function of every registry format
+    fetchers = {'text': fetch_fred_text, 'csv': fetch_fred_csv}
+    jobs = {}
+    for series_id, (group, code) in indicators.series.items():
+        jobs[series_id] = (fetchers[group.format], group.start)
+    return jobs
+
+def refresh_stale_series(force=False, limit=FETCH_CONCURRENCY):
+    """
+    Fetch the missing tails of all series concurrently and merge them into the series store.
+
+    Args:
+        force (bool): Refresh series that are still fresh as well.
+        limit (int): Maximum number of concurrent upstream requests.
+
+    Returns:
+        dict: The data version of every refreshed series, or the exception its fetch raised, keyed by series ID.
+    """
+
+    jobs = get_jobs()
+    tails = {}
+    for series_id, (fetch, start) in jobs.items():
+        if force or not series_store.is_fresh(series_id):
+            tails[series_id] = series_store.get_tail_start(series_id, start)
+
+    def fetch(series_id, start):
+        # Dispatch each series to its own fetch function
+        return jobs[series_id][0](series_id, start)
+
+    results = {}
+    for series_id, tail in fetch_all_sync(tails, fetch, limit).items():
+        if isinstance(tail, Exception):
+            logger.warning('Refreshing %s failed: %s', series_id, tail)
+            results[series_id] = tail
+        else:
+            # An empty series was fetched from start, which becomes the start of its stored history
+            start = jobs[series_id][1]
+            results[series_id] = series_store.save(series_id, tail, start=start if tails[series_id] == start else None)
+    return results
+
+def warm_charts():
+    """
+    Render every chart into the render cache, and the stock hexbin tiles into their artifacts.
+
+    Only fresh series are rendered, so no upstream request is made. The render cache
+    is only shared with the web workers when the 'charts' cache is a shared backend or
+    when this runs in the process serving the charts.
+    """
+
+    jobs = get_jobs()
+    # Series whose refresh failed are skipped rather than fetched again
+    fresh = {series_id for series_id in jobs if series_store.is_fresh(series_id)}
+
+    if all(series_id in fresh for series_id in indicators['gini'].series_ids.values()):
+        # Rebuild the Gini panel from the refreshed store
+        gini_panel.clear()
+        for year in GINI_YEARS:
+            GiniIndex(year).get_context()
+    for symbol in indicators['cpi'].values():
+        if symbol in fresh:
+            CpiIndex(symbol).get_cpi_context()
+    comparison = CpiComparison()
+    if all(symbol in fresh for symbol in comparison.symbols):
+        # Every compared series is fresh, so refreshing only reads their versions
+        comparison.make_context(comparison.refresh())
+    for stock in indicators['stock'].values():
+        if stock in fresh:
+            StockIndex(stock).get_stock_context()
+
+
+class RefreshScheduler(threading.Thread):
+    """
+    Thread refreshing all series and warming the charts at a fixed interval.
+
+    Run by the refresh_scheduler management command, as a process of its own beside the web workers.
+    """
+
+    def __init__(self, interval):
+        """
+        Initialize RefreshScheduler with the given interval.
+
+        Args:
+            interval (int): Number of seconds between the starts of two refreshes.
+        """
+
+        super().__init__(name='refresh-scheduler', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                refresh_stale_series()
+                warm_charts()
+            except Exception:
+                logger.exception('Scheduled refresh failed')
+            finally:
+                # Do not hold a database connection while sleeping
+                close_old_connections()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        """
+        Stop the scheduler after the current refresh.
+        """
+
+        self.stopped.set()
+
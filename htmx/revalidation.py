@@ -0,0 +1,83 @@
+# Import ThreadPoolExecutor for running revalidations in the background, and wait for waiting on them
+from concurrent.futures import ThreadPoolExecutor, wait
+# Import logging for reporting failed revalidations
+import logging
+# Import Lock for guarding the pending revalidations
+from threading import Lock
+
+# Import close_old_connections for releasing database connections after each revalidation
+from django.db import close_old_connections
+
+# Import the error raised while a circuit is open
+from .breaker import CircuitOpenError
+
+
+logger = logging.getLogger(__name__)
+
+
+class Revalidator:
+    def __init__(self, max_workers=2):
+        """
+        Initialize Revalidator, which refreshes stale data in the background while requests are served the stored copy.
+
+        Args:
+            max_workers (int): Number of revalidations running at once.
+        """
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='revalidate')
+        # Futures of the queued or running revalidations, keyed by key
+        self.pending = {}
+        self.lock = Lock()
+
+    def submit(self, key, function):
+        """
+        Queue a revalidation, unless the same key is already queued or running.
+
+        Args:
+            key (str): The revalidation key.
+            function (callable): Called without arguments in a background thread.
+
+        Returns:
+            bool: True if the revalidation was queued.
+        """
+
+        with self.lock:
+            if key in self.pending:
+                return False
+            # Queued under the lock, so that run cannot drop the key before it is recorded
+            self.pending[key] = self.executor.submit(self.run, key, function)
+            return True
+
+    def run(self, key, function):
+        """
+        Run a revalidation, logging instead of raising its failure.
+
+        Args:
+            key (str): The revalidation key.
+            function (callable): The revalidation.
+        """
+
+        try:
+            function()
+        except CircuitOpenError as error:
+            logger.info('Revalidating %s skipped: %s', key, error)
+        except Exception:
+            logger.warning('Revalidating %s failed', key, exc_info=True)
+        finally:
+            with self.lock:
+                del self.pending[key]
+            # Do not hold a database connection between revalidations
+            close_old_connections()
+
+    def wait(self):
+        """
+        Wait for the queued and running revalidations to finish.
+        """
+
+        with self.lock:
+            futures = list(self.pending.values())
+        wait(futures)
+
+
+# Process-wide revalidator shared by the chart classes
+revalidator = Revalidator()
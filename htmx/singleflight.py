@@ -0,0 +1,223 @@
+# Import asyncio for waiting on computations from async callers
+import asyncio
+# Import Future for sharing the outcome of a computation between threads and event loops
+from concurrent.futures import Future
+# Import Lock for guarding the in-flight computations
+from threading import Lock
+# Import time for polling the cross-process lock
+import time
+# Import uuid for telling lock holders apart
+import uuid
+
+# Import settings for reading the lock configuration
+from django.conf import settings
+# Import caches for the cross-process lock
+from django.core.cache import caches
+
+# Import the stage timer, so that waiting shows up in request timings
+from .timing import stage
+
+
+class SingleFlight:
+    def __init__(self, lock_timeout=None, poll_interval=0.05):
+        """
+        Initialize SingleFlight, which runs at most one computation per key at a time.
+
+        Within a process, callers asking for a key that is already being computed wait
+        for that computation and share its result or exception, whether they are threads
+        or coroutines. Across processes, the computation of a key holds a lock in the
+        SINGLE_FLIGHT_CACHE cache, so that identical computations run one after the other;
+        computations are expected to re-check the shared state first, so that only the
+        first one does the work. Sync callers must not wait in the thread an async leader
+        runs its sync_to_async calls in, which is why async views go through do_async.
+
+        Args:
+            lock_timeout (int): Number of seconds after which a cross-process lock expires,
+                in case its holder died. Defaults to the SINGLE_FLIGHT_LOCK_TIMEOUT setting.
+            poll_interval (float): Number of seconds between two attempts to take the lock.
+        """
+
+        if lock_timeout is None:
+            lock_timeout = getattr(settings, 'SINGLE_FLIGHT_LOCK_TIMEOUT', 60)
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        # Futures of the computations in flight, keyed by key
+        self.calls = {}
+        self.lock = Lock()
+
+    def join(self, key):
+        """
+        Join the computation of a key, leading it if none is in flight.
+
+        Args:
+            key (str): The computation key.
+
+        Returns:
+            tuple: The future of the computation, and True if the caller has to run it.
+        """
+
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                return future, False
+            future = self.calls[key] = Future()
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        """
+        Hand the outcome of a computation to its waiting callers.
+
+        Args:
+            key (str): The computation key.
+            future (Future): The future of the computation.
+            result (object): The result of the computation.
+            error (BaseException): The exception raised by the computation, if any.
+        """
+
+        with self.lock:
+            del self.calls[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def get_lock_key(self, key):
+        """
+        Get the cache key of the cross-process lock of a computation.
+
+        Args:
+            key (str): The computation key.
+
+        Returns:
+            str: The cache key.
+        """
+
+        return f'single-flight:{key}'
+
+    def acquire(self, key):
+        """
+        Take the cross-process lock of a computation, waiting while another process holds it.
+
+        Args:
+            key (str): The computation key.
+
+        Returns:
+            str: The token of the lock, or None if it could not be taken before it would have expired.
+        """
+
+        cache = caches[settings.SINGLE_FLIGHT_CACHE]
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(self.get_lock_key(key), token, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+        return token
+
+    async def acquire_async(self, key):
+        """
+        Awaitable counterpart of acquire.
+
+        Args:
+            key (str): The computation key.
+
+        Returns:
+            str: The token of the lock, or None if it could not be taken before it would have expired.
+        """
+
+        cache = caches[settings.SINGLE_FLIGHT_CACHE]
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not await cache.aadd(self.get_lock_key(key), token, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+        return token
+
+    def release(self, key, token):
+        """
+        Release the cross-process lock of a computation, unless it expired and was taken by another process.
+
+        Args:
+            key (str): The computation key.
+            token (str): The token returned by acquire.
+        """
+
+        cache = caches[settings.SINGLE_FLIGHT_CACHE]
+        if token is not None and cache.get(self.get_lock_key(key)) == token:
+            cache.delete(self.get_lock_key(key))
+
+    async def release_async(self, key, token):
+        """
+        Awaitable counterpart of release.
+
+        Args:
+            key (str): The computation key.
+            token (str): The token returned by acquire_async.
+        """
+
+        cache = caches[settings.SINGLE_FLIGHT_CACHE]
+        if token is not None and await cache.aget(self.get_lock_key(key)) == token:
+            await cache.adelete(self.get_lock_key(key))
+
+    def do(self, key, function):
+        """
+        Run a computation, or wait for the identical one in flight.
+
+        Args:
+            key (str): The computation key.
+            function (callable): Called without arguments by the leading caller.
+
+        Returns:
+            object: The result of the computation, shared by every caller of the same flight.
+        """
+
+        future, leader = self.join(key)
+        if not leader:
+            with stage('singleflight'):
+                return future.result()
+        try:
+            with stage('singleflight'):
+                token = self.acquire(key)
+            try:
+                result = function()
+            finally:
+                self.release(key, token)
+        except BaseException as error:
+            self.finish(key, future, error=error)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    async def do_async(self, key, function):
+        """
+        Awaitable counterpart of do, for computations that are coroutine functions.
+
+        Args:
+            key (str): The computation key.
+            function (callable): Awaited without arguments by the leading caller.
+
+        Returns:
+            object: The result of the computation, shared by every caller of the same flight.
+        """
+
+        future, leader = self.join(key)
+        if not leader:
+            with stage('singleflight'):
+                return await asyncio.wrap_future(future)
+        try:
+            with stage('singleflight'):
+                token = await self.acquire_async(key)
+            try:
+                result = await function()
+            finally:
+                await self.release_async(key, token)
+        except BaseException as error:
+            self.finish(key, future, error=error)
+            raise
+        self.finish(key, future, result)
+        return result
+
+
+# Process-wide single-flight layer shared by the series store and the chart caches
+single_flight = SingleFlight()
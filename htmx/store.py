@@ -0,0 +1,365 @@
+# Import datetime for handling date and time operations
+import datetime
+# Import math for detecting missing observation values
+import math
+# Import Lock for serializing the writes of a process
+from threading import Lock
+
+# Import settings for reading the store configuration
+from django.conf import settings
+# Import transaction for writing observations atomically
+from django.db import transaction
+# Import Max and Min for finding the latest and earliest stored observations
+from django.db.models import Max, Min
+# Import timezone for timezone-aware timestamps
+from django.utils import timezone
+# Import pandas for building time series from stored observations
+import pandas as pd
+
+# Import the models backing the store
+from .models import Series, Observation
+# Import the single-flight layer for coalescing concurrent fetches of a series
+from .singleflight import single_flight
+# Import the stage timer of the chart pipeline
+from .timing import stage
+
+
+class SeriesStore:
+    def __init__(self, max_age=None, max_stale=None):
+        """
+        Initialize SeriesStore with the given freshness window.
+
+        Args:
+            max_age (int): Number of seconds a stored series is served before its tail is fetched again.
+                Defaults to the SERIES_STORE_MAX_AGE setting.
+            max_stale (int): Number of seconds past max_age a stored series may still be served
+                while its tail is fetched in the background. Defaults to the SERIES_STORE_MAX_STALE setting.
+        """
+
+        if max_age is None:
+            # Six hours comfortably covers the daily FRED release cycle
+            max_age = getattr(settings, 'SERIES_STORE_MAX_AGE', 6 * 60 * 60)
+        if max_stale is None:
+            max_stale = getattr(settings, 'SERIES_STORE_MAX_STALE', 7 * 24 * 60 * 60)
+        self.max_age = max_age
+        self.max_stale = max_stale
+        # The database takes one writer at a time, so the threads of a process queue here
+        self.write_lock = Lock()
+
+    def is_fresh(self, series_id):
+        """
+        Check whether a stored series was checked against upstream within the freshness window.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            bool: True if the stored copy can be served without contacting upstream.
+        """
+
+        fetched_at = Series.objects.filter(series_id=series_id).values_list('fetched_at', flat=True).first()
+        if fetched_at is None:
+            return False
+        return timezone.now() - fetched_at < datetime.timedelta(seconds=self.max_age)
+
+    def is_servable(self, series_id):
+        """
+        Check whether a stale series may be served while its tail is fetched in the background.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            bool: True if the stored copy was checked against upstream within max_age plus max_stale.
+        """
+
+        fetched_at = Series.objects.filter(series_id=series_id).values_list('fetched_at', flat=True).first()
+        if fetched_at is None:
+            return False
+        return timezone.now() - fetched_at < datetime.timedelta(seconds=self.max_age + self.max_stale)
+
+    def get_tail_start(self, series_id, start=None):
+        """
+        Get the date from which upstream has to be queried to complete a stored series.
+
+        Args:
+            series_id (str): The FRED series ID.
+            start (date): Start of the history to backfill when nothing is stored yet.
+
+        Returns:
+            date: The latest stored observation date, or start if the series is empty.
+        """
+
+        last = Observation.objects.filter(series__series_id=series_id).aggregate(last=Max('date'))['last']
+        # The latest observation is refetched as well, so revisions to it are picked up
+        return last or start
+
+    def get_stale(self, series_ids):
+        """
+        List the series that were not checked against upstream within the freshness window, in one query.
+
+        Args:
+            series_ids (list): The FRED series IDs.
+
+        Returns:
+            list: The stale series IDs, in the given order.
+        """
+
+        cutoff = timezone.now() - datetime.timedelta(seconds=self.max_age)
+        fresh = set(Series.objects.filter(series_id__in=series_ids, fetched_at__gt=cutoff).values_list('series_id', flat=True))
+        return [series_id for series_id in series_ids if series_id not in fresh]
+
+    def get_tail_starts(self, series_ids, start=None):
+        """
+        Get the dates from which upstream has to be queried to complete several stored series, in one query.
+
+        Args:
+            series_ids (list): The FRED series IDs.
+            start (date): Start of the history to backfill for series with nothing stored yet.
+
+        Returns:
+            dict: The latest stored observation date of every series, or start if it is empty, keyed by series ID.
+        """
+
+        rows = Observation.objects.filter(series__series_id__in=series_ids).values('series__series_id').annotate(last=Max('date'))
+        lasts = {row['series__series_id']: row['last'] for row in rows}
+        return {series_id: lasts.get(series_id) or start for series_id in series_ids}
+
+    def get_head(self, series_id):
+        """
+        Get the earliest stored observation date of a series.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            date: The earliest stored observation date, or None if the series is empty.
+        """
+
+        return Observation.objects.filter(series__series_id=series_id).aggregate(first=Min('date'))['first']
+
+    @stage('store')
+    def save(self, series_id, observations, start=None, end=None):
+        """
+        Merge freshly fetched observations into the stored series.
+
+        Args:
+            series_id (str): The FRED series ID.
+            observations (pandas.Series): Observation values indexed by date.
+            start (date): Date the observations were fetched from, recorded as the start of the
+                stored history when it is earlier.
+            end (date): Last date the observations were fetched up to, for a range below the stored tail.
+                Defaults to a tail fetch, which replaces every stored observation from its first date
+                and counts as a check against upstream.
+
+        Returns:
+            int: The data version of the series after the merge.
+        """
+
+        incoming = {}
+        for date, value in observations.items():
+            # FRED reports missing values as NaN, which are stored as NULL
+            incoming[date.date()] = None if math.isnan(value) else float(value)
+
+        with self.write_lock, transaction.atomic():
+            # Write before reading, so that the transaction holds the write lock from its start:
+            # on SQLite, concurrent writers then wait for the busy timeout, whereas a transaction
+            # upgrading its read lock to a write fails at once with "database is locked"
+            Series.objects.bulk_create([Series(series_id=series_id)], ignore_conflicts=True)
+            series = Series.objects.select_for_update().get(series_id=series_id)
+            if incoming:
+                # Only the overlapping range of the stored series can differ from the fetched one
+                stored = series.observations.filter(date__gte=min(incoming))
+                if end is not None:
+                    stored = stored.filter(date__lte=end)
+                if dict(stored.values_list('date', 'value')) != incoming:
+                    stored.delete()
+                    Observation.objects.bulk_create(
+                        [Observation(series=series, date=date, value=value) for date, value in incoming.items()]
+                    )
+                    # Bump the version so anything derived from the series can be invalidated
+                    series.version += 1
+            if start is not None and (series.start is None or start < series.start):
+                series.start = start
+            if end is None:
+                series.fetched_at = timezone.now()
+            series.save()
+        return series.version
+
+    @stage('store')
+    def load(self, series_id):
+        """
+        Read a stored series.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            pandas.Series: Observation values indexed by date, empty if nothing is stored.
+        """
+
+        rows = Observation.objects.filter(series__series_id=series_id).values_list('date', 'value')
+        dates = [row[0] for row in rows]
+        values = [row[1] for row in rows]
+        return pd.Series(values, index=pd.DatetimeIndex(dates, name='DATE'), dtype='float64', name=series_id)
+
+    @stage('store')
+    def load_frame(self, series_ids):
+        """
+        Read several stored series in one query.
+
+        Args:
+            series_ids (list): The FRED series IDs.
+
+        Returns:
+            pandas.DataFrame: Observation values indexed by date, with one column per series ID
+                in the given order, NaN where a series has no observation.
+        """
+
+        rows = Observation.objects.filter(series__series_id__in=series_ids).values_list('series__series_id', 'date', 'value')
+        frame = pd.DataFrame.from_records(rows.iterator(), columns=['series_id', 'DATE', 'value'], coerce_float=True)
+        frame['DATE'] = pd.to_datetime(frame['DATE'])
+        # Spread the long rows into one column per series
+        frame = frame.pivot(index='DATE', columns='series_id', values='value')
+        return frame.reindex(columns=series_ids).astype('float64')
+
+    def get_versions(self, series_ids):
+        """
+        Get the data versions of several stored series in one query.
+
+        Args:
+            series_ids (list): The FRED series IDs.
+
+        Returns:
+            dict: The data version of every series, 0 if it has never been stored, keyed by series ID.
+        """
+
+        versions = dict(Series.objects.filter(series_id__in=series_ids).values_list('series_id', 'version'))
+        return {series_id: versions.get(series_id, 0) for series_id in series_ids}
+
+    def get_version(self, series_id):
+        """
+        Get the data version of a stored series.
+
+        Args:
+            series_id (str): The FRED series ID.
+
+        Returns:
+            int: The data version, 0 if the series has never been stored.
+        """
+
+        return Series.objects.filter(series_id=series_id).values_list('version', flat=True).first() or 0
+
+    def refresh(self, series_id, fetch, start=None):
+        """
+        Fetch the missing tail of a series from upstream if the stored copy is stale.
+
+        Args:
+            series_id (str): The FRED series ID.
+            fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+            start (date): Start of the history to backfill when nothing is stored yet.
+
+        Returns:
+            int: The data version of the series.
+        """
+
+        if self.is_fresh(series_id):
+            return self.get_version(series_id)
+        # Concurrent refreshes of the series share one upstream fetch
+        return single_flight.do(f'series:{series_id}', lambda: self.fetch_tail(series_id, fetch, start))
+
+    def fetch_tail(self, series_id, fetch, start=None):
+        """
+        Fetch the missing tail of a stale series, unless another caller stored it in the meantime.
+
+        Args:
+            series_id (str): The FRED series ID.
+            fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+            start (date): Start of the history to backfill when nothing is stored yet.
+
+        Returns:
+            int: The data version of the series.
+        """
+
+        if self.is_fresh(series_id):
+            return self.get_version(series_id)
+        tail_start = self.get_tail_start(series_id, start)
+        # An empty series is fetched from start, which becomes the start of its stored history
+        return self.save(series_id, fetch(series_id, tail_start), start=start if tail_start == start else None)
+
+    def get_backfill_end(self, series_id, start):
+        """
+        Get the end of the history missing before the stored series for a window starting at start.
+
+        Args:
+            series_id (str): The FRED series ID.
+            start (date): Start of the requested window.
+
+        Returns:
+            date: The day before the earliest stored observation, or None if nothing is missing
+                or the series is empty, in which case refresh fetches from start.
+        """
+
+        covered = Series.objects.filter(series_id=series_id).values_list('start', flat=True).first()
+        if covered is not None and start >= covered:
+            return None
+        first = self.get_head(series_id)
+        if first is None or start >= first:
+            return None
+        return first - datetime.timedelta(days=1)
+
+    def backfill(self, series_id, fetch, start):
+        """
+        Fetch the history missing before the stored series, so that a window starting at start is covered.
+
+        Args:
+            series_id (str): The FRED series ID.
+            fetch (callable): Called as fetch(series_id, start, end) and returning a pandas.Series of observations.
+            start (date): Start of the requested window.
+
+        Returns:
+            int: The data version of the series.
+        """
+
+        if self.get_backfill_end(series_id, start) is None:
+            return self.get_version(series_id)
+        # Concurrent backfills of the same window share one upstream fetch
+        return single_flight.do(f'series:{series_id}:{start}', lambda: self.fetch_head(series_id, fetch, start))
+
+    def fetch_head(self, series_id, fetch, start):
+        """
+        Fetch the history missing before the stored series, unless another caller stored it in the meantime.
+
+        Args:
+            series_id (str): The FRED series ID.
+            fetch (callable): Called as fetch(series_id, start, end) and returning a pandas.Series of observations.
+            start (date): Start of the requested window.
+
+        Returns:
+            int: The data version of the series.
+        """
+
+        end = self.get_backfill_end(series_id, start)
+        if end is None:
+            return self.get_version(series_id)
+        return self.save(series_id, fetch(series_id, start, end), start=start, end=end)
+
+    def get_series(self, series_id, fetch, start=None):
+        """
+        Read a series from the store, fetching only its missing tail from upstream when it is stale.
+
+        Args:
+            series_id (str): The FRED series ID.
+            fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+            start (date): Start of the history to backfill when nothing is stored yet.
+
+        Returns:
+            pandas.Series: Observation values indexed by date.
+        """
+
+        self.refresh(series_id, fetch, start)
+        return self.load(series_id)
+
+
+# Process-wide store shared by all chart classes
+series_store = SeriesStore()
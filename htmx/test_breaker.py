@@ -0,0 +1,94 @@
+# Import unittest for creating and running tests
+import unittest
+# Import mock for moving the breaker clock forward
+from unittest import mock
+
+# Import the circuit breaker
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    """
+    Test case for the CircuitBreaker class.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        self.breaker = CircuitBreaker(threshold=2, cooldown=60)
+        # Record the series of every upstream call
+        self.calls = []
+        # Whether the fake upstream fails
+        self.down = True
+        self.fetch = self.breaker.guard((ConnectionError,))(self.upstream)
+
+    def upstream(self, series_id):
+        """
+        Fake upstream fetch failing while the upstream is down.
+        """
+
+        self.calls.append(series_id)
+        if self.down:
+            raise ConnectionError('down')
+        return series_id
+
+    def test_circuit_opens_after_threshold(self):
+        """
+        Test that consecutive failures open the circuit of a series only.
+        """
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.fetch('SP500')
+        # Verify that the open circuit fails without calling upstream
+        with self.assertRaises(CircuitOpenError):
+            self.fetch('SP500')
+        self.assertEqual(self.calls, ['SP500', 'SP500'])
+        self.assertTrue(self.breaker.is_open('SP500'))
+        self.assertEqual(self.breaker.get_open(), ['SP500'])
+        # Verify that other series are still called
+        with self.assertRaises(ConnectionError):
+            self.fetch('DJIA')
+        self.assertFalse(self.breaker.is_open('DJIA'))
+
+    def test_trial_call_after_cooldown(self):
+        """
+        Test that a single call goes through after the cool-down and decides the state of the circuit.
+        """
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.fetch('SP500')
+        with mock.patch('htmx.breaker.time.monotonic', return_value=self.breaker.opened['SP500'] + 61):
+            # Verify that a failed trial opens the circuit for another cool-down
+            with self.assertRaises(ConnectionError):
+                self.fetch('SP500')
+            with self.assertRaises(CircuitOpenError):
+                self.fetch('SP500')
+        self.down = False
+        with mock.patch('htmx.breaker.time.monotonic', return_value=self.breaker.opened['SP500'] + 61):
+            # Verify that a successful trial closes the circuit
+            self.assertEqual(self.fetch('SP500'), 'SP500')
+            self.assertEqual(self.fetch('SP500'), 'SP500')
+        self.assertEqual(self.breaker.get_open(), [])
+
+    def test_success_resets_failures(self):
+        """
+        Test that only consecutive failures count, and that other errors are not failures.
+        """
+
+        with self.assertRaises(ConnectionError):
+            self.fetch('SP500')
+        self.down = False
+        self.fetch('SP500')
+        self.down = True
+        with self.assertRaises(ConnectionError):
+            self.fetch('SP500')
+        # Verify that the success in between kept the circuit closed
+        self.assertFalse(self.breaker.is_open('SP500'))
+        with self.assertRaises(KeyError):
+            self.breaker.guard((ConnectionError,))(lambda series_id: {}[series_id])('SP500')
+        # Verify that the unrelated error was not counted
+        self.assertFalse(self.breaker.is_open('SP500'))
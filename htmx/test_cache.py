@@ -0,0 +1,68 @@
+# Import caches for clearing the render cache between tests
+from django.core.cache import caches
+# Import TestCase for testing code that uses the database
+from django.test import TestCase
+
+# Import the cache, store and utilities modules
+from . import cache, store, utilities
+# Import the series factory shared with the store tests
+from .test_store import make_series
+
+
+class ChartCacheTestCase(TestCase):
+    """
+    Test case for the chart render cache.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Start every test with an empty render cache
+        caches['charts'].clear()
+        # Count the number of renders
+        self.renders = 0
+
+    def render(self):
+        """
+        Fake render returning numbered components.
+        """
+
+        self.renders += 1
+        return (f'script{self.renders}', f'div{self.renders}')
+
+    def test_get_chart_renders_once_per_version(self):
+        """
+        Test that a chart is rendered once and then served from the cache.
+        """
+
+        first = cache.get_chart('cpi', 'FPCPITOTLZGDEU', 1, self.render)
+        second = cache.get_chart('cpi', 'FPCPITOTLZGDEU', 1, self.render)
+        # Verify that the second call was a cache hit
+        self.assertEqual(first, second)
+        self.assertEqual(self.renders, 1)
+
+    def test_get_chart_rerenders_new_version(self):
+        """
+        Test that a new data version invalidates the cached chart.
+        """
+
+        cache.get_chart('cpi', 'FPCPITOTLZGDEU', 1, self.render)
+        components = cache.get_chart('cpi', 'FPCPITOTLZGDEU', 2, self.render)
+        # Verify that the chart was rendered again for the new version
+        self.assertEqual(components, ('script2', 'div2'))
+
+    def test_cpi_context_uses_render_cache(self):
+        """
+        Test that repeated CPI contexts are served from the render cache.
+        """
+
+        values = [1.5 + x for x in range(12)]
+        # Record the history as fetched from the group start, like the first fetch does
+        store.series_store.save('FPCPITOTLZGDEU', make_series('FPCPITOTLZGDEU', values), start=utilities.indicators['cpi'].start)
+        first = utilities.CpiIndex('FPCPITOTLZGDEU').get_cpi_context()
+        second = utilities.CpiIndex('FPCPITOTLZGDEU').get_cpi_context()
+        # Verify that the second context reused the rendered components
+        self.assertEqual(first['script'], second['script'])
+        self.assertEqual(first['div'], second['div'])
@@ -0,0 +1,48 @@
+# Import unittest for creating and running tests
+import unittest
+
+# Import numpy for building test series
+import numpy as np
+
+# Import the downsampling module
+from . import downsampling
+
+
+class DownsamplingTestCase(unittest.TestCase):
+    """
+    Test case for the LTTB downsampling function.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # A noisy daily series with a single spike
+        rng = np.random.default_rng(2000)
+        self.x = np.arange(5000)
+        self.y = np.sin(self.x / 300) + rng.normal(0, 0.05, len(self.x))
+        self.y[3210] = 10
+
+    def test_lttb(self):
+        """
+        Test that LTTB keeps the threshold number of points, the endpoints and the spike.
+        """
+
+        x, y = downsampling.lttb(self.x, self.y, 200)
+        # Verify that exactly the threshold number of points is kept
+        self.assertEqual(len(x), 200)
+        # Verify that the line still spans the full window in order
+        self.assertEqual((x[0], x[-1]), (0, 4999))
+        self.assertTrue(np.all(np.diff(x) > 0))
+        # Verify that the visually dominant spike survives
+        self.assertIn(3210, x)
+
+    def test_short_series_are_unchanged(self):
+        """
+        Test that series not longer than the threshold are returned as they are.
+        """
+
+        x, y = downsampling.lttb(self.x[:50], self.y[:50], 200)
+        # Verify that every point is kept
+        self.assertEqual(x.tolist(), self.x[:50].tolist())
@@ -0,0 +1,57 @@
+# Import os for passing the Django settings to the interpreter
+import os
+# Import subprocess for importing the project in a fresh interpreter
+import subprocess
+# Import sys for the interpreter path
+import sys
+# Import unittest for creating and running tests
+import unittest
+
+# Import the lazy facade over the chart engines
+from . import engines
+
+
+# Prints which heavy libraries are loaded after booting the project, then after using the facade
+PROGRAM = '''
+import sys, django
+django.setup()
+import gini.urls
+from django.test import Client
+Client().get('/')
+heavy = ('bokeh', 'pandas', 'numpy', 'pandas_datareader')
+print(*[name in sys.modules for name in heavy])
+from htmx import engines
+engines.CpiIndex
+print(*[name in sys.modules for name in heavy])
+'''
+
+
+class EnginesTestCase(unittest.TestCase):
+    """
+    Test case for the lazy facade over the chart engines.
+    """
+
+    def test_engines_load_on_first_use(self):
+        """
+        Test that booting the project and serving the home page do not import the chart libraries.
+        """
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='gini.settings', SECRET_KEY='x', ALLOWED_HOSTS='testserver')
+        env.pop('PRELOAD_CHART_ENGINES', None)
+        output = subprocess.run([sys.executable, '-c', PROGRAM], env=env, capture_output=True, text=True, check=True).stdout.splitlines()
+        # Verify that none of the heavy libraries were loaded before a chart engine was used
+        self.assertEqual(output[0], 'False False False False')
+        # Verify that using an engine loaded them
+        self.assertEqual(output[1], 'True True True True')
+
+    def test_facade_serves_engine_names(self):
+        """
+        Test that the facade returns the engine classes and rejects other names.
+        """
+
+        from .utilities import StockIndex
+
+        # Verify that the facade returns the same class as the defining module
+        self.assertIs(engines.StockIndex, StockIndex)
+        with self.assertRaises(AttributeError):
+            engines.Unknown
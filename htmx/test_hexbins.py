@@ -0,0 +1,120 @@
+# Import datetime for building stock windows
+import datetime
+# Import tempfile for a throwaway artifact directory
+import tempfile
+
+# Import TestCase for testing code that uses the database
+from django.test import TestCase, override_settings
+# Import hexbin for comparing against a full binning
+from bokeh.util.hex import hexbin
+# Import numpy for building test returns
+import numpy as np
+
+# Import the hexbins, store and utilities modules
+from . import hexbins, store, utilities
+# Import the series factory shared with the store tests
+from .test_store import make_series
+
+
+class HexbinsTestCase(TestCase):
+    """
+    Test case for the precomputed hexbin tiles.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Write artifacts to a temporary directory
+        self.root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(HEXBIN_ROOT=self.root.name)
+        self.settings.enable()
+        rng = np.random.default_rng(0)
+        self.positive_return = np.abs(rng.normal(0, 1, 300))
+        self.negative_return = -np.abs(rng.normal(0, 1, 300))
+        # Count the number of return computations
+        self.calls = 0
+
+    def tearDown(self):
+        """
+        Clean up test fixtures after each test method.
+        """
+
+        self.settings.disable()
+        self.root.cleanup()
+
+    def get_returns(self):
+        """
+        Fake return computation for get_tiles.
+        """
+
+        self.calls += 1
+        return self.positive_return, self.negative_return
+
+    def test_bin_returns_incremental(self):
+        """
+        Test that binning new returns onto previous tiles matches a full binning.
+        """
+
+        previous = hexbins.bin_returns(self.positive_return[:200], self.negative_return[:200])
+        tiles = hexbins.bin_returns(self.positive_return, self.negative_return, previous)
+        full = hexbin(self.positive_return, self.negative_return, hexbins.HEX_SIZE)
+        # Verify that the merged tiles equal the full binning
+        self.assertEqual(tiles['q'].tolist(), full['q'].tolist())
+        self.assertEqual(tiles['r'].tolist(), full['r'].tolist())
+        self.assertEqual(tiles['counts'].tolist(), full['counts'].tolist())
+
+    def test_bin_returns_rebuilds_revised_returns(self):
+        """
+        Test that previous tiles are discarded when their returns were revised.
+        """
+
+        previous = hexbins.bin_returns(self.positive_return[:200] + 5, self.negative_return[:200])
+        tiles = hexbins.bin_returns(self.positive_return, self.negative_return, previous)
+        # Verify that the revised counts were not carried over
+        self.assertEqual(tiles['counts'].sum(), 300)
+
+    def test_get_tiles_reuses_artifact(self):
+        """
+        Test that the artifact is served until the data version changes.
+        """
+
+        first = hexbins.get_tiles('SP500', 1, self.get_returns)
+        second = hexbins.get_tiles('SP500', 1, self.get_returns)
+        # Verify that the second call read the artifact
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first['counts'].tolist(), second['counts'].tolist())
+        hexbins.get_tiles('SP500', 2, self.get_returns)
+        # Verify that a new version recomputed the returns
+        self.assertEqual(self.calls, 2)
+
+    def test_stock_components_from_tiles(self):
+        """
+        Test that the stock chart is built from the precomputed tiles.
+        """
+
+        closes = np.cumprod(np.tile([1.01, 0.99], 50)) * 100
+        version = store.series_store.save('SP500', make_series('SP500', closes, freq='D'))
+        script, div = utilities.StockIndex('SP500').get_components(version)
+        # Verify that the artifact was written
+        self.assertEqual(int(hexbins.load_tiles('SP500')['version']), version)
+        # Verify that the hex tiles were rendered
+        self.assertIn('HexTile', script)
+
+    def test_stock_window_and_frequency(self):
+        """
+        Test that windowed and resampled stock charts are binned on the fly from the requested range.
+        """
+
+        closes = np.cumprod(np.tile([1.01, 0.99], 200)) * 100
+        version = store.series_store.save('SP500', make_series('SP500', closes, start='2020-01-01', freq='D'))
+        stock = utilities.StockIndex('SP500', start=datetime.date(2020, 3, 1), end=datetime.date(2020, 6, 30), frequency='weekly')
+        positive_return, negative_return = stock.get_returns()
+        # Verify that only the weekly closes of the window were used
+        self.assertLessEqual(len(positive_return) + len(negative_return), 18)
+        script, div = stock.get_components(version)
+        # Verify that no artifact was written for the window
+        self.assertIsNone(hexbins.load_tiles('SP500'))
+        # Verify that the chart is titled after its frequency
+        self.assertIn('Weekly Returns for S&amp;P 500', script)
@@ -0,0 +1,88 @@
+# Import json for writing registry files
+import json
+# Import os for removing registry files
+import os
+# Import tempfile for writing registry files
+import tempfile
+# Import unittest for creating and running tests
+import unittest
+
+# Import ImproperlyConfigured for checking invalid registry files
+from django.core.exceptions import ImproperlyConfigured
+
+# Import the indicator registry
+from .indicators import IndicatorGroup, IndicatorRegistry, indicators
+# Import the chart classes sharing the registry
+from . import utilities
+
+
+class IndicatorRegistryTestCase(unittest.TestCase):
+    """
+    Test case for the registry of the FRED series behind the charts.
+    """
+
+    def load(self, config):
+        """
+        Load a registry from a temporary file holding the given configuration.
+        """
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump(config, file)
+        self.addCleanup(os.remove, file.name)
+        return IndicatorRegistry.load(file.name)
+
+    def test_groups_are_indexed_both_ways(self):
+        """
+        Test that a group maps names to codes, codes to names and codes to series IDs.
+        """
+
+        gini = indicators['gini']
+        # Verify that the group reads like the former inputs dictionary
+        self.assertEqual(list(gini.items())[0], ('FRANCE', 'FRA'))
+        self.assertEqual(gini.get_name('FRA'), 'FRANCE')
+        self.assertEqual(gini.get_series_id('FRA'), 'SIPOVGINIFRA')
+        self.assertTrue(indicators['stock'].has_code('SP500'))
+        self.assertFalse(indicators['stock'].has_code('S&P 500'))
+        # Verify that a series ID leads back to its group and code
+        self.assertEqual(indicators.find('SIPOVGINIFRA'), (gini, 'FRA'))
+        self.assertIsNone(indicators.find('UNKNOWN'))
+
+    def test_registry_is_immutable_and_shared(self):
+        """
+        Test that the registry cannot be changed and that chart instances share its groups.
+        """
+
+        cpi = indicators['cpi']
+        with self.assertRaises(AttributeError):
+            cpi.start = None
+        with self.assertRaises(TypeError):
+            cpi.codes['FRANCE'] = 'FPCPITOTLZGFRA'
+        with self.assertRaises(TypeError):
+            indicators.series['FPCPITOTLZGFRA'] = (cpi, 'FPCPITOTLZGFRA')
+        # Verify that no metadata is built per instance
+        self.assertIs(utilities.CpiIndex('FPCPITOTLZGDEU').inputs, utilities.CpiIndex('FPCPITOTLZGITA').inputs)
+
+    def test_load_adds_series_from_file(self):
+        """
+        Test that a registry file adds series and groups without new classes.
+        """
+
+        registry = self.load({
+            'gdp': {'title': 'GDP', 'template': 'NYGDPMKTPCD{code}', 'start': '1990-01-01', 'series': {'FRANCE': 'FRA'}},
+        })
+        # Verify that the group was read with its template and start
+        self.assertEqual(registry['gdp'].title, 'GDP')
+        self.assertEqual(registry['gdp'].start.year, 1990)
+        self.assertEqual(registry.get_series_ids(), ['NYGDPMKTPCDFRA'])
+
+    def test_load_rejects_ambiguous_files(self):
+        """
+        Test that codes listed twice, duplicated series and unknown formats are rejected.
+        """
+
+        with self.assertRaises(ImproperlyConfigured):
+            IndicatorGroup('cpi', {'GERMANY': 'FPCPITOTLZGDEU', 'DEUTSCHLAND': 'FPCPITOTLZGDEU'})
+        with self.assertRaises(ImproperlyConfigured):
+            self.load({'a': {'series': {'S&P 500': 'SP500'}}, 'b': {'series': {'S&P': 'SP500'}}})
+        with self.assertRaises(ImproperlyConfigured):
+            self.load({'a': {'format': 'xml', 'series': {'S&P 500': 'SP500'}}})
@@ -0,0 +1,108 @@
+# Import datetime for building test dates
+import datetime
+# Import unittest for creating and running tests
+import unittest
+
+# Import numpy for checking the parsed arrays
+import numpy as np
+# Import RemoteDataError for checking malformed files
+from pandas_datareader._utils import RemoteDataError
+
+# Import the parsers module
+from . import parsers
+
+
+# A FRED data file whose header mentions the year 2010 outside the observation rows
+FRED_TEXT = """Title:               GINI Index for France
+Series ID:           SIPOVGINIFRA
+Frequency:           Annual
+Date Range:          2009-01-01 to 2012-01-01
+Notes:               Revised in 2010 by the World Bank.
+
+DATE          VALUE
+2009-01-01     32.7
+2010-01-01     33.7
+2011-01-01     .
+2012-01-01     33.1
+"""
+
+# A FRED data file as served, whose notes hold numbered lines starting with a digit
+FRED_TEXT_NOTES = """Title:               Consumer Price Index for Poland
+Series ID:           FPCPITOTLZGPOL
+Source:              World Bank
+Release:             World Development Indicators
+Seasonal Adjustment: Not Seasonally Adjusted
+Frequency:           Annual
+Units:               Percent
+Date Range:          2019-01-01 to 2021-01-01
+Last Updated:        2022-05-03 3:01 PM CDT
+Notes:               Inflation as measured by the consumer price index.
+1. Laspeyres
+2010 weights.
+
+DATE          VALUE
+2019-01-01     2.2
+2020-01-01     3.4
+2021-01-01     5.1
+"""
+
+
+class ParsersTestCase(unittest.TestCase):
+    """
+    Test case for the FRED text file parser.
+    """
+
+    def test_parse_fred_text(self):
+        """
+        Test that only observation rows are parsed into typed arrays.
+        """
+
+        dates, values = parsers.parse_fred_text(FRED_TEXT.splitlines())
+        # Verify that the header lines were skipped
+        self.assertEqual(dates.tolist(), [datetime.date(2009, 1, 1), datetime.date(2010, 1, 1), datetime.date(2011, 1, 1), datetime.date(2012, 1, 1)])
+        # Verify that the arrays are typed
+        self.assertEqual(dates.dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(values.dtype, np.dtype('float64'))
+        # Verify that the value of 2010 was parsed
+        self.assertEqual(values[1], 33.7)
+        # Verify that missing values are NaN
+        self.assertTrue(np.isnan(values[2]))
+
+    def test_parse_fred_text_from_start(self):
+        """
+        Test that observations before the start date are dropped.
+        """
+
+        dates, values = parsers.parse_fred_text(FRED_TEXT.splitlines(), start=datetime.date(2011, 1, 1))
+        # Verify that only the tail was kept
+        self.assertEqual(len(dates), 2)
+        self.assertEqual(values[-1], 33.1)
+
+    def test_parse_fred_text_empty(self):
+        """
+        Test that a file without observations yields empty arrays.
+        """
+
+        dates, values = parsers.parse_fred_text(FRED_TEXT.splitlines()[:5])
+        # Verify that both arrays are empty
+        self.assertEqual(len(dates), 0)
+        self.assertEqual(len(values), 0)
+
+    def test_parse_fred_text_skips_numbered_notes(self):
+        """
+        Test that header notes starting with a digit are not parsed as observations.
+        """
+
+        dates, values = parsers.parse_fred_text(FRED_TEXT_NOTES.splitlines())
+        # Verify that only the rows after the column header were parsed
+        self.assertEqual(dates.tolist(), [datetime.date(2019, 1, 1), datetime.date(2020, 1, 1), datetime.date(2021, 1, 1)])
+        self.assertEqual(values.tolist(), [2.2, 3.4, 5.1])
+
+    def test_parse_fred_text_malformed_row(self):
+        """
+        Test that a malformed observation row raises RemoteDataError.
+        """
+
+        for row in ['2022-01-01     n/a', '2022-13-01     4.0', '2022-01-01']:
+            with self.subTest(row=row), self.assertRaises(RemoteDataError):
+                parsers.parse_fred_text(FRED_TEXT.splitlines() + [row])
@@ -0,0 +1,124 @@
+# Import StringIO for capturing command output
+from io import StringIO
+# Import tempfile for a throwaway artifact directory
+import tempfile
+# Import mock for replacing upstream fetches
+from unittest import mock
+
+# Import caches for inspecting the render cache
+from django.core.cache import caches
+# Import call_command for running management commands
+from django.core.management import call_command
+# Import CommandError for a missing scheduler interval
+from django.core.management.base import CommandError
+# Import TestCase for testing code that uses the database
+from django.test import TestCase, override_settings
+# Import requests for raising request exceptions
+import requests
+
+# Import the cache, refresh, store and utilities modules
+from . import cache, refresh, store, utilities
+# Import the series factory shared with the store tests
+from .test_store import make_series
+
+
+def fetch_csv(series_id, start):
+    """
+    Fake pandas-datareader fetch.
+    """
+
+    return make_series(series_id, [1.0 + x % 3 for x in range(12)])
+
+def fetch_text(series_id, start):
+    """
+    Fake text file fetch failing for France.
+    """
+
+    if series_id == 'SIPOVGINIFRA':
+        raise requests.exceptions.ConnectionError('down')
+    return make_series(series_id, [30.1, 31.2])
+
+
+@mock.patch.object(refresh, 'fetch_fred_csv', fetch_csv)
+@mock.patch.object(refresh, 'fetch_fred_text', fetch_text)
+class RefreshTestCase(TestCase):
+    """
+    Test case for the background refresh of all series.
+    """
+
+    def test_refresh_stale_series(self):
+        """
+        Test that every series is refreshed and failures are reported.
+        """
+
+        results = refresh.refresh_stale_series()
+        # Verify that all series of the three charts were covered
+        self.assertEqual(set(results), set(refresh.get_jobs()))
+        # Verify that the failure is reported
+        self.assertIsInstance(results['SIPOVGINIFRA'], requests.exceptions.ConnectionError)
+        # Verify that the other series were stored
+        self.assertEqual(results['SP500'], 1)
+        self.assertEqual(store.series_store.load('SIPOVGINIITA').tolist(), [30.1, 31.2])
+
+    def test_refresh_stale_series_skips_fresh(self):
+        """
+        Test that fresh series are only refreshed when forced.
+        """
+
+        refresh.refresh_stale_series()
+        # Verify that only the failed series is retried
+        self.assertEqual(list(refresh.refresh_stale_series()), ['SIPOVGINIFRA'])
+        # Verify that forcing refreshes everything
+        self.assertEqual(len(refresh.refresh_stale_series(force=True)), len(refresh.get_jobs()))
+
+    def test_refresh_series_command(self):
+        """
+        Test the refresh_series management command.
+        """
+
+        out = StringIO()
+        err = StringIO()
+        call_command('refresh_series', '--no-warm', stdout=out, stderr=err)
+        # Verify that refreshed series and failures are listed
+        self.assertIn('SP500: version 1', out.getvalue())
+        self.assertIn('SIPOVGINIFRA: failed', err.getvalue())
+
+    def test_refresh_scheduler_command(self):
+        """
+        Test that the refresh_scheduler command refreshes in the foreground until interrupted.
+        """
+
+        out = StringIO()
+        # Interrupt the scheduler after its first refresh
+        with mock.patch.object(refresh, 'warm_charts', side_effect=KeyboardInterrupt):
+            call_command('refresh_scheduler', '--interval', '60', stdout=out)
+        # Verify that the series were refreshed before the interruption
+        self.assertEqual(store.series_store.load('SIPOVGINIITA').tolist(), [30.1, 31.2])
+        self.assertIn('Scheduler stopped', out.getvalue())
+
+    @override_settings(SERIES_REFRESH_INTERVAL=None)
+    def test_refresh_scheduler_requires_interval(self):
+        """
+        Test that the refresh_scheduler command refuses to run without an interval.
+        """
+
+        with self.assertRaises(CommandError):
+            call_command('refresh_scheduler', interval=None)
+
+    def test_warm_charts(self):
+        """
+        Test that charts of fresh series are rendered and stale ones skipped.
+        """
+
+        caches['charts'].clear()
+        utilities.gini_panel.clear()
+        refresh.refresh_stale_series()
+        with tempfile.TemporaryDirectory() as root, override_settings(HEXBIN_ROOT=root):
+            refresh.warm_charts()
+        # Verify that the CPI and stock charts were rendered into the cache
+        self.assertIsNotNone(caches['charts'].get(cache.get_chart_key('cpi', 'FPCPITOTLZGDEU', 1)))
+        self.assertIsNotNone(caches['charts'].get(cache.get_chart_key('stock', 'SP500', 1)))
+        # Verify that the comparison of the fresh CPI series was rendered
+        self.assertIsNotNone(caches['charts'].get(cache.get_chart_key('cpi-compare', ','.join(utilities.CpiComparison().symbols), '-'.join(['1'] * 6))))
+        # Verify that the Gini panel was not built while France is stale
+        self.assertTrue(utilities.gini_panel.is_stale())
@@ -0,0 +1,139 @@
+# Import datetime for backdating stored series
+import datetime
+# Import threading for holding a revalidation in flight
+import threading
+
+# Import async_to_sync for calling the async refresh from tests
+from asgiref.sync import async_to_sync
+# Import SimpleTestCase and TransactionTestCase, whose data is visible to the revalidation threads
+from django.test import SimpleTestCase, TransactionTestCase
+# Import timezone for backdating stored series
+from django.utils import timezone
+
+# Import the store and utilities modules and the models backing the store
+from . import store, utilities
+from .models import Series
+# Import the circuit breaker
+from .breaker import circuit_breaker
+# Import the background revalidation
+from .revalidation import Revalidator, revalidator
+# Import the series factory shared with the store tests
+from .test_store import make_series
+
+
+class RevalidatorTestCase(SimpleTestCase):
+    """
+    Test case for the Revalidator class.
+    """
+
+    def test_pending_key_is_queued_once(self):
+        """
+        Test that a key is not queued again while its revalidation is pending, and that failures are not raised.
+        """
+
+        queue = Revalidator()
+        release = threading.Event()
+        calls = []
+
+        def revalidate():
+            calls.append(1)
+            release.wait(5)
+            raise ValueError('upstream down')
+
+        # Verify that the second submission of the running key was dropped
+        self.assertTrue(queue.submit('SP500', revalidate))
+        self.assertFalse(queue.submit('SP500', revalidate))
+        release.set()
+        with self.assertLogs('htmx.revalidation', 'WARNING'):
+            queue.wait()
+        self.assertEqual(calls, [1])
+        # Verify that the key can be queued again once done
+        self.assertTrue(queue.submit('SP500', lambda: None))
+        queue.wait()
+
+
+class StaleWhileRevalidateTestCase(TransactionTestCase):
+    """
+    Test case for serving stored series while they are refreshed.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        circuit_breaker.clear()
+        store.series_store.save('SP500', make_series('SP500', [1.0, 2.0, 3.0]))
+        # Record the start of every upstream fetch
+        self.calls = []
+
+    def tearDown(self):
+        """
+        Clean up test fixtures after each test method.
+        """
+
+        revalidator.wait()
+        circuit_breaker.clear()
+
+    def age(self, seconds):
+        """
+        Backdate the last upstream check of the stored series.
+        """
+
+        Series.objects.filter(series_id='SP500').update(fetched_at=timezone.now() - datetime.timedelta(seconds=seconds))
+
+    def fetch(self, series_id, start):
+        """
+        Fake upstream fetch returning a new observation.
+        """
+
+        self.calls.append(start)
+        return make_series(series_id, [3.0, 4.0], start='2012-01-01')
+
+    def fail(self, series_id, start):
+        """
+        Fake upstream fetch of an unavailable upstream.
+        """
+
+        self.calls.append(start)
+        raise utilities.RemoteDataError('down')
+
+    def test_stale_series_is_served_and_refreshed_in_background(self):
+        """
+        Test that a stale series within the stale window is served at once and refreshed afterwards.
+        """
+
+        self.age(store.series_store.max_age + 60)
+        version = async_to_sync(utilities.refresh_series)('SP500', self.fetch)
+        # Verify that the stored version was served
+        self.assertEqual(version, 1)
+        revalidator.wait()
+        # Verify that the tail was fetched in the background
+        self.assertEqual(self.calls, [datetime.date(2012, 1, 1)])
+        self.assertEqual(store.series_store.get_version('SP500'), 2)
+        self.assertTrue(store.series_store.is_fresh('SP500'))
+
+    def test_old_series_is_served_when_upstream_fails(self):
+        """
+        Test that a series past the stale window is refreshed first, and served as stored if that fails.
+        """
+
+        self.age(store.series_store.max_age + store.series_store.max_stale + 60)
+        with self.assertLogs('htmx.utilities', 'WARNING'):
+            version = async_to_sync(utilities.refresh_series)('SP500', self.fail)
+        # Verify that upstream was asked before the stored version was served
+        self.assertEqual(self.calls, [datetime.date(2012, 1, 1)])
+        self.assertEqual(version, 1)
+
+    def test_open_circuit_skips_revalidation(self):
+        """
+        Test that no background refresh is queued for a series whose circuit is open.
+        """
+
+        for _ in range(circuit_breaker.threshold):
+            circuit_breaker.record_failure('SP500')
+        self.age(store.series_store.max_age + 60)
+        # Verify that the stored version was served without contacting upstream
+        self.assertEqual(async_to_sync(utilities.refresh_series)('SP500', self.fetch), 1)
+        revalidator.wait()
+        self.assertEqual(self.calls, [])
@@ -0,0 +1,119 @@
+# Import asyncio for running concurrent coroutines
+import asyncio
+# Import threading for running concurrent callers
+import threading
+# Import time for keeping computations in flight
+import time
+
+# Import caches for inspecting the cross-process locks
+from django.core.cache import caches
+# Import SimpleTestCase for testing code that does not use the database
+from django.test import SimpleTestCase
+
+# Import the single-flight layer
+from .singleflight import SingleFlight
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    """
+    Test case for coalescing concurrent identical computations.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        caches['default'].clear()
+        self.flight = SingleFlight(poll_interval=0.01)
+        # Count the number of computations
+        self.calls = 0
+
+    def compute(self):
+        """
+        Slow computation counting its calls.
+        """
+
+        self.calls += 1
+        time.sleep(0.2)
+        return self.calls
+
+    def run_threads(self, target, count=8):
+        """
+        Run a function in concurrent threads and collect what each returned or raised.
+        """
+
+        results = []
+
+        def call():
+            try:
+                results.append(target())
+            except Exception as error:
+                results.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_callers_share_one_computation(self):
+        """
+        Test that concurrent callers with the same key wait for a single computation.
+        """
+
+        results = self.run_threads(lambda: self.flight.do('key', self.compute))
+        # Verify that the computation ran once and every caller got its result
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 8)
+        # Verify that the lock was released and the next call computes again
+        self.assertIsNone(caches['default'].get(self.flight.get_lock_key('key')))
+        self.assertEqual(self.flight.do('key', self.compute), 2)
+
+    def test_concurrent_callers_share_exception(self):
+        """
+        Test that the exception of a computation is raised to every waiting caller.
+        """
+
+        def fail():
+            self.calls += 1
+            time.sleep(0.2)
+            raise ValueError('upstream down')
+
+        results = self.run_threads(lambda: self.flight.do('key', fail))
+        # Verify that the failing computation ran once and every caller got its exception
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(self.flight.calls, {})
+
+    def test_async_callers_share_sync_computation(self):
+        """
+        Test that coroutines join a computation led by a thread, and coalesce among themselves.
+        """
+
+        async def compute_async():
+            return self.compute()
+
+        async def gather():
+            return await asyncio.gather(*[self.flight.do_async('key', compute_async) for _ in range(4)])
+
+        leader = threading.Thread(target=self.flight.do, args=('key', self.compute))
+        leader.start()
+        time.sleep(0.05)
+        results = asyncio.run(gather())
+        leader.join()
+        # Verify that the coroutines waited for the computation of the thread
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 4)
+
+    def test_lock_held_by_another_process_is_waited_for(self):
+        """
+        Test that a computation waits while the cross-process lock of its key is held.
+        """
+
+        caches['default'].set(self.flight.get_lock_key('key'), 'other', 1)
+        started = time.monotonic()
+        # Verify that the computation ran once the lock expired
+        self.assertEqual(self.flight.do('key', lambda: 'done'), 'done')
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
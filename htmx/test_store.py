@@ -0,0 +1,499 @@
+# Import datetime for building test observations
+import datetime
+# Import threading for writing to the store from several threads at once
+import threading
+# Import mock for detecting unexpected store reads
+from unittest import mock
+
+# Import connections for closing the database connections of writer threads
+from django.db import connections
+# Import TestCase for testing code that uses the database, and TransactionTestCase whose data is visible to other threads
+from django.test import TestCase, TransactionTestCase
+# Import pandas for building test series
+import pandas as pd
+
+# Import the store module and the models backing it
+from . import store, utilities
+from .models import Series
+# Import IndicatorGroup for building large series families
+from .indicators import IndicatorGroup
+
+
+def make_series(series_id, values, start='2010-01-01', freq='AS'):
+    """
+    Build an observation series like the ones returned by the FRED fetchers.
+
+    Args:
+        series_id (str): The FRED series ID.
+        values (list): Observation values.
+        start (str): Date of the first observation.
+        freq (str): Pandas frequency of the observations.
+
+    Returns:
+        pandas.Series: Observation values indexed by date.
+    """
+
+    index = pd.date_range(start, periods=len(values), freq=freq, name='DATE')
+    return pd.Series(values, index=index, dtype='float64', name=series_id)
+
+
+class SeriesStoreTestCase(TestCase):
+    """
+    Test case for the SeriesStore class.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Create a store that never considers a series fresh
+        self.store = store.SeriesStore(max_age=0)
+        # Record the arguments of every upstream fetch
+        self.calls = []
+
+    def fetch(self, series_id, start):
+        """
+        Fake upstream fetch returning a fixed series from the requested start.
+        """
+
+        self.calls.append((series_id, start))
+        series = make_series(series_id, [33.4, 33.7, float('nan'), 32.9])
+        if start is None:
+            return series
+        return series[series.index >= pd.Timestamp(start)]
+
+    def test_get_series_backfills_empty_store(self):
+        """
+        Test that an empty series is fetched from the given start and stored.
+        """
+
+        series = self.store.get_series('SIPOVGINIFRA', self.fetch, start=datetime.date(2000, 1, 1))
+        # Verify that the full history was requested
+        self.assertEqual(self.calls, [('SIPOVGINIFRA', datetime.date(2000, 1, 1))])
+        # Verify that missing values survive the round trip as NaN
+        self.assertEqual(series.isna().tolist(), [False, False, True, False])
+        # Verify that the stored values match the fetched ones
+        self.assertEqual(series.iloc[1], 33.7)
+        # Verify that storing new observations bumped the version
+        self.assertEqual(self.store.get_version('SIPOVGINIFRA'), 1)
+
+    def test_get_series_fetches_only_tail(self):
+        """
+        Test that a stale series is refreshed from its latest stored observation.
+        """
+
+        self.store.get_series('SIPOVGINIFRA', self.fetch)
+        self.store.get_series('SIPOVGINIFRA', self.fetch)
+        # Verify that the second fetch started at the latest stored date
+        self.assertEqual(self.calls[1], ('SIPOVGINIFRA', datetime.date(2013, 1, 1)))
+        # Verify that an unchanged tail does not bump the version
+        self.assertEqual(self.store.get_version('SIPOVGINIFRA'), 1)
+
+    def test_get_series_skips_upstream_when_fresh(self):
+        """
+        Test that a fresh series is served without contacting upstream.
+        """
+
+        fresh_store = store.SeriesStore(max_age=3600)
+        fresh_store.get_series('SIPOVGINIFRA', self.fetch)
+        series = fresh_store.get_series('SIPOVGINIFRA', self.fetch)
+        # Verify that upstream was contacted only once
+        self.assertEqual(len(self.calls), 1)
+        # Verify that all observations were served from the store
+        self.assertEqual(len(series), 4)
+
+    def test_save_merges_revised_tail(self):
+        """
+        Test that new and revised observations replace the stored tail.
+        """
+
+        self.store.save('SP500', make_series('SP500', [1.0, 2.0, 3.0]))
+        version = self.store.save('SP500', make_series('SP500', [3.5, 4.0], start='2012-01-01'))
+        # Verify that the revision and the new observation were merged
+        self.assertEqual(self.store.load('SP500').tolist(), [1.0, 2.0, 3.5, 4.0])
+        # Verify that the change bumped the version
+        self.assertEqual(version, 2)
+        # Verify that the fetch time was recorded
+        self.assertIsNotNone(Series.objects.get(series_id='SP500').fetched_at)
+
+
+class SeriesStoreConcurrencyTestCase(TransactionTestCase):
+    """
+    Test case for writing to the store from several threads at once.
+    """
+
+    def test_concurrent_saves_wait_for_the_write_lock(self):
+        """
+        Test that concurrent saves of the same and of different series wait for each other instead of failing.
+        """
+
+        count = 8
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def save(index):
+            try:
+                # Start every save at the same time
+                barrier.wait()
+                series_id = 'SP500' if index % 2 else f'SERIES{index}'
+                store.series_store.save(series_id, make_series(series_id, [float(index), 2.0]))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=save, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Verify that no save failed with "database is locked"
+        self.assertEqual(errors, [])
+        # Verify that every save was merged
+        self.assertEqual(Series.objects.count(), count // 2 + 1)
+        self.assertEqual(len(store.series_store.load('SP500')), 2)
+
+
+class SeriesStoreBackfillTestCase(TestCase):
+    """
+    Test case for fetching the history missing before a stored series.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Store a series starting in 2012, as if it was first requested for a late window
+        self.store = store.SeriesStore(max_age=3600)
+        self.store.refresh('SP500', lambda series_id, start: make_series(series_id, [3.0, 4.0], start='2012-01-01'), start=datetime.date(2012, 1, 1))
+        # Record the arguments of every upstream fetch
+        self.calls = []
+
+    def fetch(self, series_id, start, end):
+        """
+        Fake upstream fetch returning two years of history before 2012.
+        """
+
+        self.calls.append((start, end))
+        series = make_series(series_id, [1.0, 2.0])
+        return series[series.index >= pd.Timestamp(start)]
+
+    def test_backfill_fetches_only_missing_head(self):
+        """
+        Test that an earlier window fetches only the range before the stored series and keeps its tail.
+        """
+
+        version = self.store.backfill('SP500', self.fetch, datetime.date(2010, 1, 1))
+        # Verify that only the missing range was requested
+        self.assertEqual(self.calls, [(datetime.date(2010, 1, 1), datetime.date(2011, 12, 31))])
+        # Verify that the head was merged without touching the stored tail
+        self.assertEqual(self.store.load('SP500').tolist(), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(version, 2)
+
+    def test_backfill_skips_covered_windows(self):
+        """
+        Test that windows starting within the fetched history are not fetched again.
+        """
+
+        self.store.backfill('SP500', lambda series_id, start, end: make_series(series_id, []), datetime.date(2005, 1, 1))
+        self.store.backfill('SP500', self.fetch, datetime.date(2008, 1, 1))
+        self.store.backfill('SP500', self.fetch, datetime.date(2013, 1, 1))
+        # Verify that upstream having nothing before 2012 was remembered
+        self.assertEqual(self.calls, [])
+        self.assertEqual(Series.objects.get(series_id='SP500').start, datetime.date(2005, 1, 1))
+
+
+class GiniIndexStoreTestCase(TestCase):
+    """
+    Test case for reading GiniIndex results from the series store.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Rebuild the shared panel from this test's store
+        utilities.gini_panel.clear()
+
+    def test_get_results_reads_fresh_series_from_store(self):
+        """
+        Test that fresh series are read from the store without starting any download.
+        """
+
+        gini = utilities.GiniIndex(2011)
+        for ticker in gini.inputs.values():
+            store.series_store.save('SIPOVGINI' + ticker, make_series('SIPOVGINI' + ticker, [30.1, 31.2]))
+        results = gini.get_results()
+        # Verify that no tails were downloaded
+        self.assertEqual(gini.tails, {})
+        # Verify that every country reports the value of the requested year
+        self.assertEqual(set(results.values()), {'31.2'})
+
+    def test_get_results_switches_years_from_panel(self):
+        """
+        Test that switching years is served from the panel without touching the store.
+        """
+
+        for ticker in utilities.GiniIndex(2010).inputs.values():
+            store.series_store.save('SIPOVGINI' + ticker, make_series('SIPOVGINI' + ticker, [30.1, 31.2]))
+        utilities.GiniIndex(2011).get_results()
+        with mock.patch.object(store.series_store, 'load', side_effect=AssertionError('store read')):
+            results = utilities.GiniIndex(2010).get_results()
+        # Verify that the other year was sliced from the panel
+        self.assertEqual(set(results.values()), {'30.1'})
+
+
+class CrossSectionTestCase(TestCase):
+    """
+    Test case for comparing one year of a large family of series across countries.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # A family as large as the World Bank country list
+        self.group = IndicatorGroup('gdp', {f'COUNTRY {index:03d}': f'C{index:03d}' for index in range(250)}, template='NYGDP{code}', format='csv')
+        for index, series_id in enumerate(self.group.series_ids.values()):
+            # Every tenth country has no value for 2011
+            values = [float(index), float('nan') if index % 10 == 0 else 1000.0 - index]
+            store.series_store.save(series_id, make_series(series_id, values))
+        self.section = utilities.CrossSection(self.group, 2011, panel=utilities.SnapshotPanel())
+
+    def test_fresh_family_is_read_in_constant_queries(self):
+        """
+        Test that a fresh family is read from the store in a fixed number of queries, whatever its size.
+        """
+
+        # Verify that the staleness check, the observations and the versions each took one query
+        with self.assertNumQueries(3):
+            results = self.section.get_results()
+        # Verify that countries lacking the year were left out
+        self.assertEqual(len(results), 225)
+        self.assertEqual(results['COUNTRY 001'], '999.0')
+
+    def test_dataset_is_sorted_by_value(self):
+        """
+        Test that the bar chart dataset of the year is sorted by value as a float32 column.
+        """
+
+        self.section.get_results()
+        dataset = self.section.get_dataset()
+        # Verify that the lowest value comes first
+        self.assertEqual(dataset['countries'][:2], ['COUNTRY 249', 'COUNTRY 248'])
+        self.assertEqual(dataset['vals'].dtype.name, 'float32')
+        self.assertTrue((dataset['vals'][1:] >= dataset['vals'][:-1]).all())
+
+    def test_stale_series_are_fetched_in_one_pass(self):
+        """
+        Test that only stale series are downloaded, and that failed ones keep their stored values.
+        """
+
+        stale = ['NYGDPC001', 'NYGDPC002']
+        Series.objects.filter(series_id__in=stale).update(fetched_at=None)
+        calls = []
+
+        def fetch(series_id, start):
+            calls.append((series_id, start))
+            if series_id == 'NYGDPC002':
+                raise utilities.RemoteDataError('down')
+            return make_series(series_id, [5.0], start='2011-01-01')
+
+        with mock.patch.object(utilities, 'fetch_fred_csv', fetch), self.assertLogs('htmx.utilities', 'WARNING'):
+            results = self.section.get_results()
+        # Verify that each stale series was fetched from its latest stored observation
+        self.assertEqual(sorted(calls), [(series_id, datetime.date(2011, 1, 1)) for series_id in stale])
+        self.assertEqual(results['COUNTRY 001'], '5.0')
+        self.assertEqual(results['COUNTRY 002'], '998.0')
+        # Verify that the panel is rebuilt again on next use, since a series failed
+        self.assertTrue(self.section.panel.is_stale())
+
+
+class CpiIndexStoreTestCase(TestCase):
+    """
+    Test case for the CPI chart window read from the series store.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Store 24 years of CPI with one missing value
+        values = [1.0 + x / 10 for x in range(24)]
+        values[5] = float('nan')
+        store.series_store.save('FPCPITOTLZGPOL', make_series('FPCPITOTLZGPOL', values, start='2000-01-01'))
+
+    def test_get_columns_full_history(self):
+        """
+        Test that the full stored history is charted by default, without missing values.
+        """
+
+        columns = utilities.CpiIndex('FPCPITOTLZGPOL').get_columns()
+        # Verify that every year but the missing one is charted
+        self.assertEqual(len(columns['x']), 23)
+        self.assertEqual((columns['x'][0], columns['x'][-1]), (2000, 2023))
+        self.assertNotIn(2005, columns['x'])
+
+    def test_get_columns_window(self):
+        """
+        Test that only the requested years are charted.
+        """
+
+        columns = utilities.CpiIndex('FPCPITOTLZGPOL', start=2010, end=2012).get_columns()
+        # Verify that the window is inclusive
+        self.assertEqual(columns['x'].tolist(), [2010, 2011, 2012])
+        self.assertEqual(columns['y'].astype('float64').round(2).tolist(), [2.0, 2.1, 2.2])
+
+    def test_get_columns_downsamples_long_windows(self):
+        """
+        Test that windows longer than the point budget are downsampled.
+        """
+
+        with mock.patch.object(utilities, 'CHART_MAX_POINTS', 10):
+            columns = utilities.CpiIndex('FPCPITOTLZGPOL').get_columns()
+        # Verify that the point budget is kept and the window still spans the full history
+        self.assertEqual(len(columns['x']), 10)
+        self.assertEqual((columns['x'][0], columns['x'][-1]), (2000, 2023))
+
+    def test_window_has_its_own_cache_parameter(self):
+        """
+        Test that windowed charts are cached apart from the full history.
+        """
+
+        # Verify that the default chart keeps the plain symbol
+        self.assertEqual(utilities.CpiIndex('FPCPITOTLZGPOL').get_parameter(), 'FPCPITOTLZGPOL')
+        self.assertEqual(utilities.CpiIndex('FPCPITOTLZGPOL', start=2010).get_parameter(), 'FPCPITOTLZGPOL:2010-None')
+
+    def test_refresh_backfills_history(self):
+        """
+        Test that an early window and the default chart fetch the history missing before the stored series.
+        """
+
+        calls = []
+
+        def fetch(series_id, start, end):
+            calls.append((start, end))
+            return make_series(series_id, [0.5 + x for x in range(40)], start='1960-01-01')[start:end]
+
+        with mock.patch.object(utilities, 'fetch_fred_csv', fetch):
+            utilities.CpiIndex('FPCPITOTLZGPOL', start=1980).refresh()
+            utilities.CpiIndex('FPCPITOTLZGPOL').refresh()
+        # Verify that the window, then the rest of the group history, were fetched before the year 2000
+        self.assertEqual(calls, [
+            (datetime.date(1980, 1, 1), datetime.date(1999, 12, 31)),
+            (datetime.date(1960, 1, 1), datetime.date(1979, 12, 31)),
+        ])
+        columns = utilities.CpiIndex('FPCPITOTLZGPOL', start=1975, end=1985).get_columns()
+        # Verify that the window is charted from the backfilled history
+        self.assertEqual((columns['x'][0], columns['x'][-1]), (1975, 1985))
+
+
+class StockIndexStoreTestCase(TestCase):
+    """
+    Test case for fetching the stock history behind windowed and default charts.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Record the range of every upstream fetch
+        self.calls = []
+        self.group_start = utilities.indicators['stock'].start
+
+    def fetch(self, series_id, start=None, end=None):
+        """
+        Fake upstream fetch returning monthly closes since 1995 within the requested range.
+        """
+
+        self.calls.append((start, end))
+        series = make_series(series_id, [100.0 + x for x in range(360)], start='1995-01-01', freq='MS')
+        return series[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+
+    def test_window_first_fetches_group_start(self):
+        """
+        Test that a window requested on an empty store fetches the history of the default chart as well.
+        """
+
+        with mock.patch.object(utilities, 'fetch_fred_csv', self.fetch):
+            utilities.StockIndex('SP500', start=datetime.date(2023, 1, 1)).refresh()
+            utilities.StockIndex('SP500').refresh()
+            utilities.StockIndex('SP500', start=datetime.date(2099, 1, 1)).refresh()
+        # Verify that the first fetch started at the group start, and nothing was fetched again
+        self.assertEqual(self.calls, [(self.group_start, None)])
+        # Verify that the default chart reads the full history since the group start
+        self.assertEqual(store.series_store.load('SP500').index[0].date(), self.group_start)
+
+    def test_default_chart_backfills_truncated_store(self):
+        """
+        Test that the default chart fetches the history missing before a series stored from a late window.
+        """
+
+        store.series_store.save('SP500', make_series('SP500', [1.0, 2.0], start='2023-01-01', freq='MS'), start=datetime.date(2023, 1, 1))
+        with mock.patch.object(utilities, 'fetch_fred_csv', self.fetch):
+            utilities.StockIndex('SP500').refresh()
+        # Verify that only the missing head was requested
+        self.assertEqual(self.calls, [(self.group_start, datetime.date(2022, 12, 31))])
+        self.assertEqual(store.series_store.load('SP500').index[0].date(), self.group_start)
+
+
+class CpiComparisonStoreTestCase(TestCase):
+    """
+    Test case for comparing CPI series read from the series store.
+    """
+
+    def test_get_frame_aligns_years(self):
+        """
+        Test that series covering different years are aligned on a shared year index.
+        """
+
+        store.series_store.save('FPCPITOTLZGDEU', make_series('FPCPITOTLZGDEU', [1.5, 2.5, 3.5]))
+        store.series_store.save('FPCPITOTLZGPOL', make_series('FPCPITOTLZGPOL', [4.0, 5.0], start='2011-01-01'))
+        frame = utilities.CpiComparison(['FPCPITOTLZGDEU', 'FPCPITOTLZGPOL']).get_frame()
+        # Verify that the index spans the years of both series
+        self.assertEqual(frame.index.tolist(), [2010, 2011, 2012])
+        # Verify that the missing year is NaN
+        self.assertTrue(pd.isna(frame.loc[2010, 'FPCPITOTLZGPOL']))
+        self.assertEqual(frame.loc[2012, 'FPCPITOTLZGPOL'], 5.0)
+
+    def test_refresh_fetches_stale_series_in_one_pass(self):
+        """
+        Test that every stale series is fetched in one pass and failures fall back to the stored copy.
+        """
+
+        store.series_store.save('FPCPITOTLZGITA', make_series('FPCPITOTLZGITA', [1.0]))
+        calls = []
+
+        def fetch(series_id, start):
+            calls.append(series_id)
+            if series_id == 'FPCPITOTLZGITA':
+                raise utilities.RemoteDataError('down')
+            return make_series(series_id, [2.0, 3.0])
+
+        comparison = utilities.CpiComparison(['FPCPITOTLZGDEU', 'FPCPITOTLZGITA'])
+        with mock.patch.object(store.series_store, 'max_age', 0), mock.patch.object(utilities, 'fetch_fred_csv', fetch):
+            version = comparison.refresh()
+        # Verify that both series were fetched
+        self.assertEqual(sorted(calls), ['FPCPITOTLZGDEU', 'FPCPITOTLZGITA'])
+        # Verify that the failed series kept its stored version
+        self.assertEqual(version, '1-1')
+        self.assertEqual(comparison.get_frame()['FPCPITOTLZGITA'].iloc[0], 1.0)
+
+    def test_refresh_fails_without_any_series(self):
+        """
+        Test that a comparison without any stored or downloaded series reports an upstream error.
+        """
+
+        def fetch(series_id, start):
+            raise utilities.RemoteDataError('down')
+
+        with mock.patch.object(utilities, 'fetch_fred_csv', fetch):
+            # Verify that the view will render the error message
+            with self.assertRaises(utilities.RemoteDataError):
+                utilities.CpiComparison(['FPCPITOTLZGDEU']).refresh()
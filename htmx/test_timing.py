@@ -0,0 +1,113 @@
+# Import time for spending measurable time in stages
+import time
+# Import unittest for creating and running tests
+import unittest
+
+# Import RequestFactory for building requests
+from django.test import RequestFactory
+
+# Import the timing module
+from . import timing
+# Import the timing middleware
+from .middleware import timing_middleware
+
+
+class StageTestCase(unittest.TestCase):
+    """
+    Test case for the stage timer.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        timing.timing_registry.clear()
+
+    def test_nested_stages_record_exclusive_time(self):
+        """
+        Test that a stage records only the time spent outside of the stages nested within it.
+        """
+
+        timings = []
+        token = timing.request_timings.set(timings)
+        try:
+            with timing.stage('bokeh'):
+                time.sleep(0.01)
+                with timing.stage('components'):
+                    time.sleep(0.05)
+        finally:
+            timing.request_timings.reset(token)
+        durations = dict(timings)
+        # Verify that stages are collected for the request in the order they ended
+        self.assertEqual([name for name, duration in timings], ['components', 'bokeh'])
+        # Verify that the nested stage is not counted twice
+        self.assertGreaterEqual(durations['components'], 50)
+        self.assertLess(durations['bokeh'], 50)
+        # Verify that nothing was recorded outside of the request
+        self.assertEqual(timing.timing_registry.get_summary(), {})
+
+    def test_stage_decorator_outside_request(self):
+        """
+        Test that decorated functions are timed on every call and recorded as background stages.
+        """
+
+        @timing.stage('pandas')
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        self.assertEqual(work(), 42)
+        # Verify that both calls were recorded under the background view
+        self.assertEqual(timing.timing_registry.get_summary()[timing.BACKGROUND]['pandas']['count'], 2)
+
+    def test_middleware_stops_collecting_when_view_raises(self):
+        """
+        Test that a request whose view raised stops collecting stages.
+        """
+
+        def view(request):
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            timing_middleware(view)(RequestFactory().get('/'))
+        # Verify that later stages of the thread are recorded as background stages
+        self.assertIsNone(timing.request_timings.get())
+
+    def test_server_timing(self):
+        """
+        Test that stage durations are added up and formatted as a Server-Timing header.
+        """
+
+        totals = timing.get_stage_totals([('fetch', 10.0), ('store', 1.25), ('fetch', 5.0)])
+        # Verify that repeated stages are summed and the total comes last
+        self.assertEqual(timing.get_server_timing(totals, 20.0), 'fetch;dur=15.0, store;dur=1.2, total;dur=20.0')
+
+
+class HistogramTestCase(unittest.TestCase):
+    """
+    Test case for the stage duration histograms.
+    """
+
+    def test_quantiles(self):
+        """
+        Test that quantiles are estimated from bucket bounds and capped by the slowest duration.
+        """
+
+        histogram = timing.Histogram()
+        for duration in [0.5] * 90 + [30] * 9 + [700]:
+            histogram.observe(duration)
+        summary = histogram.as_dict()
+        # Verify that each quantile reports the bound of the bucket it falls into
+        self.assertEqual((summary['p50_ms'], summary['p90_ms'], summary['p99_ms']), (1, 1, 50))
+        self.assertEqual(histogram.get_quantile(1), 700)
+        # Verify the counts of the buckets
+        self.assertEqual((summary['buckets']['1'], summary['buckets']['50'], summary['buckets']['1000']), (90, 9, 1))
+        self.assertEqual(summary['count'], 100)
+
+    def test_empty(self):
+        """
+        Test that an empty histogram has no quantiles.
+        """
+
+        self.assertIsNone(timing.Histogram().as_dict()['p50_ms'])
@@ -1,7 +1,25 @@
 # Import unittest for creating and running tests
 import unittest
-# Import the utilities module
-from . import utilities
+# Import mock for replacing upstream requests
+from unittest import mock
+# Import datetime for building request start dates
+import datetime
+# Import threading for tracking concurrent fetches
+import threading
+# Import time for simulating slow fetches
+import time
+# Import numpy for building test prices
+import numpy as np
+# Import pandas for building test series
+import pandas as pd
+# Import requests for raising request exceptions
+import requests
+# Import urllib3 for the errors of retried requests
+import urllib3
+# Import caches for clearing the stored upstream validators
+from django.core.cache import caches
+# Import the utilities module, and the timing module for collecting request stages
+from . import timing, utilities
 
 class UtilitiesTestCase(unittest.TestCase):
     """
@@ -40,13 +58,13 @@ class UtilitiesTestCase(unittest.TestCase):
 
     def test_gini_index_get_data(self):
         """
-        Test the get_data method of the GiniIndex class.
+        Test that the GiniIndex class reads the value of a country from the shared panel.
         """
         
-        self.gini.get_data(name='FRANCE', ticker='FRA')
-        data = {'FRANCE': '33.7'}
-        # Verify that the results attribute contains the expected data
-        self.assertEquals(self.gini.results, data)
+        self.gini.get_results()
+        # Verify that the value of the year was read from the panel
+        self.assertEquals(self.gini.results['FRANCE'], '33.7')
+        self.assertEquals(self.gini.column['FRANCE'], 33.7)
 
     def test_gini_index_get_results(self):
         """
@@ -89,15 +107,13 @@ class UtilitiesTestCase(unittest.TestCase):
         # Verify that the symbol attribute is correctly set
         self.assertEquals(self.cpi.symbol, 'FPCPITOTLZGDEU')
 
-    def test_cpi_index_get_key(self):
+    def test_cpi_index_get_title(self):
         """
-        Test the get_key method of the CpiIndex class.
+        Test that the CPI chart title names the country of the symbol.
         """
         
-        dictionary = {'key' : 'value'}
-        result = self.cpi.get_key(dictionary, 'value')
-        # Verify that the result is the expected key
-        self.assertEquals(result, ['key'])
+        # Verify that the symbol was mapped back to its country name
+        self.assertEquals(self.cpi.get_title(), 'CPI Index for GERMANY')
 
     def test_cpi_index_get_context(self):
         """
@@ -143,7 +159,293 @@ class UtilitiesTestCase(unittest.TestCase):
         self.assertEquals(data['inputs'], self.stock.inputs)
 
 
+class FetchTestCase(unittest.TestCase):
+    """
+    Test case for the shared upstream session and the FRED fetch functions.
+    """
+
+    def test_create_session(self):
+        """
+        Test the connection pool and retry configuration of the shared session.
+        """
+
+        adapter = utilities.create_session().get_adapter('https://fred.stlouisfed.org')
+        # Verify that requests are sent through the adapter timing them
+        self.assertIsInstance(adapter, utilities.BudgetAdapter)
+        # Verify that retries are bounded in number and in time
+        self.assertIsInstance(adapter.max_retries, utilities.BudgetRetry)
+        self.assertEqual(adapter.max_retries.total, utilities.FETCH_RETRIES)
+        self.assertEqual(adapter.max_retries.budget, utilities.FETCH_BUDGET)
+        # Verify that retries back off exponentially
+        self.assertGreater(adapter.max_retries.backoff_factor, 0)
+
+    def test_retries_stop_at_budget(self):
+        """
+        Test that a failed request is only retried while another attempt fits in the fetch budget.
+        """
+
+        retries = utilities.create_session().get_adapter('https://fred.stlouisfed.org').max_retries
+        error = urllib3.exceptions.ConnectTimeoutError()
+        # Verify that a request failing early is retried
+        utilities.request_clock.started = time.monotonic()
+        self.assertEqual(retries.increment('GET', '/', error=error).total, utilities.FETCH_RETRIES - 1)
+        # Verify that a request failing late is not
+        utilities.request_clock.started = time.monotonic() - utilities.FETCH_BUDGET + sum(utilities.FETCH_TIMEOUT) / 2
+        with self.assertRaises(urllib3.exceptions.MaxRetryError):
+            retries.increment('GET', '/', error=error)
+
+    def test_fetch_fred_csv_uses_shared_session(self):
+        """
+        Test that pandas-datareader requests go through the shared session and leave it open.
+        """
+
+        response = mock.Mock(status_code=200, headers={}, content=b'DATE,SP500\n2020-01-02,3257.85\n2020-01-03,.\n')
+        with mock.patch.object(utilities.fred_session, 'get', return_value=response) as get, \
+                mock.patch.object(utilities.fred_session, 'close') as close:
+            series = utilities.fetch_fred_csv('SP500', start='2020-01-01')
+        # Verify that the request carried the timeout budget
+        self.assertEqual(get.call_args.kwargs['timeout'], utilities.FETCH_TIMEOUT)
+        # Verify that the shared session was not closed
+        close.assert_not_called()
+        # Verify that the values were parsed
+        self.assertEqual(series.iloc[0], 3257.85)
+
+    def test_fetch_fred_csv_bounds_range(self):
+        """
+        Test that the requested range is sent to FRED, so that only its observations are downloaded.
+        """
+
+        response = mock.Mock(status_code=200, headers={}, content=b'DATE,SP500\n2020-01-02,3257.85\n')
+        with mock.patch.object(utilities.fred_session, 'get', return_value=response) as get:
+            utilities.fetch_fred_csv('SP500', start='2020-01-01')
+            utilities.fetch_fred_csv('SP500', start=datetime.date(2019, 1, 1), end=datetime.date(2019, 12, 31))
+        # Verify that a tail is bounded by its start only, and a head by both ends
+        self.assertEqual(get.call_args_list[0].kwargs['params'], {'cosd': '2020-01-01'})
+        self.assertEqual(get.call_args_list[1].kwargs['params'], {'cosd': '2019-01-01', 'coed': '2019-12-31'})
+
+    def test_fetch_all_bounds_concurrency(self):
+        """
+        Test that fetch_all runs fetches concurrently without exceeding the limit.
+        """
+
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def fetch(series_id, start):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return series_id.lower()
+
+        tails = {f'SERIES{x}': None for x in range(6)}
+        results = utilities.fetch_all_sync(tails, fetch, limit=2)
+        # Verify that every series was fetched
+        self.assertEqual(results, {key: key.lower() for key in tails})
+        # Verify that fetches overlapped without exceeding the limit
+        self.assertEqual(state['peak'], 2)
+
+    def test_fetch_all_returns_exceptions(self):
+        """
+        Test that a failed fetch is reported without cancelling the others.
+        """
+
+        def fetch(series_id, start):
+            if series_id == 'SIPOVGINIFRA':
+                raise requests.exceptions.ConnectionError('down')
+            return start
+
+        results = utilities.fetch_all_sync({'SIPOVGINIFRA': 1, 'SIPOVGINIITA': 2}, fetch)
+        # Verify that the failure is returned as the exception
+        self.assertIsInstance(results['SIPOVGINIFRA'], requests.exceptions.ConnectionError)
+        # Verify that the other fetch completed
+        self.assertEqual(results['SIPOVGINIITA'], 2)
+
+    def test_fetch_all_records_wall_time(self):
+        """
+        Test that concurrent fetches are timed once for the request, by the wall time of the pass.
+        """
+
+        def fetch(series_id, start):
+            with timing.stage('fetch'):
+                time.sleep(0.05)
+            return start
+
+        timings = []
+        token = timing.request_timings.set(timings)
+        try:
+            utilities.fetch_all_sync({f'SERIES{x}': x for x in range(4)}, fetch, limit=4)
+        finally:
+            timing.request_timings.reset(token)
+        # Verify that one fetch stage was collected, shorter than the sum of the overlapping fetches
+        self.assertEqual([name for name, duration in timings], ['fetch'])
+        self.assertGreaterEqual(timings[0][1], 50)
+        self.assertLess(timings[0][1], 150)
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+    """
+    Test case for conditional requests to FRED.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Forget the validators of earlier downloads
+        caches['default'].clear()
+
+    def make_text_response(self, status_code, lines=(), headers=None):
+        """
+        Build a fake streamed response for the plain-text data file.
+        """
+
+        response = mock.MagicMock(status_code=status_code, headers=headers or {}, encoding='utf-8')
+        response.__enter__.return_value = response
+        # Observation rows follow the column header of the data file
+        response.iter_lines.return_value = iter(['DATE          VALUE', *lines])
+        return response
+
+    def test_fetch_fred_text_sends_validators_for_same_tail(self):
+        """
+        Test that the validators of a download are sent when the next tail starts at its last observation.
+        """
+
+        first = self.make_text_response(200, ['2010-01-01  33.4', '2011-01-01  33.7'], {'ETag': '"v1"', 'Last-Modified': 'Mon, 04 Jan 2021 00:00:00 GMT'})
+        second = self.make_text_response(304)
+        with mock.patch.object(utilities.fred_session, 'get', side_effect=[first, second]) as get:
+            utilities.fetch_fred_text('SIPOVGINIFRA')
+            series = utilities.fetch_fred_text('SIPOVGINIFRA', start=pd.Timestamp('2011-01-01'))
+        # Verify that the first download was unconditional
+        self.assertEqual(get.call_args_list[0].kwargs['headers'], {})
+        # Verify that the second download carried both validators
+        self.assertEqual(get.call_args_list[1].kwargs['headers'], {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 04 Jan 2021 00:00:00 GMT'})
+        # Verify that 304 is reported as an empty tail
+        self.assertTrue(series.empty)
+
+    def test_fetch_fred_text_skips_validators_for_other_start(self):
+        """
+        Test that a download starting elsewhere, such as a backfill after a reset, is unconditional.
+        """
+
+        first = self.make_text_response(200, ['2010-01-01  33.4'], {'ETag': '"v1"'})
+        second = self.make_text_response(200, ['2010-01-01  33.4'], {'ETag': '"v1"'})
+        with mock.patch.object(utilities.fred_session, 'get', side_effect=[first, second]) as get:
+            utilities.fetch_fred_text('SIPOVGINIFRA')
+            series = utilities.fetch_fred_text('SIPOVGINIFRA', start=datetime.date(2000, 1, 1))
+        # Verify that no validators were sent
+        self.assertEqual(get.call_args.kwargs['headers'], {})
+        # Verify that the observations were returned
+        self.assertEqual(len(series), 1)
+
+    def test_fetch_fred_csv_handles_not_modified(self):
+        """
+        Test that pandas-datareader downloads are conditional and treat 304 as an empty tail.
+        """
 
-    
+        first = mock.Mock(status_code=200, headers={'ETag': '"v1"'}, content=b'DATE,SP500\n2020-01-02,3257.85\n2020-01-03,3234.85\n')
+        second = mock.Mock(status_code=304, headers={})
+        with mock.patch.object(utilities.fred_session, 'get', side_effect=[first, second]) as get:
+            utilities.fetch_fred_csv('SP500', start='2020-01-01')
+            series = utilities.fetch_fred_csv('SP500', start=datetime.date(2020, 1, 3))
+        # Verify that the second download carried the entity tag
+        self.assertEqual(get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        # Verify that 304 is reported as an empty tail
+        self.assertTrue(series.empty)
 
 
+class SnapshotPanelTestCase(unittest.TestCase):
+    """
+    Test case for the SnapshotPanel class.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        self.panel = utilities.SnapshotPanel(max_age=60)
+        index = pd.to_datetime(['2010-01-01', '2011-01-01'])
+        self.panel.update({
+            'FRANCE': pd.Series([33.7, 32.9], index=index),
+            'ITALY': pd.Series([34.7, float('nan')], index=index)
+        }, '1-1')
+
+    def test_get_year(self):
+        """
+        Test that a year is sliced from the panel without countries lacking data.
+        """
+
+        # Verify the values of a complete year
+        self.assertEqual(self.panel.get_year('2010'), {'FRANCE': '33.7', 'ITALY': '34.7'})
+        # Verify that missing values are left out
+        self.assertEqual(self.panel.get_year(2011), {'FRANCE': '32.9'})
+        # Verify that unknown or invalid years are empty
+        self.assertEqual(self.panel.get_year(1990), {})
+        self.assertEqual(self.panel.get_year('abc'), {})
+
+    def test_is_stale(self):
+        """
+        Test the refresh schedule of the panel.
+        """
+
+        # Verify that a freshly built panel is served
+        self.assertFalse(self.panel.is_stale())
+        # Verify that the version of the build is kept
+        self.assertEqual(self.panel.version, '1-1')
+        self.panel.clear()
+        # Verify that a cleared panel has to be rebuilt
+        self.assertTrue(self.panel.is_stale())
+
+    def test_incomplete_update_is_stale(self):
+        """
+        Test that a panel built while some series failed to refresh is rebuilt on next use.
+        """
+
+        self.panel.update({'FRANCE': pd.Series([33.7], index=pd.to_datetime(['2010-01-01']))}, '1', complete=False)
+        # Verify that the partial panel is served
+        self.assertEqual(self.panel.get_year(2010), {'FRANCE': '33.7'})
+        # Verify that it is rebuilt on next use
+        self.assertTrue(self.panel.is_stale())
+
+
+class SplitReturnsTestCase(unittest.TestCase):
+    """
+    Test case for the split_returns function.
+    """
+
+    def test_split_returns(self):
+        """
+        Test that returns are split by sign and equalized in length.
+        """
+
+        closes = np.array([100.0, 110.0, 99.0, 99.0, 108.9, 98.01])
+        positive_return, negative_return = utilities.split_returns(closes)
+        # Verify that zero returns count as positive and lengths are matched
+        np.testing.assert_allclose(positive_return, [10.0, 0.0])
+        np.testing.assert_allclose(negative_return, [-10.0, -10.0])
+
+    def test_split_returns_skips_missing_closes(self):
+        """
+        Test that missing closes produce neither NaN nor zero returns.
+        """
+
+        closes = np.array([np.nan, 100.0, np.nan, 110.0, 99.0])
+        positive_return, negative_return = utilities.split_returns(closes)
+        # Verify that the return spans the missing close
+        np.testing.assert_allclose(positive_return, [10.0])
+        np.testing.assert_allclose(negative_return, [-10.0])
+
+    def test_split_returns_limit(self):
+        """
+        Test that each side is capped at the limit.
+        """
+
+        closes = np.cumprod(np.tile([1.01, 0.99], 50))
+        positive_return, negative_return = utilities.split_returns(closes, limit=10)
+        # Verify that both sides were capped
+        self.assertEqual(len(positive_return), 10)
+        self.assertEqual(len(negative_return), 10)
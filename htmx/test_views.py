@@ -1,10 +1,29 @@
+# Import json for reading structured log records
+import json
+# Import tempfile for a throwaway artifact directory
+import tempfile
+
+# Import User for requesting the debug endpoint as staff
+from django.contrib.auth.models import User
+# Import caches for dropping rendered charts between tests
+from django.core.cache import caches
 # Import TestCase and Client for testing Django views
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 # Import reverse and resolve for URL resolution
 from django.urls import reverse, resolve
 
-# Import views from the current module
+# Import iscoroutinefunction for checking async views
+from asyncio import iscoroutinefunction
+# Import decode_base64_dict for reading binary chart columns
+from bokeh.util.serialization import decode_base64_dict
+
+# Import views and the series store from the current module
 from . import views
+from .store import series_store
+from .timing import timing_registry
+from .utilities import gini_panel, indicators
+# Import the series factory shared with the store tests
+from .test_store import make_series
 
 
 class GlobalMacroTest(TestCase):
@@ -135,8 +154,412 @@ class GlobalMacroTest(TestCase):
         # Verify that the correct template is used in the response for 404 error
         self.assertTemplateUsed(response, '404.html')
 
-    
 
+class StoredChartsTestCase(TestCase):
+    """
+    Base test case serving the default charts from fresh series in the store.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Write hexbin artifacts to a temporary directory
+        self.root = tempfile.TemporaryDirectory()
+        self.settings = override_settings(HEXBIN_ROOT=self.root.name)
+        self.settings.enable()
+        # Create an instance of the Django test client
+        self.client = Client()
+        # Rebuild the shared Gini panel from this test's store
+        gini_panel.clear()
+        # Store fresh copies of the series behind the default charts
+        for ticker in ['FRA', 'ITA', 'NOR', 'POL', 'SWE', 'GBR']:
+            series_store.save('SIPOVGINI' + ticker, make_series('SIPOVGINI' + ticker, [30.1, 31.2]))
+        # Record the CPI and stock histories as fetched from their group start, like the first fetch does
+        series_store.save('FPCPITOTLZGPOL', make_series('FPCPITOTLZGPOL', [1.5 + x for x in range(12)]), start=indicators['cpi'].start)
+        series_store.save('SP500', make_series('SP500', [100 + (-1) ** x * x for x in range(60)], freq='D'), start=indicators['stock'].start)
+
+    def tearDown(self):
+        """
+        Clean up test fixtures after each test method.
+        """
+
+        self.settings.disable()
+        self.root.cleanup()
+
+
+class AsyncViewsTest(StoredChartsTestCase):
+    """
+    Test case for serving the chart views asynchronously from the series store.
+    """
 
+    def test_chart_views_are_async(self):
+        """
+        Test that the chart views are coroutine functions.
+        """
+
+        # Verify that every chart view can be awaited by the ASGI handler
+        for view in [views.gini, views.cpi, views.stock]:
+            self.assertTrue(iscoroutinefunction(view))
+
+    def test_gini_get_full_page(self):
+        """
+        Test the full page GET request to the async Gini view.
+        """
+
+        response = self.client.get(reverse('htmx:gini'), {'year': 2011})
+        # Verify that the full page is rendered
+        self.assertTemplateUsed(response, 'gini.html')
+        # Verify that the chart was built for the requested year
+        self.assertIn('GINI Index for (2011)', response.context['script'])
+        # Verify that the values were embedded as a binary array
+        self.assertIn('"vals":{"__ndarray__"', response.context['script'])
+
+    def test_cpi_get_partial(self):
+        """
+        Test the HTMX GET request to the async CPI view.
+        """
+
+        response = self.client.get(reverse('htmx:cpi'), HTTP_HX_REQUEST='true')
+        # Verify that only the partial chart is rendered
+        self.assertTemplateUsed(response, 'partials/chart.html')
+        self.assertTemplateNotUsed(response, 'cpi.html')
+
+    def test_stock_get_partial(self):
+        """
+        Test the HTMX GET request to the async stock view.
+        """
+
+        response = self.client.get(reverse('htmx:stock'), HTTP_HX_REQUEST='true')
+        # Verify that only the partial chart is rendered
+        self.assertTemplateUsed(response, 'partials/chart.html')
+        self.assertTemplateNotUsed(response, 'stock.html')
+        # Verify that the chart components were rendered
+        self.assertIsNotNone(response.context['script'])
+
+    def test_chart_views_reject_unlisted_series(self):
+        """
+        Test that the chart pages only accept the listed series.
+        """
+
+        requests = [
+            (reverse('htmx:cpi'), {'symbol': 'SP500'}),
+            (reverse('htmx:cpi'), {'symbol': 'UNRATE'}),
+            (reverse('htmx:stock'), {'stock': 'UNRATE'}),
+            (reverse('htmx:cpi_compare'), {'symbol': ['FPCPITOTLZGPOL', 'UNRATE']}),
+        ]
+        for path, data in requests:
+            # Verify that the series is not found
+            self.assertEqual(self.client.get(path, data).status_code, 404)
+        # Verify that nothing was stored for the unlisted series
+        self.assertEqual(series_store.get_version('UNRATE'), 0)
+
+
+class CpiCompareViewTest(TestCase):
+    """
+    Test case for the CPI comparison view.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        # Create an instance of the Django test client
+        self.client = Client()
+        # Store fresh copies of two of the compared series
+        series_store.save('FPCPITOTLZGPOL', make_series('FPCPITOTLZGPOL', [1.5 + x for x in range(12)]))
+        series_store.save('FPCPITOTLZGSWE', make_series('FPCPITOTLZGSWE', [0.5 + x for x in range(12)]))
+
+    def test_cpi_compare_get_partial(self):
+        """
+        Test the HTMX GET request to the comparison view for selected countries.
+        """
+
+        response = self.client.get(reverse('htmx:cpi_compare'), {'symbol': ['FPCPITOTLZGPOL', 'FPCPITOTLZGSWE']}, HTTP_HX_REQUEST='true')
+        # Verify that only the partial chart is rendered
+        self.assertTemplateUsed(response, 'partials/chart.html')
+        # Verify that one line was overlaid per selected country
+        self.assertIn('"name":"POLAND"', response.context['script'].replace(' ', ''))
+        self.assertIn('"name":"SWEDEN"', response.context['script'].replace(' ', ''))
+        self.assertEqual(response.context['symbols'], ['FPCPITOTLZGPOL', 'FPCPITOTLZGSWE'])
+
+    def test_cpi_compare_get_full_page(self):
+        """
+        Test the full page GET request to the comparison view.
+        """
+
+        response = self.client.get(reverse('htmx:cpi_compare'), {'symbol': 'FPCPITOTLZGPOL'})
+        # Verify that the full page is rendered
+        self.assertTemplateUsed(response, 'cpi_compare.html')
+        # Verify that the compared country is checked
+        self.assertContains(response, 'value="FPCPITOTLZGPOL" checked')
+
+
+class ConditionalViewsTest(StoredChartsTestCase):
+    """
+    Test case for the caching headers and conditional responses of the chart views.
+    """
+
+    def test_chart_views_set_cache_headers(self):
+        """
+        Test that chart responses carry an ETag, a max age and vary on HX-Request.
+        """
+
+        for name in ['htmx:gini', 'htmx:cpi', 'htmx:stock']:
+            response = self.client.get(reverse(name))
+            # Verify that the response can be revalidated
+            self.assertTrue(response.has_header('ETag'))
+            # Verify that the response may be reused for the configured max age
+            self.assertIn('max-age=60', response['Cache-Control'])
+            # Verify that full pages and partials are cached separately
+            self.assertIn('HX-Request', response['Vary'])
+
+    def test_full_pages_are_not_publicly_cacheable(self):
+        """
+        Test that full pages, which embed the CSRF token, stay out of shared caches while partials do not.
+        """
+
+        response = self.client.get(reverse('htmx:cpi'))
+        not_modified = self.client.get(reverse('htmx:cpi'), HTTP_IF_NONE_MATCH=response['ETag'])
+        for page in [response, not_modified]:
+            # Verify that only the browser may keep the page
+            self.assertIn('private', page['Cache-Control'])
+            self.assertNotIn('public', page['Cache-Control'])
+            # Verify that the page varies on the CSRF cookie
+            self.assertIn('Cookie', page['Vary'])
+        partial = self.client.get(reverse('htmx:cpi'), HTTP_HX_REQUEST='true')
+        # Verify that partials may still be shared
+        self.assertIn('public', partial['Cache-Control'])
 
+    def test_gini_ignores_invalid_year(self):
+        """
+        Test that the GINI index view falls back to the default year for invalid years.
+        """
+
+        etag = self.client.get(reverse('htmx:gini'))['ETag']
+        for year in ['abc', '99999', '-1']:
+            response = self.client.get(reverse('htmx:gini'), {'year': year})
+            # Verify that the default chart was served under its own ETag
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_matching_etag_returns_not_modified(self):
+        """
+        Test that a request carrying the current ETag is answered with 304 without rendering.
+        """
+
+        etag = self.client.get(reverse('htmx:cpi'))['ETag']
+        response = self.client.get(reverse('htmx:cpi'), HTTP_IF_NONE_MATCH=etag)
+        # Verify that the chart was not sent again
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Verify that the validator is repeated
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_follows_partial_and_data_version(self):
+        """
+        Test that partials and new data versions get their own ETag.
+        """
+
+        full = self.client.get(reverse('htmx:cpi'))['ETag']
+        partial = self.client.get(reverse('htmx:cpi'), HTTP_HX_REQUEST='true')['ETag']
+        # Verify that the partial does not match the full page
+        self.assertNotEqual(full, partial)
+        series_store.save('FPCPITOTLZGPOL', make_series('FPCPITOTLZGPOL', [2.5 + x for x in range(12)]))
+        response = self.client.get(reverse('htmx:cpi'), HTTP_IF_NONE_MATCH=full)
+        # Verify that new data invalidates the old ETag
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], full)
+
+
+class ApiViewsTest(StoredChartsTestCase):
+    """
+    Test case for the JSON data endpoints of the charts.
+    """
+
+    def test_chart_pages_link_data_endpoints(self):
+        """
+        Test that every option of the chart selects links the data endpoint of its chart.
+        """
+
+        pages = {
+            'htmx:gini': reverse('htmx:api_gini', args=[2010]),
+            'htmx:cpi': reverse('htmx:api_cpi', args=['FPCPITOTLZGPOL']),
+            'htmx:stock': reverse('htmx:api_stock', args=['SP500']),
+        }
+        for name, url in pages.items():
+            # Verify that the endpoint URL was reversed into the page
+            self.assertContains(self.client.get(reverse(name)), f'data-api-url="{url}"')
+
+    def test_api_gini(self):
+        """
+        Test the JSON columns of the Gini chart.
+        """
+
+        response = self.client.get(reverse('htmx:api_gini', args=[2011]))
+        chart = response.json()
+        # Verify that the title follows the requested year
+        self.assertEqual(chart['title'], 'GINI Index for (2011)')
+        # Verify that the x range factors match the countries column
+        self.assertEqual(chart['factors'], chart['data']['countries'])
+        # Verify that every country reports the stored value
+        self.assertEqual(set(decode_base64_dict(chart['data']['vals']).astype('float64').round(2).tolist()), {31.2})
+
+    def test_api_cpi(self):
+        """
+        Test the JSON columns of the CPI chart.
+        """
+
+        response = self.client.get(reverse('htmx:api_cpi', args=['FPCPITOTLZGPOL']))
+        chart = response.json()
+        # Verify that the title names the country
+        self.assertEqual(chart['title'], 'CPI Index for POLAND')
+        # Verify that twelve years of values are served
+        self.assertEqual(decode_base64_dict(chart['data']['x'])[:2].tolist(), [2010, 2011])
+        self.assertEqual(decode_base64_dict(chart['data']['y'])[:2].tolist(), [1.5, 2.5])
+        # Verify that the response can be revalidated
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_api_cpi_window(self):
+        """
+        Test that the CPI data endpoint serves the requested window of years.
+        """
+
+        response = self.client.get(reverse('htmx:api_cpi', args=['FPCPITOTLZGPOL']), {'start': 2012, 'end': 2014})
+        # Verify that only the years of the window are served
+        self.assertEqual(decode_base64_dict(response.json()['data']['x']).tolist(), [2012, 2013, 2014])
+        # Verify that the window is tagged apart from the full history
+        self.assertNotEqual(response['ETag'], self.client.get(reverse('htmx:api_cpi', args=['FPCPITOTLZGPOL']))['ETag'])
+
+    def test_cpi_ignores_out_of_range_years(self):
+        """
+        Test that CPI windows outside the supported years fall back to the full history.
+        """
+
+        for window in [{'start': 0}, {'start': 99999}, {'end': 0}, {'end': 99999}]:
+            response = self.client.get(reverse('htmx:cpi'), window)
+            # Verify that the page is served with no window
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.context['start'], response.context['end']), (None, None))
+            response = self.client.get(reverse('htmx:api_cpi', args=['FPCPITOTLZGPOL']), window)
+            # Verify that the full history is served
+            self.assertEqual(len(decode_base64_dict(response.json()['data']['x'])), 12)
+
+    def test_api_stock(self):
+        """
+        Test the JSON columns of the stock chart.
+        """
+
+        chart = self.client.get(reverse('htmx:api_stock', args=['SP500'])).json()
+        counts = decode_base64_dict(chart['data']['counts'])
+        # Verify that every tile has coordinates and a count
+        self.assertEqual(len(decode_base64_dict(chart['data']['q'])), len(counts))
+        # Verify that the color range spans the highest count
+        self.assertEqual(chart['high'], counts.max())
+
+    def test_api_stock_frequency(self):
+        """
+        Test that the stock data endpoint serves resampled returns under their own ETag.
+        """
+
+        response = self.client.get(reverse('htmx:api_stock', args=['SP500']), {'frequency': 'monthly', 'start': '2010-01-15'})
+        # Verify that the title follows the frequency
+        self.assertEqual(response.json()['title'], 'Monthly Returns for S&P 500')
+        # Verify that the window is tagged apart from the default chart
+        self.assertNotEqual(response['ETag'], self.client.get(reverse('htmx:api_stock', args=['SP500']))['ETag'])
+
+    def test_stock_ignores_invalid_windows(self):
+        """
+        Test that stock windows out of range or ending before they start fall back to the default chart.
+        """
+
+        default = self.client.get(reverse('htmx:api_stock', args=['SP500']))['ETag']
+        windows = [
+            {'start': '0001-01-01'},
+            {'end': '9999-12-31'},
+            {'start': '2015-01-01', 'end': '2010-01-01'},
+        ]
+        for window in windows:
+            # Verify that the pages and data endpoint serve the default chart
+            self.assertEqual(self.client.get(reverse('htmx:stock'), window).status_code, 200)
+            self.assertEqual(self.client.get(reverse('htmx:api_stock', args=['SP500']), window)['ETag'], default)
+
+    def test_api_rejects_unlisted_series(self):
+        """
+        Test that only the listed series can be requested.
+        """
+
+        response = self.client.get(reverse('htmx:api_cpi', args=['UNRATE']))
+        # Verify that the series is not found
+        self.assertEqual(response.status_code, 404)
+
+    def test_chart_models_are_named(self):
+        """
+        Test that the embedded charts name the models updated in the browser.
+        """
+
+        script = self.client.get(reverse('htmx:gini'), {'year': 2011}).context['script']
+        # Verify that the source, title and x range can be found by name
+        for name in ['chart-source', 'chart-title', 'chart-x-range']:
+            self.assertIn(f'"name":"{name}"', script.replace(' ', ''))
+
+
+class TimingViewsTest(StoredChartsTestCase):
+    """
+    Test case for the request timings of the chart views.
+    """
+
+    def setUp(self):
+        """
+        Set up test fixtures before each test method.
+        """
+
+        super().setUp()
+        # Render every chart again so that all of its stages run
+        caches['charts'].clear()
+        timing_registry.clear()
+
+    def test_server_timing_lists_stages(self):
+        """
+        Test that chart responses report the duration of every stage they ran.
+        """
+
+        with self.assertLogs('htmx.middleware', 'INFO') as logs:
+            response = self.client.get(reverse('htmx:cpi'))
+        metrics = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        # Verify that the stages of an uncached chart are reported, the total last
+        for name in ['store', 'pandas', 'bokeh', 'components', 'template']:
+            self.assertIn(name, metrics)
+        self.assertEqual(metrics[-1], 'total')
+        # Verify that one structured record was logged for the request
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status']), ('cpi', 200))
+        self.assertIn('components', record['stages'])
+
+    def test_histograms_per_view(self):
+        """
+        Test that the durations of routed requests are recorded per view and stage.
+        """
+
+        self.client.get(reverse('htmx:cpi'))
+        self.client.get(reverse('htmx:cpi'))
+        summary = timing_registry.get_summary()
+        # Verify that both requests were counted, and the chart built once
+        self.assertEqual(summary['cpi']['total']['count'], 2)
+        self.assertEqual(summary['cpi']['components']['count'], 1)
+
+    def test_debug_timings(self):
+        """
+        Test that the histograms are served to staff users only.
+        """
 
+        self.client.get(reverse('htmx:gini'))
+        # Verify that anonymous users cannot see the histograms
+        self.assertEqual(self.client.get(reverse('htmx:debug_timings')).status_code, 404)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('htmx:debug_timings'))
+        # Verify that the request to the Gini view was recorded with its quantiles
+        self.assertEqual(response.json()['gini']['total']['count'], 1)
+        self.assertIn('p99_ms', response.json()['gini']['total'])
@@ -0,0 +1,227 @@
+# Import bisect for finding the histogram bucket of a duration
+import bisect
+# Import contextvars for collecting the stages of the current request
+import contextvars
+# Import contextmanager for timing stages with a with statement or a decorator
+from contextlib import contextmanager
+# Import Lock for guarding the shared histograms
+from threading import Lock
+# Import time for measuring stage durations
+import time
+
+
+# Upper bounds of the histogram buckets, in milliseconds, the last bucket holds everything slower
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+# Name under which stages timed outside of a request are recorded
+BACKGROUND = 'background'
+
+# Stage durations of the current request, or None outside of a request
+request_timings = contextvars.ContextVar('request_timings', default=None)
+# Time spent in stages nested within the innermost running stage
+nested_time = contextvars.ContextVar('nested_time', default=None)
+
+
+class Histogram:
+    def __init__(self):
+        """
+        Initialize Histogram, a count of durations per bucket of BUCKETS.
+        """
+
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, duration):
+        """
+        Add a duration.
+
+        Args:
+            duration (float): The duration, in milliseconds.
+        """
+
+        self.counts[bisect.bisect_left(BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def get_quantile(self, quantile):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls into.
+
+        Args:
+            quantile (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimated duration in milliseconds, capped by the slowest duration seen,
+                or None if the histogram is empty.
+        """
+
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + [self.max], self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: Count, total, mean, max and estimated p50/p90/p99 in milliseconds, and
+                the count of every bucket keyed by its upper bound.
+        """
+
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'mean_ms': round(self.total / self.count, 3) if self.count else None,
+            'max_ms': round(self.max, 3),
+            'p50_ms': self.get_quantile(0.5),
+            'p90_ms': self.get_quantile(0.9),
+            'p99_ms': self.get_quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(BUCKETS + ['inf'], self.counts)}
+        }
+
+
+class TimingRegistry:
+    def __init__(self):
+        """
+        Initialize TimingRegistry, the in-process histograms of stage durations keyed by view and stage.
+        """
+
+        self.histograms = {}
+        self.lock = Lock()
+
+    def observe(self, view, stage, duration):
+        """
+        Add the duration of a stage.
+
+        Args:
+            view (str): Name of the view the stage ran for.
+            stage (str): Name of the stage.
+            duration (float): The duration, in milliseconds.
+        """
+
+        with self.lock:
+            self.histograms.setdefault((view, stage), Histogram()).observe(duration)
+
+    def get_summary(self):
+        """
+        Summarize every histogram.
+
+        Returns:
+            dict: Histogram summaries keyed by view, then by stage.
+        """
+
+        summary = {}
+        with self.lock:
+            for (view, stage), histogram in sorted(self.histograms.items()):
+                summary.setdefault(view, {})[stage] = histogram.as_dict()
+        return summary
+
+    def clear(self):
+        """
+        Drop every histogram.
+        """
+
+        with self.lock:
+            self.histograms = {}
+
+
+# Process-wide histograms of the chart pipeline
+timing_registry = TimingRegistry()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of the chart pipeline, as a with statement or a decorator.
+
+    Only the time spent outside of nested stages is recorded, so that the stages of a
+    request add up to the time spent in them. Stages run by the current request, including
+    those run on worker threads that copied its context, are collected for the request;
+    others are recorded straight away under BACKGROUND.
+
+    Args:
+        name (str): Name of the stage, a token usable in a Server-Timing header.
+    """
+
+    parent = nested_time.get()
+    nested = [0.0]
+    token = nested_time.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        nested_time.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        # Concurrent nested stages may overlap, so never record a negative duration
+        duration = max(elapsed - nested[0], 0.0)
+        timings = request_timings.get()
+        if timings is None:
+            timing_registry.observe(BACKGROUND, name, duration)
+        else:
+            timings.append((name, duration))
+
+def run_detached(function, *args):
+    """
+    Run a function on a worker thread without collecting its stages for the current request.
+
+    Concurrent stages overlap, so their durations would add up past the time the request
+    spent waiting for them; the caller times the whole concurrent pass as one stage instead.
+    Outside of a request, the stages are recorded under BACKGROUND as usual. Meant to be
+    called in a copied context, through contextvars.Context.run.
+
+    Args:
+        function (callable): The function.
+        *args: Its arguments.
+
+    Returns:
+        object: The result of the function.
+    """
+
+    if request_timings.get() is not None:
+        # Collect the stages into a list that is dropped with the context
+        request_timings.set([])
+    # Nor count them as nested within the stage of the caller
+    nested_time.set(None)
+    return function(*args)
+
+def get_stage_totals(timings):
+    """
+    Add up the durations of the stages run by a request.
+
+    Args:
+        timings (list): Pairs of stage name and duration in milliseconds, in the order they ended.
+
+    Returns:
+        dict: The total duration of every stage in milliseconds, in order of first completion.
+    """
+
+    totals = {}
+    for name, duration in timings:
+        totals[name] = totals.get(name, 0.0) + duration
+    return totals
+
+def get_server_timing(totals, total):
+    """
+    Format stage durations as a Server-Timing header value.
+
+    Args:
+        totals (dict): The total duration of every stage in milliseconds.
+        total (float): The duration of the whole request in milliseconds.
+
+    Returns:
+        str: The header value, ending with the total duration.
+    """
+
+    metrics = [f'{name};dur={duration:.1f}' for name, duration in totals.items()]
+    metrics.append(f'total;dur={total:.1f}')
+    return ', '.join(metrics)
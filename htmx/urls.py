@@ -6,7 +6,12 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('gini/', views.gini, name='gini'),
     path('cpi/', views.cpi, name='cpi'),
+    path('cpi/compare/', views.cpi_compare, name='cpi_compare'),
     path('stock/', views.stock, name='stock'),
+    path('api/gini/<int:year>/', views.api_gini, name='api_gini'),
+    path('api/cpi/<str:symbol>/', views.api_cpi, name='api_cpi'),
+    path('api/stock/<str:stock>/', views.api_stock, name='api_stock'),
+    path('debug/timings/', views.debug_timings, name='debug_timings'),
 ]
 
 handler404 ='htmx.views.page_not_found'
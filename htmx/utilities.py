@@ -1,15 +1,25 @@
 # Import the math module for mathematical operations
 import math
+# Import hashlib for digesting the data versions of large series families
+import hashlib
 # Import requests for making HTTP requests to APIs
 import requests
 # Import datetime for handling date and time operations
 import datetime
 # Import os for interacting with the operating system
 import os
-# Import Thread class from threading module for concurrent execution
-from threading import Thread
-# Import BeautifulSoup for parsing HTML and XML documents
-from bs4 import BeautifulSoup as bs
+# Import asyncio for running upstream fetches concurrently
+import asyncio
+# Import logging for reporting upstream failures
+import logging
+# Import contextvars for timing fetches run on worker threads as part of the request
+import contextvars
+# Import ThreadPoolExecutor for running blocking fetches off the event loop
+from concurrent.futures import ThreadPoolExecutor
+# Import Lock for guarding the shared Gini panel, and local for the start of each upstream request
+from threading import Lock, local
+# Import time for measuring the age of the Gini panel and the time spent on upstream requests
+import time
 
 # Import Bokeh models for data visualization
 from bokeh.models import ColumnDataSource, HoverTool
@@ -19,18 +29,885 @@ from bokeh.embed import components
 from bokeh.plotting import figure
 # Import linear_cmap for linear color mapping
 from bokeh.transform import linear_cmap
-# Import hexbin for hexagonal binning
-from bokeh.util.hex import hexbin
+# Import Category10 for coloring overlaid lines
+from bokeh.palettes import Category10
+
+# Import async_to_sync and sync_to_async for bridging the fetch engine and the ORM
+from asgiref.sync import async_to_sync, sync_to_async
+# Import settings for reading the refresh interval
+from django.conf import settings
+# Import HTTPAdapter for configuring connection pooling and retries
+from requests.adapters import HTTPAdapter
+# Import Retry for bounded exponential-backoff retries
+from urllib3.util.retry import Retry
 
 # Import RemoteDataError for handling data reader errors
 from pandas_datareader._utils import RemoteDataError
-# Import data module from pandas_datareader for data retrieval
-import pandas_datareader.data as pdr
+# Import FredReader for reading FRED data through a shared session
+from pandas_datareader.fred import FredReader
 # Import numpy for numerical operations
 import numpy as np
+# Import pandas for building time series from parsed observations
+import pandas as pd
+
+# Import the circuit breaker of the upstream series
+from .breaker import CircuitOpenError, circuit_breaker
+# Import the render cache for chart components and the upstream validators
+from .cache import get_chart, get_validators, set_validators
+# Import LTTB downsampling for long chart windows
+from .downsampling import lttb
+# Import the precomputed hexbin tiles and the binning of windowed returns
+from .hexbins import bin_returns, get_tiles
+# Import the registry of the FRED series behind the charts
+from .indicators import indicators
+# Import the streaming parser for FRED text files
+from .parsers import parse_fred_text
+# Import the background revalidation of stale data
+from .revalidation import revalidator
+# Import the single-flight layer for coalescing concurrent identical refreshes
+from .singleflight import single_flight
+# Import the local series store
+from .store import series_store
+# Import the stage timer of the chart pipeline
+from .timing import run_detached, stage
+
+
+# Connect and read timeouts, in seconds, applied to every upstream request
+FETCH_TIMEOUT = (3.05, 10)
+# Maximum number of retries of a failed upstream request
+FETCH_RETRIES = 3
+# Maximum number of seconds an upstream request may take, retries included, so that a chart
+# request never waits for the four worst-case attempts of about 55 seconds
+FETCH_BUDGET = 30
+# Maximum number of pooled keep-alive connections per host
+FETCH_POOL_SIZE = 16
+# Maximum number of upstream requests in flight per fetch_all call
+FETCH_CONCURRENCY = 8
+# Years offered by the Gini Index view
+GINI_YEARS = range(2010, 2019)
+# Names of the chart models updated in the browser from the JSON data endpoints
+CHART_SOURCE = 'chart-source'
+CHART_TITLE = 'chart-title'
+CHART_X_RANGE = 'chart-x-range'
+CHART_COLOR_MAPPER = 'chart-color-mapper'
+# Maximum number of points drawn by a line chart, above which its window is downsampled
+CHART_MAX_POINTS = 1000
+# Resampling rules of the stock chart frequencies, daily closes are used as they are
+STOCK_FREQUENCIES = {'daily': None, 'weekly': 'W-FRI', 'monthly': 'M'}
+# Float type of chart values, which keeps the 2 decimal digits shown while halving the binary payload
+CHART_FLOAT = 'float32'
+# Failures of a download, counted by the circuit breaker
+FETCH_ERRORS = (RemoteDataError, requests.exceptions.RequestException)
+# Errors of an unavailable upstream, under which stored data is served or the chart reported unavailable
+UPSTREAM_ERRORS = FETCH_ERRORS + (CircuitOpenError,)
+
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetRetry(Retry):
+    """
+    Retry that gives up once another attempt could overrun the fetch budget.
+
+    The budget counts from the start of the request, recorded by BudgetAdapter on the
+    thread sending it, and every attempt may take up to the connect and read timeouts.
+    """
+
+    def __init__(self, *args, budget=None, **kwargs):
+        """
+        Initialize BudgetRetry with the given budget.
+
+        Args:
+            budget (float): Maximum number of seconds of a request, retries included. Defaults to no limit.
+        """
+
+        super().__init__(*args, **kwargs)
+        self.budget = budget
+
+    def new(self, **kwargs):
+        # Every retry of a request is a new instance, which keeps the budget
+        kwargs.setdefault('budget', self.budget)
+        return super().new(**kwargs)
+
+    def is_exhausted(self):
+        if super().is_exhausted():
+            return True
+        started = getattr(request_clock, 'started', None)
+        if self.budget is None or started is None:
+            return False
+        # Time spent so far, the backoff sleep and the worst case of the next attempt
+        elapsed = time.monotonic() - started + self.get_backoff_time() + sum(FETCH_TIMEOUT)
+        return elapsed > self.budget
+
+
+class BudgetAdapter(HTTPAdapter):
+    """
+    HTTPAdapter recording the start of every request for BudgetRetry.
+    """
+
+    def send(self, request, *args, **kwargs):
+        # Retries run on the thread sending the request
+        request_clock.started = time.monotonic()
+        return super().send(request, *args, **kwargs)
+
+
+# Start of the upstream request sent by each thread
+request_clock = local()
+
+
+def create_session():
+    """
+    Create an HTTP session with a tuned connection pool and exponential-backoff retries
+    bounded in number and in total time.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+
+    retries = BudgetRetry(
+        total=FETCH_RETRIES,
+        budget=FETCH_BUDGET,
+        # Sleep 0.5s, 1s, 2s... between attempts
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        # Hand the last response back instead of raising, so callers see the real status
+        raise_on_status=False
+    )
+    adapter = BudgetAdapter(pool_connections=4, pool_maxsize=FETCH_POOL_SIZE, max_retries=retries)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Process-wide session shared by all upstream fetches
+fred_session = create_session()
+
+
+class NotModified(Exception):
+    """
+    Raised when upstream answers a conditional request with 304 Not Modified.
+    """
+
+
+def get_date_key(date):
+    """
+    Normalize a date to the ISO form stored with the upstream validators.
+
+    Args:
+        date (date): A date, datetime or pandas.Timestamp, or None.
+
+    Returns:
+        str: The ISO date, or None.
+    """
+
+    return None if date is None else pd.Timestamp(date).date().isoformat()
+
+def get_conditional_headers(url, start):
+    """
+    Build the conditional request headers for an upstream URL.
+
+    Validators are only sent when the request starts at the last observation they
+    cover, so that an empty or reset store always downloads the requested history.
+
+    Args:
+        url (str): The upstream URL.
+        start (date): Date the series is fetched from.
+
+    Returns:
+        dict: The If-None-Match and If-Modified-Since headers, empty for an unconditional request.
+    """
+
+    validators = get_validators(url)
+    if validators is None or start is None or validators['last_date'] != get_date_key(start):
+        return {}
+    headers = {}
+    if validators['etag']:
+        headers['If-None-Match'] = validators['etag']
+    if validators['last_modified']:
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def save_response_validators(url, response, observations, start):
+    """
+    Remember the validators of a successful upstream response.
+
+    Args:
+        url (str): The upstream URL.
+        response (requests.Response): The upstream response.
+        observations (pandas.Series): The observations parsed from the response.
+        start (date): Date the series was fetched from, used when the response holds no observations.
+    """
+
+    last_date = observations.index.max() if len(observations) else start
+    set_validators(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), get_date_key(last_date))
+
+def empty_series(series_id):
+    """
+    Build a series without observations, meaning that nothing changed upstream.
+
+    Args:
+        series_id (str): The FRED series ID.
+
+    Returns:
+        pandas.Series: An empty float series indexed by date.
+    """
+
+    return pd.Series([], index=pd.DatetimeIndex([], name='DATE'), dtype='float64', name=series_id)
+
+
+class SharedSessionFredReader(FredReader):
+    """
+    FredReader that leaves the shared session open after reading
+    and understands conditional requests.
+
+    FredReader closes its session once the data is read, which would drop
+    the pooled keep-alive connections of the process-wide session.
+    """
+
+    # FRED cosd and coed query parameters bounding the observation range, set by fetch_fred_csv
+    range_params = {}
+
+    def close(self):
+        """
+        Keep the shared session open.
+        """
+
+        pass
+
+    @property
+    def url(self):
+        """
+        API URL on the configured FRED host.
+        """
+
+        return settings.FRED_URL + 'graph/fredgraph.csv'
+
+    def _get_response(self, url, params=None, headers=None):
+        """
+        Send a single request through the shared session, which handles retries.
+
+        Args:
+            url (str): The URL to read.
+            params (dict): Query parameters.
+            headers (dict): Request headers. Defaults to the reader headers.
+
+        Returns:
+            requests.Response: The successful response, also kept as the response attribute.
+        """
+
+        # Bound the observation range of the download itself, which FRED would otherwise send in full
+        params = {**(params or {}), **self.range_params}
+        with stage('fetch'):
+            response = self.session.get(url, params=params, headers=headers or self.headers, timeout=self.timeout)
+        if response.status_code == requests.codes.not_modified:
+            raise NotModified(url)
+        if response.status_code != requests.codes.ok:
+            raise RemoteDataError(f'Unable to read URL: {url}')
+        self.response = response
+        return response
+
+
+# Process-wide worker pool running the blocking fetch functions
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix='fred-fetch')
+
+
+async def fetch_all(tails, fetch, limit=FETCH_CONCURRENCY):
+    """
+    Fetch several series concurrently with a bounded number of requests in flight.
+
+    Args:
+        tails (dict): Date to fetch each series from, keyed by series ID.
+        fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+        limit (int): Maximum number of concurrent fetches.
+
+    Returns:
+        dict: The fetched series keyed by series ID. A failed fetch maps to the exception it raised.
+    """
+
+    semaphore = asyncio.Semaphore(limit)
+    loop = asyncio.get_running_loop()
+
+    async def fetch_one(series_id, start):
+        async with semaphore:
+            # Run the blocking fetch on the shared worker pool, in a copy of the request context
+            return await loop.run_in_executor(fetch_executor, contextvars.copy_context().run, run_detached, fetch, series_id, start)
+
+    # The fetches overlap, so the pass is timed by its wall time, parsing in the workers included
+    with stage('fetch'):
+        results = await asyncio.gather(*[fetch_one(series_id, start) for series_id, start in tails.items()], return_exceptions=True)
+    return dict(zip(tails, results))
+
+def fetch_all_sync(tails, fetch, limit=FETCH_CONCURRENCY):
+    """
+    Synchronous wrapper around fetch_all for use from WSGI views.
+
+    Args:
+        tails (dict): Date to fetch each series from, keyed by series ID.
+        fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+        limit (int): Maximum number of concurrent fetches.
+
+    Returns:
+        dict: The fetched series keyed by series ID. A failed fetch maps to the exception it raised.
+    """
+
+    return async_to_sync(fetch_all)(tails, fetch, limit)
+
+
+async def refresh_series(series_id, fetch, start=None):
+    """
+    Awaitable counterpart of SeriesStore.refresh for async views.
+
+    Store access runs in a worker thread, while the upstream fetch goes through the fetch engine.
+    A stale series still within the stale window is served at once and refreshed in the
+    background, and a stale series whose refresh fails is served as it is stored, so that
+    chart requests only wait for upstream when nothing usable is stored.
+
+    Args:
+        series_id (str): The FRED series ID.
+        fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+        start (date): Start of the history to backfill when nothing is stored yet.
+
+    Returns:
+        int: The data version of the series.
+    """
+
+    if await sync_to_async(series_store.is_fresh)(series_id):
+        return await sync_to_async(series_store.get_version)(series_id)
+    version = await sync_to_async(series_store.get_version)(series_id)
+    if version and await sync_to_async(series_store.is_servable)(series_id):
+        if not circuit_breaker.is_open(series_id):
+            # Serve the stored copy and fetch its tail in the background
+            revalidator.submit(f'series:{series_id}', lambda: series_store.refresh(series_id, fetch, start))
+        return version
+    try:
+        # Concurrent refreshes of the series, sync or async, share one upstream fetch
+        return await single_flight.do_async(f'series:{series_id}', lambda: fetch_tail(series_id, fetch, start))
+    except UPSTREAM_ERRORS as error:
+        if not version:
+            raise
+        # Serve the stored copy, however old, rather than no chart at all
+        logger.warning('Serving stale %s: %s', series_id, error)
+        return version
+
+async def fetch_tail(series_id, fetch, start=None):
+    """
+    Awaitable counterpart of SeriesStore.fetch_tail for async views.
+
+    Args:
+        series_id (str): The FRED series ID.
+        fetch (callable): Called as fetch(series_id, start) and returning a pandas.Series of observations.
+        start (date): Start of the history to backfill when nothing is stored yet.
+
+    Returns:
+        int: The data version of the series.
+    """
+
+    if await sync_to_async(series_store.is_fresh)(series_id):
+        return await sync_to_async(series_store.get_version)(series_id)
+    tail_start = await sync_to_async(series_store.get_tail_start)(series_id, start)
+    tail = (await fetch_all({series_id: tail_start}, fetch))[series_id]
+    if isinstance(tail, Exception):
+        raise tail
+    # An empty series is fetched from start, which becomes the start of its stored history
+    return await sync_to_async(series_store.save)(series_id, tail, start=start if tail_start == start else None)
+
+async def backfill_series(series_id, fetch, start):
+    """
+    Awaitable counterpart of SeriesStore.backfill for async views.
+
+    Args:
+        series_id (str): The FRED series ID.
+        fetch (callable): Called as fetch(series_id, start, end) and returning a pandas.Series of observations.
+        start (date): Start of the requested window.
+
+    Returns:
+        int: The data version of the series.
+    """
+
+    if await sync_to_async(series_store.get_backfill_end)(series_id, start) is None:
+        return await sync_to_async(series_store.get_version)(series_id)
+    # Concurrent backfills of the same window, sync or async, share one upstream fetch
+    return await single_flight.do_async(f'series:{series_id}:{start}', lambda: fetch_head(series_id, fetch, start))
+
+async def fetch_head(series_id, fetch, start):
+    """
+    Awaitable counterpart of SeriesStore.fetch_head for async views.
+
+    Args:
+        series_id (str): The FRED series ID.
+        fetch (callable): Called as fetch(series_id, start, end) and returning a pandas.Series of observations.
+        start (date): Start of the requested window.
+
+    Returns:
+        int: The data version of the series.
+    """
+
+    end = await sync_to_async(series_store.get_backfill_end)(series_id, start)
+    if end is None:
+        return await sync_to_async(series_store.get_version)(series_id)
+    # Fetch only the missing range on the shared worker pool
+    head = await asyncio.get_running_loop().run_in_executor(fetch_executor, contextvars.copy_context().run, fetch, series_id, start, end)
+    return await sync_to_async(series_store.save)(series_id, head, start=start, end=end)
+
+
+@circuit_breaker.guard(FETCH_ERRORS)
+def fetch_fred_text(series_id, start=None):
+    """
+    Download a FRED series from its plain-text data file.
+
+    Args:
+        series_id (str): The FRED series ID.
+        start (date): Only observations on or after this date are returned. Defaults to the full history.
+
+    Returns:
+        pandas.Series: Observation values indexed by date, empty when the file has not changed
+            since the previous download of the same tail.
+    """
+
+    # Retrieve API key from environment variables
+    api_key = os.environ.get('API_KEY')
+    # API endpoint
+    endpoint = settings.FRED_URL + 'data/' + series_id + '.txt'
+    # Request parameters
+    params = {'api_key': api_key, 'file_type': 'json'}
+    # Send the validators of the previous download, if it covered this tail
+    headers = get_conditional_headers(endpoint, start)
+    # Stream the API request through the shared session, parsing is timed with the download it overlaps
+    with stage('fetch'), fred_session.get(endpoint, params=params, headers=headers, timeout=FETCH_TIMEOUT, stream=True) as response:
+        # The file has not changed since the previous download
+        if response.status_code == requests.codes.not_modified:
+            return empty_series(series_id)
+        # Raise an HTTPError for unsuccessful status codes
+        response.raise_for_status()
+        # FRED text files are plain ASCII, so decode as UTF-8 when no charset is declared
+        response.encoding = response.encoding or 'utf-8'
+        # Parse the body line by line as it arrives
+        dates, values = parse_fred_text(response.iter_lines(decode_unicode=True), start)
+
+    series = pd.Series(values, index=pd.DatetimeIndex(dates, name='DATE'), name=series_id)
+    save_response_validators(endpoint, response, series, start)
+    return series
+
+@circuit_breaker.guard(FETCH_ERRORS)
+def fetch_fred_csv(series_id, start=None, end=None):
+    """
+    Download a FRED series through pandas-datareader using the shared session.
+
+    Args:
+        series_id (str): The FRED series ID.
+        start (date): Only observations on or after this date are returned.
+        end (date): Only observations on or before this date are returned. Defaults to today.
+
+    Returns:
+        pandas.Series: Observation values indexed by date, empty when the file has not changed
+            since the previous download of the same tail.
+    """
+
+    # Retries are left to the session, which backs off between attempts
+    reader = SharedSessionFredReader(series_id, start=start, end=end or datetime.datetime.now(), retry_count=0, timeout=FETCH_TIMEOUT, session=fred_session)
+    # Ask FRED for the requested range only, which the reader also truncates to
+    reader.range_params = {name: pd.Timestamp(date).strftime('%Y-%m-%d') for name, date in (('cosd', start), ('coed', end)) if date is not None}
+    url = f'{reader.url}?id={series_id}'
+    if end is not None:
+        # A bounded range does not end at the last observation the validators describe
+        with stage('parse'):
+            return reader.read()[series_id]
+    # Send the validators of the previous download, if it covered this tail
+    reader.headers = get_conditional_headers(url, start) or None
+    try:
+        # Retrieve the data up to today, the download is timed apart from the parsing around it
+        with stage('parse'):
+            df = reader.read()
+    except NotModified:
+        # The file has not changed since the previous download
+        return empty_series(series_id)
+    series = df[series_id]
+    save_response_validators(url, reader.response, series, start)
+    return series
+
+def get_fetcher(format):
+    """
+    Get the fetch function of an indicator group format.
+
+    Args:
+        format (str): 'text' for the plain-text data files, 'csv' for pandas-datareader.
+
+    Returns:
+        callable: Called as fetch(series_id, start) and returning a pandas.Series of observations.
+    """
+
+    return {'text': fetch_fred_text, 'csv': fetch_fred_csv}[format]
+
+
+def split_returns(closes, limit=1000):
+    """
+    Split the daily percentage returns of a price series into equally long positive and negative arrays.
+
+    Everything runs as masked NumPy operations on the float64 buffer of closing prices.
+
+    Args:
+        closes (numpy.ndarray): Closing prices in date order, NaN where the market was closed.
+        limit (int): Maximum number of returns kept on each side.
+
+    Returns:
+        tuple: Arrays of positive (including zero) and negative returns in percent, of equal length.
+    """
+
+    # Drop missing closes so that no NaN or spurious zero returns are produced
+    closes = closes[~np.isnan(closes)]
+    # Percentage change between consecutive closes, without the undefined first row
+    returns = np.diff(closes) / closes[:-1] * 100
+    positive_return = returns[returns >= 0][:limit]
+    negative_return = returns[returns < 0][:limit]
+    # Match lengths of positive and negative returns
+    size = min(len(positive_return), len(negative_return))
+    return positive_return[:size], negative_return[:size]
+
+
+class SnapshotPanel:
+    def __init__(self, max_age=None):
+        """
+        Initialize SnapshotPanel, an in-memory country x year table of a family of series.
+
+        Args:
+            max_age (int): Number of seconds the panel is served before it is rebuilt from the series store.
+                Defaults to the SERIES_STORE_MAX_AGE setting.
+        """
+
+        if max_age is None:
+            max_age = getattr(settings, 'SERIES_STORE_MAX_AGE', 6 * 60 * 60)
+        self.max_age = max_age
+        # DataFrame of values indexed by year with one column per country
+        self.frame = None
+        # Combined data version of the country series the panel was built from
+        self.version = None
+        # Monotonic time of the last build
+        self.built_at = None
+        self.lock = Lock()
+
+    def is_stale(self):
+        """
+        Check whether the panel has to be rebuilt.
+
+        Returns:
+            bool: True if the panel was never built or is older than max_age.
+        """
+
+        return self.built_at is None or time.monotonic() - self.built_at >= self.max_age
+
+    @stage('pandas')
+    def update(self, series, version, complete=True):
+        """
+        Rebuild the panel from country series.
+
+        Args:
+            series (dict): Observations indexed by date, keyed by country name, or a DataFrame
+                of observations indexed by date with one column per country.
+            version (str): Combined data version of the country series.
+            complete (bool): False if some series could not be refreshed, in which case
+                the panel is served but rebuilt again on next use.
+        """
+
+        frame = pd.DataFrame(series, dtype='float64')
+        frame.index = pd.DatetimeIndex(frame.index)
+        # Keep the latest observation of every year and country, skipping missing values
+        frame = frame.groupby(frame.index.year).last()
+
+        with self.lock:
+            self.frame = frame
+            self.version = version
+            self.built_at = time.monotonic() if complete else None
+
+    def get_column(self, year):
+        """
+        Get the values of one year as a column.
+
+        Args:
+            year (int): The year to read.
+
+        Returns:
+            pandas.Series: Values keyed by country name, without countries lacking data.
+        """
+
+        frame = self.frame
+        try:
+            row = frame.loc[int(year)]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return pd.Series([], dtype='float64')
+        return row.dropna()
+
+    def get_year(self, year):
+        """
+        Get the values of one year.
+
+        Args:
+            year (int): The year to read.
+
+        Returns:
+            dict: Values as strings keyed by country name, without countries lacking data.
+        """
+
+        return {name: str(value) for name, value in self.get_column(year).items()}
+
+    def clear(self):
+        """
+        Drop the panel so that it is rebuilt on next use.
+        """
+
+        with self.lock:
+            self.frame = None
+            self.version = None
+            self.built_at = None
+
+
+# Process-wide panels shared by the cross-sections of every indicator group, keyed by group
+snapshot_panels = {}
+snapshot_panels_lock = Lock()
+
+
+def get_snapshot_panel(key):
+    """
+    Get the shared panel of an indicator group, creating it on first use.
+
+    Args:
+        key (str): Key of the indicator group.
+
+    Returns:
+        SnapshotPanel: The panel.
+    """
+
+    with snapshot_panels_lock:
+        if key not in snapshot_panels:
+            snapshot_panels[key] = SnapshotPanel()
+        return snapshot_panels[key]
+
+
+# Process-wide panel shared by all GiniIndex instances
+gini_panel = get_snapshot_panel('gini')
+
+
+class CrossSection:
+    def __init__(self, group, year, panel=None):
+        """
+        Initialize CrossSection, which compares the countries of a family of series in one year.
+
+        The family is an indicator group: country codes keyed by country name, turned into
+        FRED series IDs by the template of the group, e.g. SIPOVGINI{code}. Every series is
+        read from the series store at once into a shared country x year panel, and only the
+        stale ones are downloaded, by the fetch engine with its bounded concurrency, so
+        hundreds of countries cost a handful of queries and no thread per country.
+
+        Args:
+            group (IndicatorGroup): The family of series.
+            year (int): The year to compare.
+            panel (SnapshotPanel): The panel of the family. Defaults to the shared panel of the group.
+        """
+
+        self.group = group
+        self.year = year
+        self.panel = panel if panel is not None else get_snapshot_panel(group.key)
+        # Dictionary to store the values of the year as strings, keyed by country name
+        self.results = {}
+        # Values of the year keyed by country name
+        self.column = pd.Series([], dtype='float64')
+        # Dictionary to store downloaded series tails by series ID
+        self.tails = {}
+
+    def get_series_ids(self):
+        """
+        List the FRED series IDs of the family.
+
+        Returns:
+            list: The series IDs, in the order of the group.
+        """
+
+        return list(self.group.series_ids.values())
+
+    def get_fetch(self):
+        """
+        Get the fetch function of the family.
+
+        Returns:
+            callable: Called as fetch(series_id, start) and returning a pandas.Series of observations.
+        """
 
+        return get_fetcher(self.group.format)
 
-class GiniIndex:
+    def save_tails(self, tails):
+        """
+        Merge downloaded country series tails into the series store.
+
+        Args:
+            tails (dict): The fetch_all results keyed by series ID.
+
+        Returns:
+            bool: True if every tail was downloaded.
+        """
+
+        complete = True
+        for series_id, tail in tails.items():
+            if isinstance(tail, UPSTREAM_ERRORS):
+                # The stored copy of the country series is kept
+                logger.warning('Fetching %s failed: %s', series_id, tail)
+                complete = False
+            elif isinstance(tail, Exception):
+                raise tail
+            else:
+                series_store.save(series_id, tail)
+        return complete
+
+    def get_stale_tails(self):
+        """
+        Get the download start of every country series that is stale in the series store.
+
+        Returns:
+            dict: Date to fetch each stale series from, keyed by series ID.
+        """
+
+        stale = series_store.get_stale(self.get_series_ids())
+        if not stale:
+            return {}
+        # Fetch everything after the latest stored observation
+        return series_store.get_tail_starts(stale, self.group.start)
+
+    def get_version(self):
+        """
+        Get the combined data version of the country series.
+
+        Returns:
+            str: A digest of the data versions, short however many countries the family has.
+        """
+
+        versions = series_store.get_versions(self.get_series_ids())
+        return hashlib.md5('-'.join(str(version) for version in versions.values()).encode()).hexdigest()[:16]
+
+    def update_panel(self):
+        """
+        Merge the downloaded tails into the series store and rebuild the panel from it.
+        """
+
+        # Merge the downloaded tails into the store from the calling thread
+        complete = self.save_tails(self.tails)
+
+        # Read every country series from the store in one query, one column per country name
+        frame = series_store.load_frame(self.get_series_ids())
+        frame.columns = [self.group.get_name(self.group.series_codes[series_id]) for series_id in frame.columns]
+        self.panel.update(frame, self.get_version(), complete)
+
+        # Dictionary to store downloaded series tails by series ID
+        self.tails = {}
+
+    def get_flight_key(self):
+        """
+        Get the single-flight key of the panel rebuilds.
+
+        Returns:
+            str: The key, shared by every cross-section of the group.
+        """
+
+        return f'snapshot:{self.group.key}'
+
+    def rebuild_panel(self):
+        """
+        Download the stale country series and rebuild the panel, unless another request rebuilt it in the meantime.
+        """
+
+        if self.panel.is_stale():
+            # Download the stale tails, bounded by the fetch engine concurrency limit
+            self.tails = fetch_all_sync(self.get_stale_tails(), self.get_fetch())
+            self.update_panel()
+
+    async def rebuild_panel_async(self):
+        """
+        Awaitable counterpart of rebuild_panel for async views.
+        """
+
+        if self.panel.is_stale():
+            tails = await sync_to_async(self.get_stale_tails)()
+            # Download the stale tails without blocking the event loop
+            self.tails = await fetch_all(tails, self.get_fetch())
+            await sync_to_async(self.update_panel)()
+
+    def set_column(self, column):
+        """
+        Keep the values of the year read from the panel.
+
+        Args:
+            column (pandas.Series): Values keyed by country name.
+
+        Returns:
+            dict: The values as strings, keyed by country name.
+        """
+
+        self.column = column
+        self.results = {name: str(value) for name, value in column.items()}
+        return self.results
+
+    def get_results(self):
+        """
+        Retrieve the values of the year for every country with data.
+
+        The results are a row of the shared panel. Only when the panel is stale
+        are the stale country series downloaded by the fetch engine and the panel rebuilt.
+
+        Returns:
+            dict: The values as strings, keyed by country name.
+        """
+
+        if self.panel.is_stale():
+            # Concurrent requests share one rebuild of the panel
+            single_flight.do(self.get_flight_key(), self.rebuild_panel)
+
+        return self.set_column(self.panel.get_column(self.year))
+
+    async def get_results_async(self):
+        """
+        Awaitable counterpart of get_results for async views.
+
+        A stale panel is served at once while it is rebuilt in the background,
+        so only the first request of a process waits for upstream.
+
+        Returns:
+            dict: The values as strings, keyed by country name.
+        """
+
+        if self.panel.is_stale() and self.panel.frame is not None:
+            # Serve the previous panel and rebuild it in the background
+            revalidator.submit(self.get_flight_key(), lambda: single_flight.do(self.get_flight_key(), self.rebuild_panel))
+        elif self.panel.is_stale():
+            # Concurrent requests, sync or async, share one rebuild of the panel
+            await single_flight.do_async(self.get_flight_key(), self.rebuild_panel_async)
+
+        return self.set_column(self.panel.get_column(self.year))
+
+    async def refresh_async(self):
+        """
+        Collect the results of the selected year, rebuilding the panel if it is stale.
+
+        Returns:
+            str: The data version of the panel the results were read from.
+        """
+
+        await self.get_results_async()
+        return self.panel.version
+
+    @stage('pandas')
+    def get_dataset(self):
+        """
+        Get the bar chart dataset of the year, sorted by value.
+
+        Returns:
+            dict: Country names and a float32 array of their values, in ascending order of value.
+        """
+
+        column = self.column.sort_values(kind='stable')
+        # Pass values as a typed array, which Bokeh encodes as binary
+        return dict(countries=column.index.tolist(), vals=column.to_numpy(dtype=CHART_FLOAT))
+
+
+class GiniIndex(CrossSection):
     def __init__(self, year):
         """
         Initialize GiniIndex with the given year.
@@ -39,259 +916,820 @@ class GiniIndex:
             year (int): The year for which to calculate the Gini Index.
         """
         
-        self.year = year
-        # Dictionary to store Gini Index results for each country
-        self.results = {}
-        self.inputs = {
-            'FRANCE' : 'FRA',
-            'ITALY' : 'ITA',
-            'NORWAY' : 'NOR',
-            'POLAND' : 'POL',
-            'SWEDEN' : 'SWE',
-            'UK' : 'GBR'
-            }
+        super().__init__(indicators['gini'], year, gini_panel)
+        # Country codes keyed by country name, shared by every instance
+        self.inputs = self.group
 
         # List to store Gini Index values
         self.gini_values = []
         # List to store country names
         self.gini_countries = []
         
-    def get_data(self, name, ticker):
+    def get_title(self):
+        """
+        Get the title of the GINI Index bar chart.
+
+        Returns:
+            str: The chart title.
+        """
+
+        return f"GINI Index for ({self.year})"
+
+    def get_columns(self):
+        """
+        Get the columns of the GINI Index bar chart from the collected results.
+
+        Returns:
+            dict: Country names and a float32 array of Gini Index values, sorted by value.
+        """
+
+        columns = self.get_dataset()
+        self.gini_countries = columns['countries']
+        self.gini_values = columns['vals']
+        return columns
+
+    def get_chart_data(self):
+        """
+        Get the data of the GINI Index bar chart for the JSON data endpoint.
+
+        Returns:
+            dict: The chart title, the x range factors and the columns of the chart source.
+        """
+
+        columns = self.get_columns()
+        return {'title': self.get_title(), 'factors': columns['countries'], 'data': columns}
+
+    @stage('bokeh')
+    def get_components(self):
+        """
+        Build the GINI Index bar chart from the collected results.
+
+        Returns:
+            tuple: The script and div for embedding the plot.
+        """
+
+        # Create a ColumnDataSource
+        cds = ColumnDataSource(data=self.get_columns(), name=CHART_SOURCE)
+        fig = figure(x_range=self.gini_countries, sizing_mode='stretch_both', height=400, toolbar_location="below", title=self.get_title())
+        # Name the models updated in the browser
+        fig.title.name = CHART_TITLE
+        fig.x_range.name = CHART_X_RANGE
+        # Center align the title
+        fig.title.align = 'center'
+        # Set title font size
+        fig.title.text_font_size = '1.5em'
+        # Rotate x-axis labels
+        fig.xaxis.major_label_orientation = math.pi / 4
+        # Create a vertical bar chart
+        fig.vbar(source=cds, x='countries', top='vals', width=0.1, color='black', fill_color='white')
+        # Set background color
+        fig.background_fill_color = "#312450"
+        # Hide grid
+        fig.grid.visible = False
+        tooltips = [
+            ('Country', '@countries'),
+            ('GINI', '@vals')
+        ]
+        # Add hover tool
+        fig.add_tools(HoverTool(tooltips=tooltips))
+        # Get components for embedding the plot
+        with stage('components'):
+            return components(fig)
+
+    def get_context(self):
+        """
+        Generate the context for visualizing the Gini Index results.
+        
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot, or an error message.
+        """
+
+        return self.make_context(self.get_results())
+
+    async def get_context_async(self):
+        """
+        Awaitable counterpart of get_context for async views.
+
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot, or an error message.
+        """
+
+        results = await self.get_results_async()
+        return await sync_to_async(self.make_context)(results)
+
+    def make_context(self, results):
+        """
+        Build the context from the collected Gini Index results.
+
+        Args:
+            results (dict): A dictionary of Gini Index results.
+
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot, or an error message.
+        """
+        
+        if results is not None:
+            # Get components from the render cache, building the plot on a miss
+            script, div = get_chart('gini', self.year, self.panel.version, self.get_components)
+            context = {
+                'script': script,
+                'div': div,
+                'years': GINI_YEARS
+            }
+            return context
+        else:
+            context = {
+                'error_msg' : 'Data you requested is temporarily unavailabl'
+            }
+            return context
+
+class CpiIndex:
+    def __init__(self, symbol, start=None, end=None):
+        """
+        Initialize CpiIndex with the given symbol and time window.
+        
+        Args:
+            symbol (str): The symbol for the country CPI data.
+            start (int): First year of the window. Defaults to the start of the stored history.
+            end (int): Last year of the window. Defaults to the latest stored observation.
+        """
+        
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        # CPI symbols keyed by country name, shared by every instance
+        self.inputs = indicators['cpi']
+
+    def get_title(self):
+        """
+        Get the title of the CPI line chart.
+
+        Returns:
+            str: The chart title.
+        """
+
+        # Get country name corresponding to the symbol
+        return f"CPI Index for {self.inputs.get_name(self.symbol)}"
+
+    def get_parameter(self):
+        """
+        Get the parameter identifying the chart in the render cache and its entity tag.
+
+        Returns:
+            str: The symbol, followed by the window if one was requested.
+        """
+
+        if self.start is None and self.end is None:
+            return self.symbol
+        return f'{self.symbol}:{self.start}-{self.end}'
+
+    def get_fetch_start(self):
+        """
+        Get the date the CPI series is first fetched from when nothing is stored yet.
+
+        Returns:
+            date: The earlier of the first day of the window and the start of the CPI
+                indicator group, or None for the full history.
+        """
+
+        if self.inputs.start is None:
+            return None
+        if self.start is None:
+            return self.inputs.start
+        return min(datetime.date(self.start, 1, 1), self.inputs.start)
+
+    def refresh(self):
+        """
+        Fetch the missing tail of the CPI series if the stored copy is stale, and
+        the history missing before it if the window or the default chart starts earlier.
+
+        Returns:
+            int: The data version of the CPI series.
+        """
+
+        start = datetime.date(self.start, 1, 1) if self.start is not None else self.inputs.start
+        version = series_store.refresh(self.symbol, fetch_fred_csv, start=self.get_fetch_start())
+        if start is None:
+            return version
+        return series_store.backfill(self.symbol, fetch_fred_csv, start)
+
+    @stage('pandas')
+    def get_columns(self):
+        """
+        Get the columns of the CPI line chart from the stored series.
+
+        Missing observations are left out, and windows longer than CHART_MAX_POINTS
+        are downsampled with LTTB.
+
+        Returns:
+            dict: Typed arrays of years as x and CPI values rounded to 2 decimal places as y.
+        """
+
+        # Retrieve CPI data from the series store
+        series = series_store.load(self.symbol).dropna()
+        # Extract years and values in one vectorized pass each
+        years = series.index.year.to_numpy()
+        values = series.to_numpy().round(2)
+        # Select the requested window
+        window = np.ones(len(years), dtype='bool')
+        if self.start is not None:
+            window &= years >= self.start
+        if self.end is not None:
+            window &= years <= self.end
+        years, values = lttb(years[window], values[window], CHART_MAX_POINTS)
+        # Pass typed arrays, which Bokeh encodes as binary
+        return dict(x=years.astype('int16'), y=values.astype(CHART_FLOAT))
+
+    def get_chart_data(self, version):
+        """
+        Get the data of the CPI line chart for the JSON data endpoint.
+
+        Args:
+            version (int): Data version of the CPI series.
+
+        Returns:
+            dict: The chart title and the columns of the chart source.
+        """
+
+        return {'title': self.get_title(), 'data': self.get_columns()}
+
+    @stage('bokeh')
+    def get_components(self):
         """
-        Retrieve Gini Index data for a specific country and year.
-        
-        Args:
-            name (str): Country name.
-            ticker (str): Ticker symbol for the country.
+        Build the CPI line chart from the stored series.
+
+        Returns:
+            tuple: The script and div for embedding the plot.
         """
 
-        # Retrieve API key from environment variables
-        api_key = os.environ.get('API_KEY')
-        # API endpoint
-        endpoint = 'https://fred.stlouisfed.org/data/SIPOVGINI' + ticker + '.txt'
-        # Request parameters
-        params = {'api_key': api_key, 'file_type': 'json'}
-        
-        try:
-            # Make the API request
-            response = requests.get(endpoint,params=params)
-            # Parse the response using BeautifulSoup
-            soup = bs(response.text,"lxml")
-            # Split the response text into lines
-            data = soup.text.split('\n')
-            
-            for line in data:
-                # Check if the line contains the desired year
-                if str(self.year) in line:
-                    # Store the result
-                    self.results[name] = line.rstrip()[-4:]
-                    
-        except requests.exceptions.RequestException as err:
-            # Handle generic request exceptions
-            print ("OOps: Something Else",err)
-        except requests.exceptions.HTTPError as errh:
-            # Handle HTTP errors
-            print ("Http Error:",errh)
-        except requests.exceptions.ConnectionError as errc:
-            # Handle connection errors
-            print ("Error Connecting:",errc)
-        except requests.exceptions.Timeout as errt:
-            # Handle timeout errors
-            print ("Timeout Error:",errt)   
-            
-    def get_results(self):
+        # Create a ColumnDataSource
+        cds = ColumnDataSource(data=self.get_columns(), name=CHART_SOURCE)
+        fig = figure(sizing_mode='stretch_both', height=400, toolbar_location="below", title=self.get_title())
+        # Name the title updated in the browser
+        fig.title.name = CHART_TITLE
+        # Create a line plot
+        fig.line(source=cds, x='x', y='y', line_color='white', width=1, line_dash = "dotted")
+        # Set x-axis label
+        fig.xaxis.axis_label = 'Lookback Period'
+        # Set y-axis label
+        fig.yaxis.axis_label = 'Percent'
+        # Center align the title
+        fig.title.align = 'center'
+        # Set title font size
+        fig.title.text_font_size = '1.5em'
+        # Set background color
+        fig.background_fill_color = "#312450"
+        # Hide grid
+        fig.grid.visible = False
+        tooltips = [
+                ('Years', '@x'),
+                ('CPI', '@y')
+            ]
+        # Add hover tool
+        fig.add_tools(HoverTool(tooltips=tooltips))
+        # Get components for embedding the plot
+        with stage('components'):
+            return components(fig)
+    
+    def make_context(self, version):
         """
-        Retrieve Gini Index results for all specified countries using multithreading.
-        
+        Build the context for the given data version of the CPI series.
+
+        Args:
+            version (int): Data version of the CPI series.
+
         Returns:
-            dict: A dictionary of Gini Index results.
+            dict: A dictionary containing the script and div for embedding the plot.
         """
-        
-        threads = []
-        
-        for key in self.inputs:
-            # Create a thread for each country
-            threads.append(Thread(target=self.get_data, args=[key, self.inputs[key]]))
-            
-        for thread in threads:
-            # Start all threads
-            thread.start()
-
-        for thread in threads:
-            # Wait for all threads to complete
-            thread.join()
 
-        return self.results
+        # Get components from the render cache, building the plot on a miss
+        script, div = get_chart('cpi', self.get_parameter(), version, self.get_components)
+        context = {
+            'script': script,
+            'div': div,
+            'inputs' : self.inputs,
+            'start': self.start,
+            'end': self.end
+        }
+        return context
 
-    
-    def get_context(self):
+    def get_cpi_context(self):
         """
-        Generate the context for visualizing the Gini Index results.
+        Generate the context for visualizing the CPI data.
         
         Returns:
             dict: A dictionary containing the script and div for embedding the plot, or an error message.
         """
         
-        if self.get_results() is not None:
-            # Sort results by Gini Index values
-            sorted_results = sorted(self.results.items(), key=lambda x: x[1])
-            for item in sorted_results:
-                # Add country to list
-                self.gini_countries.append(item[0])
-                # Add Gini Index value to list
-                self.gini_values.append(item[1])
-
-            # Create a ColumnDataSource
-            cds = ColumnDataSource(data=dict(countries=self.gini_countries, vals=self.gini_values))
-            fig = figure(x_range=self.gini_countries, sizing_mode='stretch_both', height=400, toolbar_location="below", title=f"GINI Index for ({self.year})")
-            # Center align the title
-            fig.title.align = 'center'
-            # Set title font size
-            fig.title.text_font_size = '1.5em'
-            # Rotate x-axis labels
-            fig.xaxis.major_label_orientation = math.pi / 4
-            # Create a vertical bar chart
-            fig.vbar(source=cds, x='countries', top='vals', width=0.1, color='black', fill_color='white')
-            # Set background color
-            fig.background_fill_color = "#312450"
-            # Hide grid
-            fig.grid.visible = False
-            tooltips = [
-                ('Country', '@countries'),
-                ('GINI', '@vals')
-            ]
-            # Add hover tool
-            fig.add_tools(HoverTool(tooltips=tooltips))
-            # Get components for embedding the plot
-            script, div = components(fig)
-            context = {
-                'script': script,
-                'div': div,
-                'years': range(2010,2019)
-            }
-            return context
-        else:
+        try:
+            # Fetch the missing tail of the CPI series if the stored copy is stale
+            version = self.refresh()
+            return self.make_context(version)
+        except UPSTREAM_ERRORS:
             context = {
                 'error_msg' : 'Data you requested is temporarily unavailabl'
             }
             return context
 
-class CpiIndex:
-    def __init__(self, symbol):
-        """
-        Initialize CpiIndex with the given symbol.
-        
-        Args:
-            symbol (str): The symbol for the country CPI data.
+    async def refresh_async(self):
         """
-        
-        self.symbol = symbol
-        self.inputs = {
-            'GERMANY' : 'FPCPITOTLZGDEU',
-            'ITALY' : 'FPCPITOTLZGITA',
-            'NORWAY' : 'FPCPITOTLZGNOR',
-            'POLAND' : 'FPCPITOTLZGPOL',
-            'SWEDEN' : 'FPCPITOTLZGSWE',
-            'UK' : 'FPCPITOTLZGGBR'
-        }
+        Awaitable counterpart of refresh for async views.
 
-    def get_key(self, dct, value):
-        """
-        Get the key corresponding to the given value in a dictionary.
-        
-        Args:
-            dct (dict): The dictionary to search.
-            value (str): The value to find the corresponding key for.
-        
         Returns:
-            list: A list of keys corresponding to the value.
+            int: The data version of the CPI series.
         """
-        return [key for key in dct if (dct[key] == value)]
-    
-    def get_cpi_context(self):
+
+        start = datetime.date(self.start, 1, 1) if self.start is not None else self.inputs.start
+        version = await refresh_series(self.symbol, fetch_fred_csv, start=self.get_fetch_start())
+        if start is None:
+            return version
+        return await backfill_series(self.symbol, fetch_fred_csv, start)
+
+    async def get_cpi_context_async(self):
         """
-        Generate the context for visualizing the CPI data.
-        
+        Awaitable counterpart of get_cpi_context for async views.
+
         Returns:
             dict: A dictionary containing the script and div for embedding the plot, or an error message.
         """
-        
+
         try:
-            # Retrieve CPI data
-            df = pdr.DataReader(self.symbol, 'fred', start = datetime.datetime(2000, 1, 1), end = datetime.datetime.now())
-            # Extract years from the data
-            years = [df.index[x].year for x in range(12)]
-            # Extract CPI values and round to 2 decimal places
-            values = [round(df[self.symbol][x], 2) for x in range(12)] 
-            # Get country name corresponding to the symbol
-            data = self.get_key(self.inputs, self.symbol)
-            fig = figure(sizing_mode='stretch_both', height=400, toolbar_location="below", title=f"CPI Index for {data[0]}")
-            # Create a line plot
-            fig.line(x=years, y=values, line_color='white', width=1, line_dash = "dotted")
-            # Set x-axis label
-            fig.xaxis.axis_label = 'Lookback Period'
-            # Set y-axis label
-            fig.yaxis.axis_label = 'Percent'
-            # Center align the title
-            fig.title.align = 'center'
-            # Set title font size
-            fig.title.text_font_size = '1.5em'
-            # Set background color
-            fig.background_fill_color = "#312450"
-            # Hide grid
-            fig.grid.visible = False
-            tooltips = [
-                    ('Years', '@x'),
-                    ('CPI', '@y')
-                ]
-            # Add hover tool
-            fig.add_tools(HoverTool(tooltips=tooltips))
-            # Get components for embedding the plot
-            script, div = components(fig)
-            context = {
-                'script': script,
-                'div': div,
-                'inputs' : self.inputs
-            }
-            return context
-        except RemoteDataError:
+            # Fetch the missing tail of the CPI series without blocking the event loop
+            version = await self.refresh_async()
+            return await sync_to_async(self.make_context)(version)
+        except UPSTREAM_ERRORS:
             context = {
                 'error_msg' : 'Data you requested is temporarily unavailabl'
             }
             return context
 
 
+class CpiComparison(CpiIndex):
+    def __init__(self, symbols=None):
+        """
+        Initialize CpiComparison with the given symbols.
+
+        Args:
+            symbols (list): The symbols of the country CPI series to compare. Defaults to every country.
+        """
+
+        super().__init__(symbol=None)
+        self.symbols = [symbol for symbol in self.inputs.values() if symbols is None or symbol in symbols]
+        # Dictionary to store downloaded series tails by series ID
+        self.tails = {}
+
+    def get_stale_tails(self):
+        """
+        Get the download start of every compared series that is stale in the series store.
+
+        Returns:
+            dict: Date to fetch each stale series from, keyed by series ID.
+        """
+
+        tails = {}
+        for symbol in self.symbols:
+            if not series_store.is_fresh(symbol):
+                # Fetch everything after the latest stored observation
+                tails[symbol] = series_store.get_tail_start(symbol, self.inputs.start)
+        return tails
+
+    def save_tails(self):
+        """
+        Merge the downloaded tails into the series store and get the data version of the comparison.
+
+        A series that failed to download is served from its stored copy.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        for series_id, tail in self.tails.items():
+            if isinstance(tail, UPSTREAM_ERRORS):
+                # The stored copy of the series is served
+                logger.warning('Fetching %s failed: %s', series_id, tail)
+            elif isinstance(tail, Exception):
+                raise tail
+            else:
+                series_store.save(series_id, tail)
+        return self.get_version()
+
+    def get_version(self):
+        """
+        Get the data version of the comparison.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        versions = [series_store.get_version(symbol) for symbol in self.symbols]
+        if not any(versions):
+            raise RemoteDataError('None of the compared CPI series is available')
+        return '-'.join(str(version) for version in versions)
+
+    def is_servable(self):
+        """
+        Check whether the stored series can be served while the stale ones are refreshed in the background.
+
+        Returns:
+            bool: True if a compared series is stale and every one is still within the stale window.
+        """
+
+        if all(series_store.is_fresh(symbol) for symbol in self.symbols):
+            return False
+        return all(series_store.is_servable(symbol) for symbol in self.symbols)
+
+    def refresh(self):
+        """
+        Fetch the missing tails of the stale compared series in one fetch engine pass.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        # Concurrent comparisons of the same series share one fetch engine pass
+        return single_flight.do(self.get_flight_key(), self.fetch_tails)
+
+    def fetch_tails(self):
+        """
+        Fetch the missing tails of the compared series that are still stale and merge them into the series store.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        self.tails = fetch_all_sync(self.get_stale_tails(), fetch_fred_csv)
+        return self.save_tails()
+
+    async def refresh_async(self):
+        """
+        Awaitable counterpart of refresh for async views.
+
+        Stored series still within the stale window are served at once while the
+        stale ones are refreshed in the background.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        if await sync_to_async(self.is_servable)():
+            if not all(circuit_breaker.is_open(symbol) for symbol in self.symbols):
+                # Serve the stored series and fetch their tails in the background
+                revalidator.submit(self.get_flight_key(), self.refresh)
+            return await sync_to_async(self.get_version)()
+        # Concurrent comparisons of the same series, sync or async, share one fetch engine pass
+        return await single_flight.do_async(self.get_flight_key(), self.fetch_tails_async)
+
+    async def fetch_tails_async(self):
+        """
+        Awaitable counterpart of fetch_tails for async views.
+
+        Returns:
+            str: The data versions of the compared series, joined by dashes.
+        """
+
+        tails = await sync_to_async(self.get_stale_tails)()
+        # Download the stale tails without blocking the event loop
+        self.tails = await fetch_all(tails, fetch_fred_csv)
+        return await sync_to_async(self.save_tails)()
+
+    def get_flight_key(self):
+        """
+        Get the single-flight key of the comparison.
+
+        Returns:
+            str: The key, which only depends on the compared series.
+        """
+
+        return 'cpi-compare:' + '-'.join(self.symbols)
+
+    @stage('pandas')
+    def get_frame(self):
+        """
+        Align the compared series on a shared year index.
+
+        Returns:
+            pandas.DataFrame: CPI values indexed by year, one column per symbol, NaN where a country has no value.
+        """
+
+        # Joining the series outer-aligns their observation dates
+        frame = pd.DataFrame({symbol: series_store.load(symbol) for symbol in self.symbols})
+        frame.index = frame.index.year
+        return frame
+
+    @stage('pandas')
+    def get_columns(self):
+        """
+        Get the columns of the comparison chart from the stored series.
+
+        Returns:
+            dict: Typed arrays of years and of the CPI values of every symbol, rounded to 2 decimal places.
+        """
+
+        frame = self.get_frame()
+        columns = {'year': frame.index.to_numpy().astype('int16')}
+        for symbol in self.symbols:
+            # Pass typed arrays, which Bokeh encodes as binary
+            columns[symbol] = frame[symbol].round(2).to_numpy(dtype=CHART_FLOAT)
+        return columns
+
+    @stage('bokeh')
+    def get_components(self):
+        """
+        Build the CPI comparison chart with one line per country.
+
+        Returns:
+            tuple: The script and div for embedding the plot.
+        """
+
+        cds = ColumnDataSource(data=self.get_columns(), name=CHART_SOURCE)
+        fig = figure(sizing_mode='stretch_both', height=400, toolbar_location="below", title="CPI Index Comparison")
+        # Set x-axis label
+        fig.xaxis.axis_label = 'Year'
+        # Set y-axis label
+        fig.yaxis.axis_label = 'Percent'
+        # Center align the title
+        fig.title.align = 'center'
+        # Set title font size
+        fig.title.text_font_size = '1.5em'
+        # Set background color
+        fig.background_fill_color = "#312450"
+        # Hide grid
+        fig.grid.visible = False
+        palette = Category10[10]
+        for index, symbol in enumerate(self.symbols):
+            country = self.inputs.get_name(symbol)
+            # Overlay one line per country, named for the hover tool
+            fig.line(source=cds, x='year', y=symbol, line_color=palette[index % len(palette)], width=2, legend_label=country, name=country)
+        # Hide a country by clicking its legend entry
+        fig.legend.click_policy = 'hide'
+        fig.legend.location = 'top_left'
+        tooltips = [
+                ('Country', '$name'),
+                ('Year', '@year'),
+                ('CPI', '$y{0.00}')
+            ]
+        # Add hover tool
+        fig.add_tools(HoverTool(tooltips=tooltips))
+        # Get components for embedding the plot
+        with stage('components'):
+            return components(fig)
+
+    def make_context(self, version):
+        """
+        Build the context for the given data version of the compared series.
+
+        Args:
+            version (str): The data versions of the compared series, joined by dashes.
+
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot.
+        """
+
+        # Get components from the render cache, building the plot on a miss
+        script, div = get_chart('cpi-compare', ','.join(self.symbols), version, self.get_components)
+        context = {
+            'script': script,
+            'div': div,
+            'inputs' : self.inputs,
+            'symbols': self.symbols
+        }
+        return context
+
+
 class StockIndex:
-    def __init__(self, stock):
-         """
-        Initialize StockIndex with the given stock.
+    def __init__(self, stock, start=None, end=None, frequency=None):
+        """
+        Initialize StockIndex with the given stock, date window and frequency.
         
         Args:
             stock (str): The stock symbol.
+            start (date): First day of the window. Defaults to the start of the stock indicator group.
+            end (date): Last day of the window. Defaults to the latest stored close.
+            frequency (str): One of the STOCK_FREQUENCIES the returns are computed at. Defaults to daily.
         """
         
         self.stock = stock
-        self.inputs = {
-            'S&P 500' : 'SP500',
-            'DOW JONES' : 'DJIA',
-            'NASDAQ 100' : 'NASDAQ100',
-            'WILSHIRE 5000' : 'WILL5000PR',
-            'WILSHIRE US REIT' : 'WILLREITIND'
-        }
+        self.start = start
+        self.end = end
+        self.frequency = frequency if frequency in STOCK_FREQUENCIES else 'daily'
+        # Stock symbols keyed by index name, shared by every instance
+        self.inputs = indicators['stock']
 
-    def get_key(self, dct, value):
+    def is_default(self):
         """
-        Get the key corresponding to the given value in a dictionary.
-        
+        Check whether the chart covers the default window of daily returns.
+
+        Returns:
+            bool: True if neither a window nor a frequency was requested.
+        """
+
+        return self.start is None and self.end is None and self.frequency == 'daily'
+
+    def get_parameter(self):
+        """
+        Get the parameter identifying the chart in the render cache and its entity tag.
+
+        Returns:
+            str: The stock symbol, followed by the window and frequency if they were requested.
+        """
+
+        if self.is_default():
+            return self.stock
+        return f'{self.stock}:{self.start}-{self.end}:{self.frequency}'
+
+    def get_fetch_start(self):
+        """
+        Get the date the stock series is first fetched from when nothing is stored yet.
+
+        Returns:
+            date: The earlier of the window start and the start of the stock indicator group,
+                or None for the full history.
+        """
+
+        if self.inputs.start is None:
+            return None
+        if self.start is None:
+            return self.inputs.start
+        return min(self.start, self.inputs.start)
+
+    def refresh(self):
+        """
+        Fetch the missing tail of the stock series if the stored copy is stale, and
+        the history missing before it if the window starts earlier.
+
+        The first fetch always covers the start of the stock indicator group, so a
+        window requested first never leaves the default chart with a truncated history.
+        The default chart backfills to the group start as well.
+
+        Returns:
+            int: The data version of the stock series.
+        """
+
+        start = self.start or self.inputs.start
+        version = series_store.refresh(self.stock, fetch_fred_csv, start=self.get_fetch_start())
+        if start is None:
+            return version
+        return series_store.backfill(self.stock, fetch_fred_csv, start)
+
+    async def refresh_async(self):
+        """
+        Awaitable counterpart of refresh for async views.
+
+        Returns:
+            int: The data version of the stock series.
+        """
+
+        start = self.start or self.inputs.start
+        version = await refresh_series(self.stock, fetch_fred_csv, start=self.get_fetch_start())
+        if start is None:
+            return version
+        return await backfill_series(self.stock, fetch_fred_csv, start)
+
+    @stage('pandas')
+    def get_returns(self):
+        """
+        Split the returns of the stored series over the window into positive and negative returns.
+
+        Returns:
+            tuple: Arrays of positive and negative returns in percent, of equal length.
+        """
+
+        # Retrieve stock data from the series store
+        closes = series_store.load(self.stock)
+        # Select the requested window
+        closes = closes[pd.Timestamp(self.start) if self.start else None:pd.Timestamp(self.end) if self.end else None]
+        rule = STOCK_FREQUENCIES[self.frequency]
+        if rule is not None:
+            # Keep the last close of every week or month
+            closes = closes.dropna().resample(rule).last()
+        return split_returns(closes.to_numpy())
+
+    def load_tiles(self, version):
+        """
+        Get the hexagonal tiles of the chart.
+
         Args:
-            dct (dict): The dictionary to search.
-            value (str): The value to find the corresponding key for.
-        
+            version (int): Data version of the stock series.
+
         Returns:
-            list: A list of keys corresponding to the value.
+            dict: The tiles as returned by bin_returns.
+        """
+
+        if self.is_default():
+            # Load the precomputed tiles, binning only new returns if the series has changed
+            return get_tiles(self.stock, version, self.get_returns)
+        # Windows hold at most 1000 pairs of returns, which are binned on the fly
+        return bin_returns(*self.get_returns())
+
+    def get_title(self):
+        """
+        Get the title of the hexbin chart.
+
+        Returns:
+            str: The chart title.
+        """
+
+        # Get stock name corresponding to the symbol
+        name = self.inputs.get_name(self.stock)
+        if self.frequency == 'daily':
+            return f"Returns for {name}"
+        return f"{self.frequency.capitalize()} Returns for {name}"
+
+    @stage('pandas')
+    def get_columns(self, tiles):
+        """
+        Get the columns of the hexbin chart from its tiles.
+
+        Args:
+            tiles (dict): The tiles as returned by load_tiles.
+
+        Returns:
+            dict: Typed arrays of tile coordinates q and r and tile counts.
+        """
+
+        # Bokeh does not encode 64-bit integers as binary, and tile coordinates are small
+        return {'q': tiles['q'].astype('int16'), 'r': tiles['r'].astype('int16'), 'counts': tiles['counts'].astype('int32')}
+
+    def get_chart_data(self, version):
+        """
+        Get the data of the hexbin chart for the JSON data endpoint.
+
+        Args:
+            version (int): Data version of the stock series.
+
+        Returns:
+            dict: The chart title, the highest tile count and the columns of the chart source.
+        """
+
+        tiles = self.load_tiles(version)
+        data = self.get_columns(tiles)
+        return {'title': self.get_title(), 'high': int(tiles['counts'].max(initial=0)), 'data': data}
+
+    @stage('bokeh')
+    def get_components(self, version):
+        """
+        Build the hexbin chart of the returns over the window.
+
+        Args:
+            version (int): Data version of the stock series.
+
+        Returns:
+            tuple: The script and div for embedding the plot.
         """
-        
-        return [key for key in dct if (dct[key] == value)]
+
+        tiles = self.load_tiles(version)
+        bins = ColumnDataSource(data=self.get_columns(tiles), name=CHART_SOURCE)
+        fig = figure(tools="wheel_zoom,reset", 
+            match_aspect=True, 
+            background_fill_color='#312450', 
+            sizing_mode='stretch_both', 
+            height=500, 
+            toolbar_location="below", 
+            title=self.get_title())
+        # Name the title updated in the browser
+        fig.title.name = CHART_TITLE
+        # Set x-axis label
+        fig.xaxis.axis_label = 'Positive Returns'
+        # Set y-axis label
+        fig.yaxis.axis_label = 'Negative Returns'
+        # Center align the title
+        fig.title.align = 'center'
+        # Set title font size
+        fig.title.text_font_size = '1.5em'
+        # Hide grid
+        fig.grid.visible = False
+        # Create a hex tile plot
+        fill_color = linear_cmap('counts', 'Viridis256', 0, tiles['counts'].max(initial=0))
+        # Name the color mapper whose upper bound is updated in the browser
+        fill_color['transform'].name = CHART_COLOR_MAPPER
+        fig.hex_tile(q="q", r="r", size=0.1, line_color=None, source=bins, fill_color=fill_color)
+        # Get components for embedding the plot
+        with stage('components'):
+            return components(fig)
+
+    def make_context(self, version):
+        """
+        Build the context for the given data version of the stock series.
+
+        Args:
+            version (int): Data version of the stock series.
+
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot.
+        """
+
+        # Get components from the render cache, building the plot on a miss
+        script, div = get_chart('stock', self.get_parameter(), version, lambda: self.get_components(version))
+        context = {
+            'script': script,
+            'div': div,
+            'inputs' : self.inputs,
+            'start': self.start,
+            'end': self.end,
+            'frequency': self.frequency,
+            'frequencies': STOCK_FREQUENCIES
+        }
+        return context
 
     def get_stock_context(self):
         """
@@ -302,68 +1740,31 @@ class StockIndex:
         """
         
         try:
-            # Get stock name corresponding to the symbol
-            data = self.get_key(self.inputs, self.stock)
-            # Retrieve stock data
-            df = pdr.DataReader(self.stock, 'fred', start = datetime.datetime(2000, 1, 1), end = datetime.datetime.now())
-            # Calculate percentage change
-            df['pct_change'] = df.pct_change() * 100
-            # Convert percentage changes to a list
-            result = df['pct_change'].values.tolist()
-            # Extract positive returns
-            positive_return = np.array([x for x in result if x >= 0])[:1000]
-            # Extract negative returns
-            negative_return = np.array([x for x in result if x < 0])[:1000]
-            if len(positive_return) > len(negative_return):
-                # Match lengths of positive and negative returns
-                positive_return = np.array([x for x in result if x >= 0])[:(len(negative_return))]
-            else:
-                negative_return = np.array([x for x in result if x < 0])[:(len(positive_return))]
-            # Perform hexagonal binning
-            bins = hexbin(positive_return, negative_return, 0.2)
-            data = self.get_key(self.inputs, self.stock)
-            fig = figure(tools="wheel_zoom,reset", 
-                match_aspect=True, 
-                background_fill_color='#312450', 
-                sizing_mode='stretch_both', 
-                height=500, 
-                toolbar_location="below", 
-                title=f"Returns for {data[0]}")
-            # Set x-axis label
-            fig.xaxis.axis_label = 'Positive Returns'
-            # Set y-axis label
-            fig.yaxis.axis_label = 'Negative Returns'
-            # Center align the title
-            fig.title.align = 'center'
-            # Set title font size
-            fig.title.text_font_size = '1.5em'
-            # Hide grid
-            fig.grid.visible = False
-            # Create a hex tile plot
-            fig.hex_tile(q="q", r="r", size=0.1, line_color=None, source=bins,
-            fill_color=linear_cmap('counts', 'Viridis256', 0, max(bins.counts)))
-            # Get components for embedding the plot
-            script, div = components(fig)
-            context = {
-                'script': script,
-                'div': div,
-                'inputs' : self.inputs
-            }
-            return context
+            # Fetch the missing tail of the stock series if the stored copy is stale
+            version = self.refresh()
+            return self.make_context(version)
 
-        except RemoteDataError:
+        except UPSTREAM_ERRORS:
             context = {
                 'error_msg' : 'Data you requested is temporarily unavailabl'
             }
             return context
 
+    async def get_stock_context_async(self):
+        """
+        Awaitable counterpart of get_stock_context for async views.
 
+        Returns:
+            dict: A dictionary containing the script and div for embedding the plot, or an error message.
+        """
 
+        try:
+            # Fetch the missing tail of the stock series without blocking the event loop
+            version = await self.refresh_async()
+            return await sync_to_async(self.make_context)(version)
 
-
-
-
-    
-
-
-
+        except UPSTREAM_ERRORS:
+            context = {
+                'error_msg' : 'Data you requested is temporarily unavailabl'
+            }
+            return context
@@ -1,7 +1,148 @@
+# Import datetime for parsing date windows
+import datetime
+
+# Import sync_to_async for building chart contexts off the event loop
+from asgiref.sync import sync_to_async
+# Import settings for reading the chart max age
+from django.conf import settings
+# Import Http404 for unlisted series, and JsonResponse for the JSON data endpoints
+from django.http import Http404, JsonResponse
 # Import render function for rendering templates
 from django.shortcuts import render
-# Import GiniIndex, CpiIndex, and StockIndex classes from the utilities module
-from .utilities import GiniIndex, CpiIndex, StockIndex
+# Import helpers for conditional responses and caching headers
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+# Import the entity tag of chart responses
+from .cache import get_chart_etag
+# Import the stage timer and the histograms of the chart pipeline
+from .timing import stage, timing_registry
+# Import the chart engines through their lazy facade, so that pages without charts never load them
+from . import engines
+
+
+# Earliest year accepted in chart windows, before any FRED series starts
+MIN_YEAR = 1900
+
+
+def add_cache_headers(response, etag, public=True):
+    """
+    Add the validator and caching headers of a chart response.
+
+    Args:
+        response (HttpResponse): The chart response or its 304 counterpart.
+        etag (str): The quoted entity tag of the chart.
+        public (bool): Whether shared caches may store the response. Full pages embed the
+            CSRF token of the visitor, so only browsers may cache them.
+
+    Returns:
+        HttpResponse: The same response.
+    """
+
+    response['ETag'] = etag
+    if public:
+        # Let browsers and proxies reuse the chart, revalidating it once it is older than the max age
+        patch_cache_control(response, public=True, max_age=settings.CHART_MAX_AGE)
+        # Full pages and HTMX partials of the same chart must be cached separately
+        patch_vary_headers(response, ['HX-Request'])
+    else:
+        # Keep the page of one visitor, with their CSRF token and cookie, out of shared caches
+        patch_cache_control(response, private=True, max_age=settings.CHART_MAX_AGE)
+        # The page depends on the CSRF cookie, on the 304 path as well
+        patch_vary_headers(response, ['HX-Request', 'Cookie'])
+    return response
+
+def get_year(request, name):
+    """
+    Read an optional year from the query string.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        name (str): Name of the query parameter.
+
+    Returns:
+        int: The year, or None if it is missing, not a number, or outside MIN_YEAR to the current year.
+    """
+
+    try:
+        year = int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+    if not MIN_YEAR <= year <= datetime.date.today().year:
+        return None
+    return year
+
+def get_date(request, name):
+    """
+    Read an optional ISO date from the query string.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        name (str): Name of the query parameter.
+
+    Returns:
+        date: The date, or None if it is missing, malformed, or outside MIN_YEAR to today.
+    """
+
+    try:
+        date = datetime.date.fromisoformat(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+    if not datetime.date(MIN_YEAR, 1, 1) <= date <= datetime.date.today():
+        return None
+    return date
+
+def get_window(request, get_bound):
+    """
+    Read an optional window from the start and end parameters of the query string.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        get_bound (callable): get_year or get_date, called with the request and a parameter name.
+
+    Returns:
+        tuple: The start and end of the window, each None if missing or invalid,
+            both None if the start comes after the end.
+    """
+
+    start, end = get_bound(request, 'start'), get_bound(request, 'end')
+    if start is not None and end is not None and start > end:
+        return None, None
+    return start, end
+
+async def render_chart(request, view, parameter, refresh, make_context, template):
+    """
+    Render a chart page or partial, answering 304 when the client already holds it.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        view (str): Name of the view the chart belongs to.
+        parameter (str): The year, symbol or stock the chart was requested for.
+        refresh (callable): Awaited without arguments to refresh the data and get its version.
+        make_context (callable): Called with the data version to build the template context.
+        template (str): Template of the full page.
+
+    Returns:
+        HttpResponse: The rendered page or partial chart, or a 304 response.
+    """
+
+    # Render a partial chart if request is an HTMX request
+    template = 'partials/chart.html' if request.htmx else template
+    try:
+        version = await refresh()
+    except engines.UPSTREAM_ERRORS:
+        context = {
+            'error_msg' : 'Data you requested is temporarily unavailabl'
+        }
+        return render(request, template, context)
+
+    # The entity tag is known before the chart is built, so a match skips rendering entirely
+    etag = get_chart_etag(view, parameter, version, bool(request.htmx))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        context = await sync_to_async(make_context)(version)
+        with stage('template'):
+            response = render(request, template, context)
+    # Only HTMX partials leave out the CSRF token of the full page
+    return add_cache_headers(response, etag, public=bool(request.htmx))
 
 def home(request):
     """
@@ -16,7 +157,7 @@ def home(request):
     
     return render(request, 'home.html')
 
-def gini(request):
+async def gini(request):
     """
     Handle the GINI index view.
     
@@ -24,24 +165,17 @@ def gini(request):
         request (HttpRequest): The HTTP request object.
     
     Returns:
-        HttpResponse: The rendered GINI index page or partial chart.
+        HttpResponse: The rendered GINI index page or partial chart, or a 304 response.
     """
 
-    # Get the year from the request, default to 2008 if not provided
-    year = request.GET.get('year', 2008)
+    # Get the year from the request, default to 2008 if not provided or invalid
+    year = get_year(request, 'year') or 2008
     # Create an instance of GiniIndex with the specified year
-    gi = GiniIndex(year=year)
-    # Get the context for the GINI index plot
-    context = gi.get_context()
-    
-    if request.htmx:
-        # Render a partial chart if request is an HTMX request
-        return render(request, 'partials/chart.html', context)
-
-    # Render the full GINI index page
-    return render(request, 'gini.html', context)
+    gi = engines.GiniIndex(year=year)
+    # Render the GINI index chart from the Gini panel version
+    return await render_chart(request, 'gini', year, gi.refresh_async, lambda version: gi.make_context(gi.results), 'gini.html')
 
-def cpi(request):
+async def cpi(request):
     """
     Handle the CPI index view.
     
@@ -49,24 +183,43 @@ def cpi(request):
         request (HttpRequest): The HTTP request object.
     
     Returns:
-        HttpResponse: The rendered CPI index page or partial chart.
+        HttpResponse: The rendered CPI index page or partial chart, or a 304 response.
     """
 
     # Get the symbol from the request, default to 'FPCPITOTLZGPOL' if not provided
     symbol = request.GET.get('symbol', 'FPCPITOTLZGPOL')
-    # Create an instance of CpiIndex with the specified symbol
-    cpi = CpiIndex(symbol=symbol)
-    # Get the context for the CPI index plot
-    context = cpi.get_cpi_context()
-    
-    if request.htmx:
-        # Render a partial chart if request is an HTMX request
-        return render(request, 'partials/chart.html', context)
+    # Get the window of years from the request, default to the full history
+    start, end = get_window(request, get_year)
+    # Create an instance of CpiIndex with the specified symbol and window
+    cpi = engines.CpiIndex(symbol=symbol, start=start, end=end)
+    # Only the listed series can be charted, so arbitrary input is never fetched or stored
+    if not cpi.inputs.has_code(symbol):
+        raise Http404
+    # Render the CPI index chart from the CPI series version
+    return await render_chart(request, 'cpi', cpi.get_parameter(), cpi.refresh_async, cpi.make_context, 'cpi.html')
+
+async def cpi_compare(request):
+    """
+    Handle the CPI comparison view.
 
-    # Render the full CPI index page
-    return render(request, 'cpi.html', context)
+    Args:
+        request (HttpRequest): The HTTP request object.
 
-def stock(request):
+    Returns:
+        HttpResponse: The rendered CPI comparison page or partial chart, or a 304 response.
+    """
+
+    # Get the compared symbols from the request, default to every country if not provided
+    symbols = request.GET.getlist('symbol') or None
+    # Create an instance of CpiComparison with the specified symbols
+    comparison = engines.CpiComparison(symbols=symbols)
+    # Only the listed series can be compared
+    if symbols is not None and not all(comparison.inputs.has_code(symbol) for symbol in symbols):
+        raise Http404
+    # Render the comparison chart from the versions of the compared series
+    return await render_chart(request, 'cpi-compare', ','.join(comparison.symbols), comparison.refresh_async, comparison.make_context, 'cpi_compare.html')
+
+async def stock(request):
     """
     Handle the stock index view.
     
@@ -74,22 +227,126 @@ def stock(request):
         request (HttpRequest): The HTTP request object.
     
     Returns:
-        HttpResponse: The rendered stock index page or partial chart.
+        HttpResponse: The rendered stock index page or partial chart, or a 304 response.
     """
 
     # Get the stock symbol from the request, default to 'SP500' if not provided
     stock = request.GET.get('stock', 'SP500')
-    # Create an instance of StockIndex with the specified stock symbol
-    stock = StockIndex(stock=stock)
-    # Get the context for the stock index plot
-    context = stock.get_stock_context()
-    
-    if request.htmx:
-        # Render a partial chart if request is an HTMX request
-        return render(request, 'partials/chart.html', context)
+    # Get the window of dates from the request, default to the stored history
+    start, end = get_window(request, get_date)
+    # Create an instance of StockIndex with the specified stock symbol, window and frequency
+    si = engines.StockIndex(stock=stock, start=start, end=end, frequency=request.GET.get('frequency'))
+    # Only the listed series can be charted, so arbitrary input is never fetched or stored
+    if not si.inputs.has_code(stock):
+        raise Http404
+    # Render the stock index chart from the stock series version
+    return await render_chart(request, 'stock', si.get_parameter(), si.refresh_async, si.make_context, 'stock.html')
+
+async def render_columns(request, view, parameter, refresh, get_chart_data):
+    """
+    Serve the columns of a chart as JSON, answering 304 when the client already holds them.
+
+    Numeric columns are sent as Bokeh base64 arrays: objects holding the buffer in
+    __ndarray__ along with its dtype and shape.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        view (str): Name of the view the chart belongs to.
+        parameter (str): The year, symbol or stock the chart was requested for.
+        refresh (callable): Awaited without arguments to refresh the data and get its version.
+        get_chart_data (callable): Called with the data version to get the chart title and columns.
+
+    Returns:
+        JsonResponse: The chart data, or a 304 response.
+    """
+
+    try:
+        version = await refresh()
+    except engines.UPSTREAM_ERRORS:
+        return JsonResponse({'error_msg': 'Data you requested is temporarily unavailabl'}, status=503)
+
+    etag = get_chart_etag('api-' + view, parameter, version, False)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = await sync_to_async(get_chart_data)(version)
+        with stage('encode'):
+            # Encode typed array columns as base64 buffers, the same way Bokeh embeds them
+            data['data'] = engines.transform_column_source_data(data['data'])
+            # Drop the whitespace of the default separators
+            response = JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+    return add_cache_headers(response, etag)
+
+async def api_gini(request, year):
+    """
+    Serve the GINI index chart data of a year as JSON.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        year (int): The year of the chart.
+
+    Returns:
+        JsonResponse: The chart title, x range factors and columns, or a 304 response.
+    """
+
+    gi = engines.GiniIndex(year=year)
+    return await render_columns(request, 'gini', year, gi.refresh_async, lambda version: gi.get_chart_data())
+
+async def api_cpi(request, symbol):
+    """
+    Serve the CPI index chart data of a country as JSON, for the window given by the
+    optional start and end years of the query string.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        symbol (str): The FRED symbol of the country CPI series.
+
+    Returns:
+        JsonResponse: The chart title and columns, or a 304 response.
+    """
+
+    start, end = get_window(request, get_year)
+    cpi = engines.CpiIndex(symbol=symbol, start=start, end=end)
+    # Only the listed series can be charted
+    if not cpi.inputs.has_code(symbol):
+        raise Http404
+    return await render_columns(request, 'cpi', cpi.get_parameter(), cpi.refresh_async, cpi.get_chart_data)
+
+async def api_stock(request, stock):
+    """
+    Serve the stock index chart data as JSON, for the window and frequency given by the
+    optional start, end and frequency parameters of the query string.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        stock (str): The stock symbol.
+
+    Returns:
+        JsonResponse: The chart title, highest tile count and columns, or a 304 response.
+    """
+
+    start, end = get_window(request, get_date)
+    si = engines.StockIndex(stock=stock, start=start, end=end, frequency=request.GET.get('frequency'))
+    # Only the listed series can be charted
+    if not si.inputs.has_code(stock):
+        raise Http404
+    return await render_columns(request, 'stock', si.get_parameter(), si.refresh_async, si.get_chart_data)
+
+def debug_timings(request):
+    """
+    Serve the in-process histograms of the chart pipeline stages as JSON.
+
+    Only available to staff users, or to everyone when DEBUG is on.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: Count, total, mean, max and estimated quantiles of every stage, keyed by view.
+    """
 
-    # Render the full stock index page
-    return render(request, 'stock.html', context)
+    if not (settings.DEBUG or request.user.is_staff):
+        raise Http404
+    return JsonResponse(timing_registry.get_summary())
 
 def page_not_found(response, exception):
     """
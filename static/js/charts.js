@@ -0,0 +1,84 @@
+/*
+	Chart updates from the JSON data endpoints.
+	Changing a chart select fetches only the new columns and updates the embedded
+	Bokeh models in place, instead of swapping in a freshly rendered chart.
+*/
+
+(function() {
+
+	// Find a named model in the embedded Bokeh documents, newest first.
+		function getModel(name) {
+			for (var i = Bokeh.documents.length - 1; i >= 0; i--) {
+				var model = Bokeh.documents[i].get_model_by_name(name);
+				if (model)
+					return model;
+			}
+			return null;
+		}
+
+	// Typed arrays of the dtypes Bokeh encodes as base64.
+		var arrayTypes = {
+			uint8: Uint8Array, int8: Int8Array,
+			uint16: Uint16Array, int16: Int16Array,
+			uint32: Uint32Array, int32: Int32Array,
+			float32: Float32Array, float64: Float64Array
+		};
+
+	// Decode a base64 column into a typed array, leaving plain lists as they are.
+		function decodeColumn(column) {
+			if (column === null || column.__ndarray__ === undefined)
+				return column;
+			var bytes = Uint8Array.from(atob(column.__ndarray__), function(c) { return c.charCodeAt(0); });
+			return new arrayTypes[column.dtype](bytes.buffer);
+		}
+
+	// Apply the title, x range factors, color range and columns of a chart.
+		function updateChart(chart) {
+			var title = getModel('chart-title'),
+				range = getModel('chart-x-range'),
+				mapper = getModel('chart-color-mapper'),
+				source = getModel('chart-source');
+
+			if (title)
+				title.text = chart.title;
+			if (range && chart.factors)
+				range.factors = chart.factors;
+			if (mapper && chart.high !== undefined)
+				mapper.high = chart.high;
+			if (source) {
+				var data = {};
+				for (var key in chart.data)
+					data[key] = decodeColumn(chart.data[key]);
+				source.data = data;
+			}
+		}
+
+	// Selects whose options carry the data endpoint of their chart, with the optional window inputs next to them.
+		document.querySelectorAll('select[data-api-select]').forEach(function(select) {
+			var params = select.closest('.content').querySelectorAll('[data-api-param]');
+
+			function update() {
+				var query = new URLSearchParams();
+				params.forEach(function(input) {
+					if (input.value)
+						query.set(input.name, input.value);
+				});
+				fetch(select.options[select.selectedIndex].dataset.apiUrl + '?' + query.toString(), { headers: { 'Accept': 'application/json' } })
+					.then(function(response) {
+						if (!response.ok)
+							throw new Error(response.statusText);
+						return response.json();
+					})
+					.then(updateChart)
+					.catch(function(error) {
+						console.error('Chart update failed:', error);
+					});
+			}
+
+			select.addEventListener('change', update);
+			params.forEach(function(input) {
+				input.addEventListener('change', update);
+			});
+		});
+
+})();
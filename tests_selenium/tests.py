@@ -46,7 +46,7 @@ class GlobalMacroTest(StaticLiveServerTestCase):
 
 
     def test_home_page(self):
-         """
+        """
         Test case to verify functionalities on the Home page of the application.
         """
         